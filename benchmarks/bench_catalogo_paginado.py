@@ -0,0 +1,55 @@
+# Latencia de obtener_libro en el catálogo paginado con caché caliente y fría.
+# Ejecutar desde la raíz del repositorio: python -m benchmarks.bench_catalogo_paginado
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+from src.subsystems.book_catalog import CatalogoLibros
+from src.subsystems.paged_catalog import CatalogoLibrosPaginado
+
+NUM_LIBROS = 200_000
+MAX_RESIDENTES = 10_000
+NUM_CONSULTAS = 50_000
+
+
+def percentiles(muestras):
+    muestras = sorted(muestras)
+    return muestras[len(muestras) // 2] * 1e6, muestras[int(len(muestras) * 0.99)] * 1e6
+
+
+def medir(catalogo, ids):
+    muestras = []
+    for id_libro in ids:
+        inicio = time.perf_counter()
+        catalogo.obtener_libro(id_libro)
+        muestras.append(time.perf_counter() - inicio)
+    return percentiles(muestras)
+
+
+if __name__ == "__main__":
+    aleatorio = random.Random(7)
+    with tempfile.TemporaryDirectory() as directorio:
+        memoria = CatalogoLibros()
+        paginado = CatalogoLibrosPaginado(os.path.join(directorio, "libros.pag"), MAX_RESIDENTES)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(NUM_LIBROS):
+                datos = (f"Titulo del libro {i}", f"Autor {i % 5000}", f"978{i:010d}")
+                memoria.agregar_libro(*datos)
+                paginado.agregar_libro(*datos)
+
+        calientes = [aleatorio.randint(1, MAX_RESIDENTES // 2) for _ in range(NUM_CONSULTAS)]
+        frios = [aleatorio.randint(1, NUM_LIBROS) for _ in range(NUM_CONSULTAS)]
+
+        medir(paginado, calientes)  # Calentar el conjunto residente
+        print(f"{'catálogo':>22} {'p50 µs':>8} {'p99 µs':>8}")
+        p50, p99 = medir(memoria, frios)
+        print(f"{'en memoria':>22} {p50:8.2f} {p99:8.2f}")
+        p50, p99 = medir(paginado, calientes)
+        print(f"{'paginado (caliente)':>22} {p50:8.2f} {p99:8.2f}")
+        p50, p99 = medir(paginado, frios)
+        print(f"{'paginado (frío)':>22} {p50:8.2f} {p99:8.2f}")
+        print(paginado.obtener_estadisticas_memoria())
+        paginado.cerrar()
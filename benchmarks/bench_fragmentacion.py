@@ -0,0 +1,47 @@
+# Benchmark del despliegue fragmentado de la fachada.
+# Ejecutar desde la raíz del repositorio: python -m benchmarks.bench_fragmentacion
+import os
+import time
+
+from src.facade.sharded_facade import FachadaBibliotecaFragmentada
+
+NUM_LIBROS = 100_000
+NUM_USUARIOS = 2_000
+NUM_BUSQUEDAS = 50
+TAMANO_LOTE = 1_000
+
+
+def medir(num_fragmentos: int) -> dict:
+    with FachadaBibliotecaFragmentada(num_fragmentos, silencioso=True) as biblioteca:
+        libros = biblioteca.agregar_libros_lote(
+            [(f"Titulo {i} tomo {i % 97}", f"Autor {i % 500}", f"978{i:010d}") for i in range(NUM_LIBROS)]
+        )
+        usuarios = [biblioteca.registrar_usuario(f"Usuario {i}", f"u{i}@example.com")
+                    for i in range(NUM_USUARIOS)]
+
+        # Búsquedas: cada fragmento recorre solo su parte del catálogo
+        inicio = time.perf_counter()
+        for i in range(NUM_BUSQUEDAS):
+            biblioteca.buscar_libro(f"tomo {i}")
+        busquedas_s = NUM_BUSQUEDAS / (time.perf_counter() - inicio)
+
+        # Préstamos por lotes, con usuario y libro en fragmentos distintos
+        solicitudes = [(usuarios[(i * 7) % NUM_USUARIOS].id, libro.id) for i, libro in enumerate(libros)]
+        inicio = time.perf_counter()
+        for desde in range(0, len(solicitudes), TAMANO_LOTE):
+            biblioteca.realizar_prestamos_lote(solicitudes[desde:desde + TAMANO_LOTE])
+        prestamos_s = len(solicitudes) / (time.perf_counter() - inicio)
+
+    return {"busquedas_s": busquedas_s, "prestamos_s": prestamos_s}
+
+
+if __name__ == "__main__":
+    maximo = os.cpu_count() or 1
+    fragmentos = sorted({1, 2, 4, maximo})
+    base = None
+    print(f"{'fragmentos':>10} {'búsquedas/s':>12} {'préstamos/s':>12} {'escala':>7}")
+    for n in fragmentos:
+        resultado = medir(n)
+        base = base or resultado["prestamos_s"]
+        print(f"{n:>10} {resultado['busquedas_s']:>12.1f} {resultado['prestamos_s']:>12.0f} "
+              f"{resultado['prestamos_s'] / base:>6.2f}x")
@@ -0,0 +1,45 @@
+# Benchmark del reporte de préstamos: recorrido secuencial frente a pool de procesos.
+# Ejecutar desde la raíz del repositorio: python -m benchmarks.bench_reportes
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from src.models.models import Prestamo
+from src.subsystems.book_catalog import CatalogoLibros
+from src.subsystems.loan_reports import GeneradorReportes
+from src.subsystems.loan_system import SistemaPrestamos
+
+NUM_PRESTAMOS = 200_000
+NUM_USUARIOS = 20_000
+
+
+def poblar() -> SistemaPrestamos:
+    sistema = SistemaPrestamos(CatalogoLibros())
+    ahora = datetime.now()
+    aleatorio = random.Random(42)
+    for id_prestamo in range(1, NUM_PRESTAMOS + 1):
+        inicio = ahora - timedelta(days=aleatorio.randint(0, 60), seconds=aleatorio.randint(0, 86_399))
+        devolucion = inicio + timedelta(days=aleatorio.randint(1, 30)) if aleatorio.random() < 0.7 else None
+        sistema.prestamos[id_prestamo] = Prestamo(
+            id=id_prestamo, id_usuario=aleatorio.randint(1, NUM_USUARIOS), id_libro=id_prestamo,
+            fecha_prestamo=inicio, fecha_devolucion=devolucion,
+        )
+    return sistema
+
+
+if __name__ == "__main__":
+    generador = GeneradorReportes(poblar())
+
+    inicio = time.perf_counter()
+    referencia = generador.generar_reporte_secuencial()
+    base = time.perf_counter() - inicio
+    print(f"{'secuencial':>12}: {base:6.2f}s")
+
+    for num_procesos in sorted({1, 2, 4, os.cpu_count() or 1}):
+        inicio = time.perf_counter()
+        reporte = generador.generar_reporte(num_procesos, referencia["fecha_corte"])
+        duracion = time.perf_counter() - inicio
+        coincide = (reporte["vencidos"] == referencia["vencidos"]
+                    and reporte["total_multas"] == referencia["total_multas"])
+        print(f"{num_procesos:>9} pr: {duracion:6.2f}s  ({base / duracion:.2f}x, coincide={coincide})")
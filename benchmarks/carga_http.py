@@ -0,0 +1,125 @@
+# Cliente de carga para el servidor HTTP/JSON de la biblioteca.
+# Ejecutar desde la raíz del repositorio: python -m benchmarks.carga_http [--url http://host:puerto]
+# Sin --url arranca una instancia local en un subproceso.
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+
+class ClienteHTTP:
+    """Conexión HTTP/1.1 persistente mínima para medir latencias."""
+
+    def __init__(self, host: str, puerto: int):
+        self.host = host
+        self.puerto = puerto
+        self.lector = self.escritor = None
+
+    async def conectar(self) -> None:
+        self.lector, self.escritor = await asyncio.open_connection(self.host, self.puerto)
+
+    async def solicitar(self, metodo: str, ruta: str, cuerpo=None):
+        datos = json.dumps(cuerpo).encode("utf-8") if cuerpo is not None else b""
+        self.escritor.write(
+            f"{metodo} {ruta} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(datos)}\r\n\r\n".encode("latin-1") + datos
+        )
+        await self.escritor.drain()
+        estado = int((await self.lector.readline()).split()[1])
+        longitud = 0
+        while True:
+            linea = await self.lector.readline()
+            if linea in (b"\r\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            if nombre.lower() == "content-length":
+                longitud = int(valor)
+        return estado, json.loads(await self.lector.readexactly(longitud))
+
+    def cerrar(self) -> None:
+        self.escritor.close()
+
+
+async def preparar(host: str, puerto: int, num_usuarios: int, num_libros: int):
+    cliente = ClienteHTTP(host, puerto)
+    await cliente.conectar()
+    _, usuarios = await cliente.solicitar("POST", "/lote", [
+        {"operacion": "registrar_usuario", "argumentos": {"nombre": f"Usuario {i}", "email": f"u{i}@example.com"}}
+        for i in range(num_usuarios)
+    ])
+    _, libros = await cliente.solicitar("POST", "/lote", [
+        {"operacion": "agregar_libro", "argumentos": {"titulo": f"Libro {i}", "autor": "Autor", "isbn": f"{i}"}}
+        for i in range(num_libros)
+    ])
+    cliente.cerrar()
+    return [u["respuesta"]["id"] for u in usuarios], [l["respuesta"]["id"] for l in libros]
+
+
+async def trabajador(host, puerto, operaciones, usuarios, libros, latencias, semilla):
+    """Ejecuta `operaciones` búsquedas o préstamos y anota la latencia de cada solicitud HTTP.
+
+    Un préstamo concedido va seguido de su devolución, así que una operación
+    puede ser una o dos solicitudes; cada una se mide por separado.
+    """
+    aleatorio = random.Random(semilla)
+    cliente = ClienteHTTP(host, puerto)
+    await cliente.conectar()
+
+    async def solicitar(metodo, ruta, cuerpo=None):
+        inicio = time.perf_counter()
+        respuesta = await cliente.solicitar(metodo, ruta, cuerpo)
+        latencias.append(time.perf_counter() - inicio)
+        return respuesta
+
+    for _ in range(operaciones):
+        if aleatorio.random() < 0.6:
+            await solicitar("GET", f"/libros?titulo=Libro {aleatorio.randint(0, 999)}".replace(" ", "%20"))
+        else:
+            estado, prestamo = await solicitar("POST", "/prestamos", {
+                "id_usuario": aleatorio.choice(usuarios), "id_libro": aleatorio.choice(libros)})
+            if estado == 201:
+                await solicitar("POST", f"/prestamos/{prestamo['id']}/devolucion")
+    cliente.cerrar()
+
+
+async def medir(host: str, puerto: int, conexiones: int, operaciones: int) -> None:
+    usuarios, libros = await preparar(host, puerto, 200, 2000)
+    latencias = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(host, puerto, operaciones, usuarios, libros, latencias, i)
+                           for i in range(conexiones)))
+    duracion = time.perf_counter() - inicio
+    latencias.sort()
+    print(f"conexiones={conexiones} solicitudes={len(latencias)} duración={duracion:.2f}s")
+    print(f"  p50={latencias[len(latencias) // 2] * 1000:.2f}ms  "
+          f"p99={latencias[int(len(latencias) * 0.99)] * 1000:.2f}ms  "
+          f"req/s={len(latencias) / duracion:.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="instancia existente, p. ej. http://127.0.0.1:8080")
+    parser.add_argument("--conexiones", type=int, default=16)
+    parser.add_argument("--operaciones", type=int, default=500,
+                        help="búsquedas o préstamos por conexión (un préstamo concedido suma su devolución)")
+    argumentos = parser.parse_args()
+
+    proceso = None
+    if argumentos.url:
+        url = urlsplit(argumentos.url)
+        host, puerto = url.hostname, url.port or 80
+    else:
+        host, puerto = "127.0.0.1", 8765
+        proceso = subprocess.Popen([sys.executable, "-m", "src.server.http_server", "--puerto", str(puerto),
+                                    "--silencioso"], stdout=subprocess.PIPE)
+        proceso.stdout.readline()  # Esperar el aviso de arranque
+    try:
+        asyncio.run(medir(host, puerto, argumentos.conexiones, argumentos.operaciones))
+    finally:
+        if proceso:
+            proceso.terminate()
+            proceso.wait()
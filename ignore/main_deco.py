@@ -1,14 +1,25 @@
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from dataclasses import dataclass
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
 import copy
+import heapq
+import itertools
+import os
 import time
 
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional; sin él cada fotograma se procesa con bytes.translate
+    np = None
+
 # Clase para representar un fotograma de video
 @dataclass
 class VideoFrame:
     id: int
-    datos: bytes
+    datos: Union[bytes, bytearray]  # bytearray en la canalización en sitio
     timestamp: float
     ancho: int
     alto: int
@@ -16,6 +27,32 @@ class VideoFrame:
     def __repr__(self):
         return f"VideoFrame(id={self.id}, timestamp={self.timestamp}, ancho={self.ancho}, alto={self.alto})"
 
+# Operaciones sobre los bytes del fotograma, compartidas por los decoradores y la canalización.
+# Los filtros por byte se expresan como tablas de 256 entradas para poder aplicarlos con
+# bytes.translate y componer varios en una sola pasada.
+TABLA_IDENTIDAD = bytes(range(256))
+
+def tabla_xor(clave_byte: int) -> bytes:
+    return bytes(b ^ clave_byte for b in range(256))
+
+def tabla_filtro(tipo_filtro: str, intensidad: float) -> bytes:
+    """Tabla de un filtro de color: mezcla cada valor con el del filtro según la intensidad."""
+    objetivos = {
+        "sepia": lambda b: min(255, int(b * 0.9) + 30),
+        "gris": lambda b: 128 + (b - 128) // 2,
+        "negativo": lambda b: 255 - b,
+    }
+    objetivo = objetivos.get(tipo_filtro, lambda b: b)
+    return bytes(max(0, min(255, round(b + (objetivo(b) - b) * intensidad))) for b in range(256))
+
+def desplazamiento_marca(longitud_datos: int, longitud_marca: int, posicion: str) -> int:
+    """Byte en el que empieza la marca de agua según su posición."""
+    if posicion == "esquina-superior-izquierda":
+        return 0
+    if posicion == "centro":
+        return (longitud_datos - longitud_marca) // 2
+    return longitud_datos - longitud_marca
+
 # Componente
 class FlujoVideo(ABC):
     @abstractmethod
@@ -25,6 +62,10 @@ class FlujoVideo(ABC):
     @abstractmethod
     def obtener_metadatos(self) -> Dict:
         pass
+    
+    def procesar_lote(self, fotogramas: List[VideoFrame]) -> List[VideoFrame]:
+        """Procesa una secuencia de fotogramas; por defecto, uno a uno."""
+        return [self.procesar_fotograma(fotograma) for fotograma in fotogramas]
 
 # Componente concreto
 class FlujoVideoBase(FlujoVideo):
@@ -79,6 +120,10 @@ class DecoradorCompresion(DecoradorFlujoVideo):
         metadatos = self.flujo_envuelto.obtener_metadatos()
         metadatos["transformaciones"].append(f"compresion-{self.nivel_compresion}%")
         return metadatos
+    
+    def etapa(self) -> Tuple[str, object]:
+        """Operación equivalente para la canalización en sitio: porcentaje de los datos que se conserva."""
+        return "recortar", (100 - self.nivel_compresion,)
 
 class DecoradorEncriptacion(DecoradorFlujoVideo):
     def __init__(self, flujo_envuelto: FlujoVideo, clave_encriptacion: str, algoritmo: str = "AES"):
@@ -104,6 +149,11 @@ class DecoradorEncriptacion(DecoradorFlujoVideo):
         metadatos = self.flujo_envuelto.obtener_metadatos()
         metadatos["transformaciones"].append(f"encriptacion-{self.algoritmo}")
         return metadatos
+    
+    def etapa(self) -> Tuple[str, object]:
+        """Operación equivalente para la canalización en sitio: XOR expresado como tabla."""
+        clave_byte = ord(self.clave_encriptacion[0]) if self.clave_encriptacion else 0
+        return "tabla", tabla_xor(clave_byte)
 
 class DecoradorMarcaAgua(DecoradorFlujoVideo):
     def __init__(self, flujo_envuelto: FlujoVideo, texto_marca: str, posicion: str = "esquina-inferior-derecha"):
@@ -118,8 +168,11 @@ class DecoradorMarcaAgua(DecoradorFlujoVideo):
         # Luego aplica la marca de agua
         fotograma_resultado = copy.deepcopy(fotograma_procesado)
         
-        # En un sistema real, aquí se añadiría la marca de agua al fotograma
-        # Para esta simulación, simplemente modificamos los metadatos
+        # Simulamos la marca de agua sobrescribiendo los bytes de su posición con el texto
+        marca = self.texto_marca.encode("utf-8")[:len(fotograma_resultado.datos)]
+        inicio = desplazamiento_marca(len(fotograma_resultado.datos), len(marca), self.posicion)
+        datos = fotograma_resultado.datos
+        fotograma_resultado.datos = datos[:inicio] + marca + datos[inicio + len(marca):]
         
         return fotograma_resultado
     
@@ -128,6 +181,10 @@ class DecoradorMarcaAgua(DecoradorFlujoVideo):
         metadatos["transformaciones"].append(f"marca-agua-{self.posicion}")
         metadatos["marca_agua"] = self.texto_marca
         return metadatos
+    
+    def etapa(self) -> Tuple[str, object]:
+        """Operación equivalente para la canalización en sitio: texto y posición de la marca."""
+        return "marca", (self.texto_marca.encode("utf-8"), self.posicion)
 
 class DecoradorFiltroColor(DecoradorFlujoVideo):
     def __init__(self, flujo_envuelto: FlujoVideo, tipo_filtro: str, intensidad: float = 1.0):
@@ -142,8 +199,8 @@ class DecoradorFiltroColor(DecoradorFlujoVideo):
         # Luego aplica el filtro de color
         fotograma_resultado = copy.deepcopy(fotograma_procesado)
         
-        # En un sistema real, aquí se aplicaría el filtro de color
-        # Para esta simulación, simplemente registramos la operación
+        # Simulamos el filtro de color transformando cada byte con su tabla
+        fotograma_resultado.datos = fotograma_resultado.datos.translate(tabla_filtro(self.tipo_filtro, self.intensidad))
         
         return fotograma_resultado
     
@@ -151,6 +208,278 @@ class DecoradorFiltroColor(DecoradorFlujoVideo):
         metadatos = self.flujo_envuelto.obtener_metadatos()
         metadatos["transformaciones"].append(f"filtro-{self.tipo_filtro}-{self.intensidad}")
         return metadatos
+    
+    def etapa(self) -> Tuple[str, object]:
+        """Operación equivalente para la canalización en sitio: tabla del filtro."""
+        return "tabla", tabla_filtro(self.tipo_filtro, self.intensidad)
+
+# Canalización en sitio
+class CanalizacionFotogramas(FlujoVideo):
+    """Ejecuta una cadena de decoradores transformando el búfer del fotograma en sitio.
+    
+    Recorre la cadena una sola vez para obtener la etapa de cada decorador y,
+    con `fusionar`, combina las adyacentes: las tablas por byte seguidas se
+    componen en una sola, los recortes seguidos se multiplican y un recorte
+    se adelanta a las tablas que lo preceden (son operaciones byte a byte),
+    así que las tablas procesan menos datos. Los fotogramas con `datos` de tipo
+    bytearray se modifican sin copiarlos; los de tipo bytes se copian una vez
+    al entrar.
+    """
+    
+    def __init__(self, flujo: FlujoVideo, fusionar: bool = True):
+        self.flujo = flujo
+        self.fusionar = fusionar
+        self.etapas = self._obtener_etapas(flujo)
+        self.plan = self._fusionar(self.etapas) if fusionar else list(self.etapas)
+    
+    @staticmethod
+    def _obtener_etapas(flujo: FlujoVideo) -> List[Tuple[str, object]]:
+        """Etapas de la cadena en el orden en que se aplican (de la más interna a la externa)."""
+        etapas = []
+        while isinstance(flujo, DecoradorFlujoVideo):
+            etapas.append(flujo.etapa())
+            flujo = flujo.flujo_envuelto
+        return etapas[::-1]
+    
+    @staticmethod
+    def _fusionar(etapas: List[Tuple[str, object]]) -> List[Tuple[str, object]]:
+        plan: List[Tuple[str, object]] = []
+        for tipo, parametro in etapas:
+            if tipo == "tabla" and plan and plan[-1][0] == "tabla":
+                # Aplicar t1 y después t2 equivale a la tabla t1.translate(t2)
+                plan[-1] = ("tabla", plan[-1][1].translate(parametro))
+            elif tipo == "recortar":
+                # Mantener el recorte antes de las tablas finales del plan
+                posicion = len(plan)
+                while posicion and plan[posicion - 1][0] == "tabla":
+                    posicion -= 1
+                if posicion and plan[posicion - 1][0] == "recortar":
+                    plan[posicion - 1] = ("recortar", plan[posicion - 1][1] + parametro)
+                else:
+                    plan.insert(posicion, ("recortar", parametro))
+            else:
+                plan.append((tipo, parametro))
+        return plan
+    
+    def procesar_fotograma(self, fotograma: VideoFrame) -> VideoFrame:
+        if not isinstance(fotograma.datos, bytearray):
+            fotograma = VideoFrame(fotograma.id, bytearray(fotograma.datos), fotograma.timestamp,
+                                   fotograma.ancho, fotograma.alto)
+        aplicar_plan(self.plan, fotograma.datos)
+        return fotograma
+    
+    def procesar_lote(self, fotogramas: List[VideoFrame]) -> List[VideoFrame]:
+        """Procesa un lote; con NumPy y fotogramas de igual tamaño, cada etapa opera sobre todo el lote a la vez."""
+        longitudes = {len(fotograma.datos) for fotograma in fotogramas}
+        if np is None or len(longitudes) != 1 or not longitudes.pop():
+            return [self.procesar_fotograma(fotograma) for fotograma in fotogramas]
+        
+        matriz = np.frombuffer(b"".join(fotograma.datos for fotograma in fotogramas), dtype=np.uint8)
+        matriz = aplicar_plan_matriz(self.plan, matriz.reshape(len(fotogramas), -1).copy())
+        return [VideoFrame(fotograma.id, bytearray(fila), fotograma.timestamp, fotograma.ancho, fotograma.alto)
+                for fotograma, fila in zip(fotogramas, matriz)]
+    
+    def obtener_metadatos(self) -> Dict:
+        metadatos = self.flujo.obtener_metadatos()
+        metadatos["plan"] = [tipo for tipo, _ in self.plan]
+        return metadatos
+
+def aplicar_plan(plan: List[Tuple[str, object]], datos: bytearray) -> bytearray:
+    """Aplica las etapas del plan a un fotograma, modificando `datos` en sitio."""
+    for tipo, parametro in plan:
+        if tipo == "tabla":
+            datos[:] = datos.translate(parametro)
+        elif tipo == "recortar":
+            # Los recortes fusionados se aplican en cadena para reproducir el redondeo de cada uno
+            for porcentaje in parametro:
+                del datos[len(datos) * porcentaje // 100:]
+        elif tipo == "marca":
+            marca, posicion = parametro
+            marca = marca[:len(datos)]
+            inicio = desplazamiento_marca(len(datos), len(marca), posicion)
+            datos[inicio:inicio + len(marca)] = marca
+    return datos
+
+# take convierte los índices uint8 a intp (8 bytes por elemento): aplicar la
+# tabla por bloques de este número de elementos acota esa copia temporal a 1 MiB
+ELEMENTOS_BLOQUE_TABLA = 128 * 1024
+
+def aplicar_plan_matriz(plan: List[Tuple[str, object]], matriz):
+    """Aplica el plan a una matriz de NumPy (un fotograma por fila) y devuelve la vista resultante.
+    
+    Las tablas se aplican con take sobre la propia matriz, por bloques de
+    ELEMENTOS_BLOQUE_TABLA elementos para que la copia de los índices que hace
+    take no crezca con el lote; los recortes sólo estrechan la vista.
+    """
+    for tipo, parametro in plan:
+        if tipo == "tabla":
+            tabla = np.frombuffer(parametro, dtype=np.uint8)
+            filas, columnas = matriz.shape
+            ancho = min(columnas, ELEMENTOS_BLOQUE_TABLA) or 1
+            alto = max(1, ELEMENTOS_BLOQUE_TABLA // ancho)
+            for fila in range(0, filas, alto):
+                for columna in range(0, columnas, ancho):
+                    bloque = matriz[fila:fila + alto, columna:columna + ancho]
+                    tabla.take(bloque, out=bloque, mode="clip")
+        elif tipo == "recortar":
+            for porcentaje in parametro:
+                matriz = matriz[:, :matriz.shape[1] * porcentaje // 100]
+        elif tipo == "marca":
+            marca, posicion = parametro
+            marca = marca[:matriz.shape[1]]
+            inicio = desplazamiento_marca(matriz.shape[1], len(marca), posicion)
+            matriz[:, inicio:inicio + len(marca)] = np.frombuffer(marca, dtype=np.uint8)
+    return matriz
+
+# Procesamiento paralelo por lotes
+_plan_trabajador: List[Tuple[str, object]] = []
+
+def _iniciar_trabajador(plan: List[Tuple[str, object]]) -> None:
+    global _plan_trabajador
+    _plan_trabajador = plan
+
+def _procesar_lote_compartido(nombre: str, desplazamientos: List[int], longitudes: List[int]) -> List[int]:
+    """Procesa en sitio los fotogramas de un lote en memoria compartida y devuelve sus nuevas longitudes."""
+    memoria = shared_memory.SharedMemory(name=nombre)
+    try:
+        if np is not None and len(set(longitudes)) == 1 and longitudes[0]:
+            matriz = np.ndarray((len(longitudes), longitudes[0]), dtype=np.uint8,
+                                buffer=memoria.buf, offset=desplazamientos[0])
+            resultado = aplicar_plan_matriz(_plan_trabajador, matriz)
+            nuevas = [resultado.shape[1]] * len(longitudes)
+            del matriz, resultado
+            return nuevas
+        nuevas = []
+        for desplazamiento, longitud in zip(desplazamientos, longitudes):
+            datos = aplicar_plan(_plan_trabajador, bytearray(memoria.buf[desplazamiento:desplazamiento + longitud]))
+            memoria.buf[desplazamiento:desplazamiento + len(datos)] = datos
+            nuevas.append(len(datos))
+        return nuevas
+    finally:
+        memoria.close()
+
+@dataclass
+class _LoteEnVuelo:
+    futuro: Future
+    memoria: shared_memory.SharedMemory
+    fotogramas: List[VideoFrame]
+    desplazamientos: List[int]
+    timestamp_minimo: float
+
+class ProcesadorParaleloFotogramas:
+    """Reparte lotes de fotogramas entre un pool de procesos a través de memoria compartida.
+    
+    Cada lote se copia una vez a un segmento de memoria compartida, un
+    proceso del pool le aplica el plan de la canalización en sitio y el
+    proceso principal lee los resultados y libera el segmento. Como mucho hay
+    `max_lotes_en_vuelo` lotes (y segmentos) a la vez.
+    
+    Los fotogramas se devuelven en orden de timestamp aunque los lotes
+    terminen desordenados. La entrada puede llegar desordenada dentro de
+    `ventana_reordenacion` fotogramas (por defecto, los que caben en vuelo):
+    se retienen en un montículo y se envían por orden. Un fotograma anterior a
+    otro ya enviado no puede colocarse en su sitio y produce ValueError.
+    """
+    
+    def __init__(self, flujo: FlujoVideo, num_procesos: Optional[int] = None, tamano_lote: int = 32,
+                 max_lotes_en_vuelo: Optional[int] = None, ventana_reordenacion: Optional[int] = None):
+        self.canalizacion = flujo if isinstance(flujo, CanalizacionFotogramas) else CanalizacionFotogramas(flujo)
+        self.num_procesos = num_procesos or os.cpu_count() or 1
+        self.tamano_lote = tamano_lote
+        self.max_lotes_en_vuelo = max_lotes_en_vuelo or 2 * self.num_procesos
+        if ventana_reordenacion is None:
+            ventana_reordenacion = self.tamano_lote * self.max_lotes_en_vuelo
+        self.ventana_reordenacion = ventana_reordenacion
+    
+    def _ordenar_entrada(self, fotogramas: Iterable[VideoFrame]) -> Iterator[VideoFrame]:
+        """Entrega la entrada en orden de timestamp reteniendo como mucho `ventana_reordenacion` fotogramas."""
+        ventana: List = []
+        orden = itertools.count()
+        ultimo = float("-inf")
+        for fotograma in fotogramas:
+            if fotograma.timestamp < ultimo:
+                raise ValueError(f"Fotograma {fotograma.id} (t={fotograma.timestamp}) llega después de "
+                                 f"t={ultimo}, fuera de la ventana de reordenación")
+            heapq.heappush(ventana, (fotograma.timestamp, next(orden), fotograma))
+            if len(ventana) > self.ventana_reordenacion:
+                ultimo, _, siguiente = heapq.heappop(ventana)
+                yield siguiente
+        while ventana:
+            yield heapq.heappop(ventana)[2]
+    
+    def _enviar(self, pool: ProcessPoolExecutor, fotogramas: List[VideoFrame]) -> _LoteEnVuelo:
+        desplazamientos, longitudes, total = [], [], 0
+        for fotograma in fotogramas:
+            desplazamientos.append(total)
+            longitudes.append(len(fotograma.datos))
+            total += len(fotograma.datos)
+        memoria = shared_memory.SharedMemory(create=True, size=max(1, total))
+        for fotograma, desplazamiento, longitud in zip(fotogramas, desplazamientos, longitudes):
+            memoria.buf[desplazamiento:desplazamiento + longitud] = fotograma.datos
+        futuro = pool.submit(_procesar_lote_compartido, memoria.name, desplazamientos, longitudes)
+        return _LoteEnVuelo(futuro, memoria, fotogramas, desplazamientos,
+                            min(fotograma.timestamp for fotograma in fotogramas))
+    
+    @staticmethod
+    def _recoger(lote: _LoteEnVuelo, listos: List, orden) -> None:
+        """Espera un lote, copia sus resultados fuera de la memoria compartida y la libera."""
+        try:
+            nuevas = lote.futuro.result()
+            for fotograma, desplazamiento, longitud in zip(lote.fotogramas, lote.desplazamientos, nuevas):
+                resultado = VideoFrame(fotograma.id, bytearray(lote.memoria.buf[desplazamiento:desplazamiento + longitud]),
+                                       fotograma.timestamp, fotograma.ancho, fotograma.alto)
+                heapq.heappush(listos, (fotograma.timestamp, next(orden), resultado))
+        finally:
+            lote.memoria.close()
+            lote.memoria.unlink()
+    
+    def procesar(self, fotogramas: Iterable[VideoFrame]) -> Iterator[VideoFrame]:
+        """Procesa un flujo de fotogramas y los entrega en orden de timestamp."""
+        pendientes: Deque[_LoteEnVuelo] = deque()
+        listos: List = []  # (timestamp, orden, fotograma) ya procesados a la espera de su turno
+        orden = itertools.count()
+        iterador = self._ordenar_entrada(fotogramas)
+        with ProcessPoolExecutor(self.num_procesos, initializer=_iniciar_trabajador,
+                                 initargs=(self.canalizacion.plan,)) as pool:
+            try:
+                while True:
+                    lote = list(itertools.islice(iterador, self.tamano_lote))
+                    if lote:
+                        pendientes.append(self._enviar(pool, lote))
+                    if not pendientes:
+                        break
+                    if lote and len(pendientes) < self.max_lotes_en_vuelo:
+                        continue
+                    self._recoger(pendientes.popleft(), listos, orden)
+                    # Sólo es seguro entregar lo anterior a todo lo que aún está en vuelo
+                    limite = min((pendiente.timestamp_minimo for pendiente in pendientes), default=float("inf"))
+                    while listos and listos[0][0] <= limite:
+                        yield heapq.heappop(listos)[2]
+            finally:
+                for pendiente in pendientes:
+                    pendiente.futuro.cancel()
+                    pendiente.memoria.close()
+                    pendiente.memoria.unlink()
+
+def medir_rendimiento(flujo: FlujoVideo, num_fotogramas: int = 100, tamano: int = 64 * 1024) -> Dict:
+    """Compara en fotogramas por segundo la cadena de decoradores con la canalización en sitio."""
+    patron = bytes(range(256)) * (tamano // 256)
+    resultados = {}
+    salidas = {}
+    for nombre, procesador, mutable in (
+        ("cadena", flujo, False),
+        ("en_sitio", CanalizacionFotogramas(flujo, fusionar=False), True),
+        ("en_sitio_fusionada", CanalizacionFotogramas(flujo), True),
+    ):
+        fotogramas = [VideoFrame(i, bytearray(patron) if mutable else patron, i / 30, 1920, 1080)
+                      for i in range(num_fotogramas)]
+        inicio = time.perf_counter()
+        for fotograma in fotogramas:
+            ultimo = procesador.procesar_fotograma(fotograma)
+        resultados[nombre] = num_fotogramas / (time.perf_counter() - inicio)
+        salidas[nombre] = bytes(ultimo.datos)
+    resultados["coinciden"] = len(set(salidas.values())) == 1
+    return resultados
 
 # Ejemplo de uso
 if __name__ == "__main__":
@@ -185,4 +514,21 @@ if __name__ == "__main__":
     print(f"Fotograma procesado: {fotograma_resultado}")
     print(f"Tamaño original: {len(fotograma_prueba.datos)} bytes")
     print(f"Tamaño después del procesamiento: {len(fotograma_resultado.datos)} bytes")
-    print(f"Metadatos: {metadatos}")
\ No newline at end of file
+    print(f"Metadatos: {metadatos}")
+    
+    # Rendimiento: cadena de decoradores frente a la canalización en sitio
+    canalizacion = CanalizacionFotogramas(flujo_completo)
+    print(f"Plan de la canalización: {canalizacion.obtener_metadatos()['plan']}")
+    print(f"Igual resultado en sitio: {bytes(canalizacion.procesar_fotograma(fotograma_prueba).datos) == fotograma_resultado.datos}")
+    for nombre, valor in medir_rendimiento(flujo_completo).items():
+        print(f"{nombre}: {valor:.1f} fps" if isinstance(valor, float) else f"{nombre}: {valor}")
+    
+    # Procesamiento por lotes en varios procesos, con los fotogramas en orden de timestamp
+    fotogramas = [VideoFrame(i, bytes(range(256)) * 1024, i / 30, 1920, 1080) for i in range(200)]
+    inicio = time.perf_counter()
+    paralelos = list(ProcesadorParaleloFotogramas(flujo_completo, tamano_lote=16).procesar(fotogramas))
+    duracion = time.perf_counter() - inicio
+    ordenados = all(a.timestamp <= b.timestamp for a, b in zip(paralelos, paralelos[1:]))
+    iguales = all(bytes(p.datos) == canalizacion.procesar_fotograma(f).datos for p, f in zip(paralelos, fotogramas))
+    print(f"Paralelo ({os.cpu_count()} CPU, NumPy {'sí' if np is not None else 'no'}): "
+          f"{len(paralelos) / duracion:.1f} fps, en orden: {ordenados}, iguales: {iguales}")
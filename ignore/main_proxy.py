@@ -2,8 +2,19 @@ from abc import ABC, abstractmethod
 import time
 import json
 import hashlib
+import heapq
+import itertools
+import sys
+import threading
+import contextlib
+import io
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import random
 
@@ -97,7 +108,7 @@ class ContenidoWeb:
     def obtener_como_texto(self) -> str:
         """Devuelve el contenido como texto UTF-8."""
         try:
-            return self.datos.decode('utf-8')
+            return str(self.datos, 'utf-8')  # Acepta bytes y memoryview sin copia previa
         except UnicodeDecodeError:
             return "[Contenido no es texto válido UTF-8]"
     
@@ -109,8 +120,12 @@ class ContenidoWeb:
             raise ValueError("El contenido no es un JSON válido")
     
     def obtener_como_bytes(self) -> bytes:
-        """Devuelve los datos como bytes crudos."""
-        return self.datos
+        """Devuelve los datos crudos como bytes (copiándolos si vienen de la caché en disco)."""
+        return bytes(self.datos)  # Con datos ya en bytes no se copia
+    
+    def obtener_vista(self) -> memoryview:
+        """Devuelve los datos crudos sin copiarlos (sobre el archivo mapeado si vienen del disco)."""
+        return memoryview(self.datos)
     
     def __str__(self) -> str:
         kb_size = self.tamano / 1024
@@ -118,96 +133,178 @@ class ContenidoWeb:
 
 # Elemento para almacenar en caché
 class CacheItem:
-    def __init__(self, clave: str, valor: Any, tiempo_vida: int = 3600):
+    def __init__(self, clave: str, valor: Any, tiempo_vida: int = 3600, tamano: int = 0):
         self.clave = clave
         self.valor = valor
-        self.timestamp = datetime.now()
+        self.timestamp = time.monotonic()
         self.tiempo_vida = tiempo_vida  # en segundos
+        self.expira_en = self.timestamp + tiempo_vida  # Instante de expiración (reloj monotónico)
+        self.tamano = tamano  # en bytes
     
-    def ha_expirado(self) -> bool:
+    def ha_expirado(self, ahora: Optional[float] = None) -> bool:
         """Determina si el elemento ha expirado."""
-        tiempo_actual = datetime.now()
-        tiempo_expiracion = self.timestamp + timedelta(seconds=self.tiempo_vida)
-        return tiempo_actual > tiempo_expiracion
+        return (time.monotonic() if ahora is None else ahora) > self.expira_en
     
     def obtener_edad(self) -> float:
         """Obtiene la edad del elemento en segundos."""
-        return (datetime.now() - self.timestamp).total_seconds()
+        return time.monotonic() - self.timestamp
     
     def __str__(self) -> str:
         return f"CacheItem(clave={self.clave}, edad={self.obtener_edad():.1f}s, expira_en={self.tiempo_vida}s)"
 
-# Caché implementado como diccionario
+def tamano_valor(valor: Any) -> int:
+    """Bytes que ocupa un valor cacheado (ContenidoWeb.tamano, longitud de bytes o aproximación)."""
+    tamano = getattr(valor, "tamano", None)
+    if isinstance(tamano, int):
+        return tamano
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return len(valor)
+    if isinstance(valor, dict):
+        return len(json.dumps(valor, default=str))
+    return sys.getsizeof(valor)
+
+# Caché LRU con expiración, acotado en bytes
 class DictCache:
-    def __init__(self, tamano_maximo: int = 100):
-        self.datos: Dict[str, CacheItem] = {}
-        self.tamano_maximo = tamano_maximo
+    """Caché LRU acotado por el total de bytes de los valores.
+    
+    Las entradas se guardan en un OrderedDict en orden de uso, así que
+    desalojar la menos usada recientemente es O(1). Las expiraciones se
+    ordenan en un montículo: limpiar los expirados cuesta O(k log n) para k
+    expirados, sin recorrer toda la caché. Las entradas del montículo de
+    elementos ya reemplazados o eliminados se descartan al llegar a la cima.
+    """
+    
+    def __init__(self, tamano_maximo: Optional[int] = None, *, capacidad_bytes: int = 64 * 1024 * 1024):
+        self.datos: "OrderedDict[str, CacheItem]" = OrderedDict()
+        self.capacidad_bytes = capacidad_bytes
+        self.tamano_maximo = tamano_maximo  # Límite opcional de número de elementos
+        self.bytes_usados = 0
+        # Se llama con (clave, item) al desalojar por LRU, p. ej. para bajarlo a disco
+        self.al_desalojar: Optional[Callable[[str, CacheItem], None]] = None
+        self.expiraciones: List[Tuple[float, int, str, CacheItem]] = []  # (expira_en, orden, clave, item)
+        self._orden = itertools.count()
         self.hits = 0
         self.misses = 0
+        self.desalojos = 0
     
     def obtener(self, clave: str) -> Optional[Any]:
         """Obtiene un valor de la caché si existe y no ha expirado."""
         item = self.datos.get(clave)
         
         # Si no existe o ha expirado
-        if not item or item.ha_expirado():
+        if item is None or item.ha_expirado():
             self.misses += 1
             if item:
                 # Eliminar elemento expirado
-                del self.datos[clave]
+                self._quitar(clave)
             return None
         
+        self.datos.move_to_end(clave)
         self.hits += 1
         return item.valor
     
+    def vigente(self, clave: str) -> Optional[Any]:
+        """Valor vigente de `clave` sin contarlo como acierto ni moverlo en el orden LRU."""
+        item = self.datos.get(clave)
+        return item.valor if item is not None and not item.ha_expirado() else None
+    
+    def obtener_con_estado(self, clave: str, ventana_obsoleto: float = 0.0) -> Tuple[Optional[Any], bool]:
+        """Como obtener(), pero devuelve también los valores expirados hace menos de `ventana_obsoleto` segundos.
+        
+        Retorna (valor, obsoleto); un valor obsoleto se conserva en la caché
+        hasta que se reemplace o salga de la ventana.
+        """
+        item = self.datos.get(clave)
+        if item is not None:
+            ahora = time.monotonic()
+            if not item.ha_expirado(ahora):
+                self.datos.move_to_end(clave)
+                self.hits += 1
+                return item.valor, False
+            if ahora - item.expira_en <= ventana_obsoleto:
+                self.hits += 1
+                return item.valor, True
+            self._quitar(clave)
+        self.misses += 1
+        return None, False
+    
     def guardar(self, clave: str, valor: Any, tiempo_vida: int = 3600) -> bool:
         """Guarda un valor en la caché."""
-        # Si alcanzamos el tamaño máximo, eliminar elementos
-        if len(self.datos) >= self.tamano_maximo:
-            self._limpiar_antiguos(int(self.tamano_maximo * 0.2))  # Eliminar el 20% más antiguo
+        tamano = tamano_valor(valor)
+        if tamano > self.capacidad_bytes:
+            return False
         
-        # Crear y guardar nuevo item
-        self.datos[clave] = CacheItem(clave, valor, tiempo_vida)
+        if clave in self.datos:
+            self._quitar(clave)
+        item = CacheItem(clave, valor, tiempo_vida, tamano)
+        self.datos[clave] = item
+        self.bytes_usados += tamano
+        heapq.heappush(self.expiraciones, (item.expira_en, next(self._orden), clave, item))
+        
+        # Primero liberar lo expirado; después, desalojar por LRU hasta respetar los límites
+        if self.bytes_usados > self.capacidad_bytes or self._excede_elementos():
+            self.limpiar_expirados()
+        while self.bytes_usados > self.capacidad_bytes or self._excede_elementos():
+            clave_vieja, item_viejo = self.datos.popitem(last=False)
+            self.bytes_usados -= item_viejo.tamano
+            self.desalojos += 1
+            if self.al_desalojar and not item_viejo.ha_expirado():
+                self.al_desalojar(clave_vieja, item_viejo)
+        self._compactar()
         return True
     
+    def _excede_elementos(self) -> bool:
+        return self.tamano_maximo is not None and len(self.datos) > self.tamano_maximo
+    
     def eliminar(self, clave: str) -> bool:
         """Elimina un valor de la caché si existe."""
         if clave in self.datos:
-            del self.datos[clave]
+            self._quitar(clave)
             return True
         return False
     
-    def _limpiar_antiguos(self, cantidad: int) -> int:
-        """Elimina los elementos más antiguos de la caché."""
-        if not self.datos:
-            return 0
-        
-        # Ordenar por antigüedad
-        items_ordenados = sorted(
-            self.datos.items(), 
-            key=lambda x: x[1].timestamp
-        )
-        
-        # Eliminar los más antiguos
-        eliminados = 0
-        for i in range(min(cantidad, len(items_ordenados))):
-            clave, _ = items_ordenados[i]
-            del self.datos[clave]
-            eliminados += 1
-        
-        return eliminados
+    def _quitar(self, clave: str) -> None:
+        item = self.datos.pop(clave)
+        self.bytes_usados -= item.tamano
     
     def limpiar_expirados(self) -> int:
         """Elimina todos los elementos expirados de la caché."""
-        claves_expiradas = [
-            clave for clave, item in self.datos.items() 
-            if item.ha_expirado()
-        ]
-        
-        for clave in claves_expiradas:
-            del self.datos[clave]
-        
-        return len(claves_expiradas)
+        ahora = time.monotonic()
+        eliminados = 0
+        while self.expiraciones and self.expiraciones[0][0] < ahora:
+            _, _, clave, item = heapq.heappop(self.expiraciones)
+            if self.datos.get(clave) is item:
+                self._quitar(clave)
+                eliminados += 1
+        return eliminados
+    
+    def _compactar(self) -> None:
+        """Reconstruye el montículo cuando la mayoría de sus entradas ya no están en la caché."""
+        if len(self.expiraciones) > 1024 and len(self.expiraciones) > 2 * len(self.datos):
+            self.expiraciones = [entrada for entrada in self.expiraciones if self.datos.get(entrada[2]) is entrada[3]]
+            heapq.heapify(self.expiraciones)
+    
+    def _contar_expirados(self) -> int:
+        """Cuenta los expirados recorriendo sólo la parte del montículo con fecha vencida."""
+        ahora = time.monotonic()
+        contador = 0
+        pendientes = [0] if self.expiraciones else []
+        while pendientes:
+            i = pendientes.pop()
+            expira_en, _, clave, item = self.expiraciones[i]
+            if expira_en >= ahora:
+                continue
+            contador += self.datos.get(clave) is item
+            pendientes.extend(hijo for hijo in (2 * i + 1, 2 * i + 2) if hijo < len(self.expiraciones))
+        return contador
+    
+    def limpiar(self) -> int:
+        """Vacía la caché y devuelve el número de elementos eliminados."""
+        elementos = len(self.datos)
+        self.datos.clear()
+        self.expiraciones.clear()
+        self.bytes_usados = 0
+        return elementos
     
     def obtener_estadisticas(self) -> Dict:
         """Retorna estadísticas del uso de la caché."""
@@ -216,14 +313,202 @@ class DictCache:
         
         return {
             "elementos": len(self.datos),
-            "capacidad": self.tamano_maximo,
-            "porcentaje_uso": (len(self.datos) / self.tamano_maximo) * 100,
+            "bytes_usados": self.bytes_usados,
+            "capacidad": self.capacidad_bytes,
+            "porcentaje_uso": (self.bytes_usados / self.capacidad_bytes) * 100,
             "hits": self.hits,
             "misses": self.misses,
+            "desalojos": self.desalojos,
             "tasa_aciertos": tasa_aciertos,
-            "elementos_expirados": sum(1 for item in self.datos.values() if item.ha_expirado())
+            "elementos_expirados": self._contar_expirados()
         }
 
+# Segundo nivel de caché en disco
+# Registro del archivo de segmento: cabecera + clave + tipo de contenido + datos.
+# Un registro con longitud de datos BORRADO anula la clave. Al abrir el archivo
+# se recorre entero para reconstruir el índice, así que la caché sobrevive a
+# los reinicios.
+CABECERA_DISCO = struct.Struct("<IHHIdid")  # magia, len clave, len tipo, len datos, expira_en, código, tiempo_carga
+MAGIA_DISCO = 0xCAC4E001
+BORRADO = 0xFFFFFFFF
+
+class CacheDisco:
+    """Caché de ContenidoWeb en un único archivo de segmento con índice en memoria.
+    
+    Las escrituras se añaden al final del segmento. Las lecturas devuelven un
+    ContenidoWeb cuyos datos son un memoryview sobre el archivo mapeado con
+    mmap, sin copiarlos a nuevos bytes; obtener_vista() los entrega así y
+    obtener_como_bytes() los copia. Cuando el segmento supera
+    `capacidad_bytes` se compacta: se reescriben las entradas vigentes usadas
+    más recientemente hasta llenar tres cuartos de la capacidad.
+    """
+    
+    def __init__(self, directorio: str, capacidad_bytes: int = 512 * 1024 * 1024):
+        os.makedirs(directorio, exist_ok=True)
+        self.ruta = os.path.join(directorio, "segmento.cache")
+        self.capacidad_bytes = capacidad_bytes
+        # clave -> (desplazamiento de los datos, longitud, expira_en, tipo, código, tiempo_carga)
+        self.indice: "OrderedDict[str, Tuple[int, int, float, str, int, float]]" = OrderedDict()
+        self.archivo = open(self.ruta, "a+b")
+        self.fin = 0
+        self._mapa: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.compactaciones = 0
+        self._cargar_indice()
+    
+    def _cargar_indice(self) -> None:
+        """Reconstruye el índice recorriendo los registros del segmento."""
+        tamano = os.fstat(self.archivo.fileno()).st_size
+        if tamano:
+            with mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                posicion = 0
+                while posicion + CABECERA_DISCO.size <= tamano:
+                    magia, l_clave, l_tipo, l_datos, expira_en, codigo, tiempo_carga = \
+                        CABECERA_DISCO.unpack_from(mapa, posicion)
+                    inicio = posicion + CABECERA_DISCO.size
+                    borrado = l_datos == BORRADO
+                    fin = inicio + l_clave + l_tipo + (0 if borrado else l_datos)
+                    if magia != MAGIA_DISCO or fin > tamano:
+                        break  # Registro incompleto (p. ej. tras una caída): se descarta el resto
+                    clave = str(mapa[inicio:inicio + l_clave], "utf-8")
+                    tipo = str(mapa[inicio + l_clave:inicio + l_clave + l_tipo], "utf-8")
+                    self.indice.pop(clave, None)
+                    if not borrado:
+                        self.indice[clave] = (inicio + l_clave + l_tipo, l_datos, expira_en, tipo, codigo, tiempo_carga)
+                    posicion = fin
+            if posicion < tamano:
+                self.archivo.truncate(posicion)
+            tamano = posicion
+        self.fin = tamano
+    
+    def _vista(self, desplazamiento: int, longitud: int) -> memoryview:
+        """Vista de sólo lectura sobre el segmento; vuelve a mapearlo si ha crecido."""
+        if self._mapa is None or desplazamiento + longitud > len(self._mapa):
+            self.archivo.flush()
+            # El mapa anterior sigue vivo mientras haya vistas que lo usen
+            self._mapa = mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mapa)[desplazamiento:desplazamiento + longitud]
+    
+    def _escribir(self, clave: str, contenido: Optional[ContenidoWeb], expira_en: float) -> None:
+        clave_bytes = clave.encode("utf-8")
+        tipo = contenido.tipo_contenido.encode("utf-8") if contenido else b""
+        longitud = len(contenido.datos) if contenido else BORRADO
+        cabecera = CABECERA_DISCO.pack(MAGIA_DISCO, len(clave_bytes), len(tipo), longitud, expira_en,
+                                       contenido.codigo_respuesta if contenido else 0,
+                                       contenido.tiempo_carga if contenido else 0.0)
+        self.archivo.write(cabecera)
+        self.archivo.write(clave_bytes)
+        self.archivo.write(tipo)
+        if contenido:
+            self.archivo.write(contenido.datos)
+            self.indice.pop(clave, None)
+            self.indice[clave] = (self.fin + len(cabecera) + len(clave_bytes) + len(tipo), longitud, expira_en,
+                                  contenido.tipo_contenido, contenido.codigo_respuesta, contenido.tiempo_carga)
+        self.fin += len(cabecera) + len(clave_bytes) + len(tipo) + (longitud if contenido else 0)
+    
+    def obtener(self, clave: str) -> Optional[Tuple[ContenidoWeb, float]]:
+        """Retorna (contenido, segundos de vida restantes) si la clave está vigente en disco."""
+        with self._lock:
+            entrada = self.indice.get(clave)
+            restante = entrada[2] - time.time() if entrada else 0
+            if entrada is None or restante <= 0:
+                self.misses += 1
+                return None
+            self.indice.move_to_end(clave)
+            self.hits += 1
+            desplazamiento, longitud, _, tipo, codigo, tiempo_carga = entrada
+            return ContenidoWeb(self._vista(desplazamiento, longitud), tipo, codigo, longitud, tiempo_carga), restante
+    
+    def guardar(self, clave: str, contenido: ContenidoWeb, tiempo_vida: float) -> bool:
+        """Añade el contenido al segmento con `tiempo_vida` segundos de validez."""
+        if contenido.tamano > self.capacidad_bytes // 2:
+            return False
+        with self._lock:
+            self.archivo.seek(0, os.SEEK_END)
+            self._escribir(clave, contenido, time.time() + tiempo_vida)
+            if self.fin > self.capacidad_bytes:
+                self._compactar()
+            return True
+    
+    def eliminar(self, clave: str) -> bool:
+        """Anula la clave en el segmento."""
+        with self._lock:
+            if self.indice.pop(clave, None) is None:
+                return False
+            self.archivo.seek(0, os.SEEK_END)
+            self._escribir(clave, None, 0.0)
+            return True
+    
+    def __contains__(self, clave: str) -> bool:
+        entrada = self.indice.get(clave)
+        return entrada is not None and entrada[2] > time.time()
+    
+    def _compactar(self) -> None:
+        """Reescribe el segmento con las entradas vigentes más recientes."""
+        self.archivo.flush()
+        ahora = time.time()
+        conservar = []
+        total = 0
+        for clave, entrada in reversed(self.indice.items()):
+            if entrada[2] <= ahora:
+                continue
+            if total + entrada[1] > self.capacidad_bytes * 3 // 4:
+                break
+            conservar.append((clave, entrada))
+            total += entrada[1]
+        
+        with mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ) as origen:
+            temporal, viejo = self._segmento_nuevo()
+            for clave, (desplazamiento, longitud, expira_en, tipo, codigo, tiempo_carga) in reversed(conservar):
+                with memoryview(origen)[desplazamiento:desplazamiento + longitud] as datos:
+                    self._escribir(clave, ContenidoWeb(datos, tipo, codigo, longitud, tiempo_carga), expira_en)
+            self.archivo.flush()
+        self._reemplazar_segmento(temporal, viejo)
+        self.compactaciones += 1
+    
+    def _segmento_nuevo(self) -> Tuple[str, Any]:
+        """Empieza un segmento vacío en un archivo temporal y retorna (ruta temporal, archivo viejo)."""
+        temporal = self.ruta + ".tmp"
+        self.archivo, viejo = open(temporal, "w+b"), self.archivo
+        self.indice = OrderedDict()
+        self.fin = 0
+        return temporal, viejo
+    
+    def _reemplazar_segmento(self, temporal: str, viejo) -> None:
+        # Se reemplaza en lugar de truncar: las vistas ya entregadas conservan el mapa antiguo
+        os.replace(temporal, self.ruta)
+        viejo.close()
+        self._mapa = None
+    
+    def limpiar(self) -> int:
+        """Vacía el segmento y devuelve el número de elementos eliminados."""
+        with self._lock:
+            elementos = len(self.indice)
+            temporal, viejo = self._segmento_nuevo()
+            self._reemplazar_segmento(temporal, viejo)
+            return elementos
+    
+    def obtener_estadisticas(self) -> Dict:
+        """Retorna estadísticas del nivel en disco."""
+        with self._lock:
+            return {
+                "elementos": len(self.indice),
+                "bytes_vigentes": sum(entrada[1] for entrada in self.indice.values()),
+                "tamano_segmento": self.fin,
+                "capacidad": self.capacidad_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "compactaciones": self.compactaciones,
+            }
+    
+    def cerrar(self) -> None:
+        with self._lock:
+            self.archivo.flush()
+            self.archivo.close()
+            self._mapa = None
+
 # Políticas de caché
 class PoliticasCache:
     def __init__(self):
@@ -243,6 +528,13 @@ class PoliticasCache:
         # Tamaño máximo para cachear (en bytes)
         self.tamano_maximo = 10 * 1024 * 1024  # 10 MB
         
+        # Recursos mayores que esto sólo se guardan en disco, para no desplazar
+        # de la memoria a muchos recursos pequeños
+        self.tamano_maximo_memoria = 256 * 1024  # 256 KB
+        
+        # Vida mínima restante para que valga la pena bajar un recurso a disco (en segundos)
+        self.vida_minima_disco = 60
+        
         # URLs que no se deben cachear (patrones)
         self.no_cachear = [
             "/api/auth/",
@@ -274,6 +566,18 @@ class PoliticasCache:
         
         # Por defecto, cachear
         return True
+    
+    def cabe_en_memoria(self, tamano: int) -> bool:
+        """Determina si un recurso puede ocupar la caché en memoria (si no, va directo a disco)."""
+        return tamano <= self.tamano_maximo_memoria
+    
+    def debe_promover(self, tamano: int) -> bool:
+        """Determina si un acierto en disco debe subir a la caché en memoria."""
+        return self.cabe_en_memoria(tamano)
+    
+    def debe_bajar_a_disco(self, tamano: int, vida_restante: float) -> bool:
+        """Determina si un recurso desalojado de memoria debe conservarse en disco."""
+        return vida_restante >= self.vida_minima_disco and tamano <= self.tamano_maximo
 
 # PATRÓN PROXY
 
@@ -329,12 +633,35 @@ class RecursoWebReal(RecursoWeb):
 
 # Proxy: Controla acceso al RecursoWebReal, implementando caché
 class ProxyCacheRecursos(RecursoWeb):
-    def __init__(self, tiempo_limpieza: int = 3600):
-        self.recurso_real = RecursoWebReal()
-        self.cache = DictCache(tamano_maximo=200)
+    """Proxy con caché que agrupa las descargas simultáneas de un mismo recurso.
+    
+    Las descargas se hacen en un pool de hilos y, mientras una está en curso,
+    las demás solicitudes de la misma URL esperan su resultado en lugar de
+    repetirla (single-flight). Con `servir_obsoleto`, un contenido expirado hace
+    menos de `ventana_obsoleto` segundos se devuelve de inmediato y se refresca
+    en segundo plano (stale-while-revalidate).
+    """
+    
+    def __init__(self, tiempo_limpieza: int = 3600, recurso_real: Optional[RecursoWeb] = None,
+                 max_descargas: int = 8, servir_obsoleto: bool = False, ventana_obsoleto: float = 60.0,
+                 directorio_disco: Optional[str] = None):
+        self.recurso_real = recurso_real or RecursoWebReal()
+        self.cache = DictCache(capacidad_bytes=64 * 1024 * 1024)
         self.politicas_cache = PoliticasCache()
+        # Segundo nivel opcional en disco: recibe lo desalojado de memoria y los recursos grandes
+        self.cache_disco = CacheDisco(directorio_disco) if directorio_disco else None
+        self._desalojados: List[Tuple[str, CacheItem]] = []  # Pendientes de bajar a disco, fuera del lock
+        if self.cache_disco:
+            self.cache.al_desalojar = lambda clave, item: self._desalojados.append((clave, item))
         self.ultimo_tiempo_limpieza = time.time()
         self.intervalo_limpieza = tiempo_limpieza  # en segundos
+        self.servir_obsoleto = servir_obsoleto
+        self.ventana_obsoleto = ventana_obsoleto
+        self.descargas = ThreadPoolExecutor(max_workers=max_descargas, thread_name_prefix="proxy-descarga")
+        self.en_vuelo: Dict[str, Future] = {}  # clave -> descarga en curso
+        self.solicitudes_agrupadas = 0
+        self.refrescos_en_segundo_plano = 0
+        self._lock = threading.Lock()  # Protege la caché y `en_vuelo`
     
     def _generar_clave_cache(self, url: str) -> str:
         """Genera una clave única para la caché basada en la URL."""
@@ -344,7 +671,8 @@ class ProxyCacheRecursos(RecursoWeb):
         """Verifica si es tiempo de limpiar la caché."""
         tiempo_actual = time.time()
         if tiempo_actual - self.ultimo_tiempo_limpieza > self.intervalo_limpieza:
-            eliminados = self.cache.limpiar_expirados()
+            with self._lock:
+                eliminados = self.cache.limpiar_expirados()
             if eliminados > 0:
                 print(f"Limpieza automática: {eliminados} elementos expirados eliminados")
             self.ultimo_tiempo_limpieza = tiempo_actual
@@ -354,29 +682,103 @@ class ProxyCacheRecursos(RecursoWeb):
         self._verificar_limpieza()
         
         clave = self._generar_clave_cache(url)
-        contenido_cache = self.cache.obtener(clave)
+        with self._lock:
+            ventana = self.ventana_obsoleto if self.servir_obsoleto else 0.0
+            contenido_cache, obsoleto = self.cache.obtener_con_estado(clave, ventana)
         
-        if contenido_cache:
+        if contenido_cache and not obsoleto:
             print(f"CACHE HIT: {url}")
             return contenido_cache
         
-        print(f"CACHE MISS: {url}")
-        # Obtener del recurso real
-        contenido = self.recurso_real.obtener_contenido(url)
+        if contenido_cache:
+            print(f"CACHE HIT (obsoleto, refrescando): {url}")
+            self._descargar_agrupado(url, clave, en_segundo_plano=True)
+            return contenido_cache
         
-        # Verificar si debemos cachear
-        if self.politicas_cache.debe_cachear(url, contenido.tamano, contenido.tipo_contenido):
-            tiempo_vida = self.politicas_cache.obtener_tiempo_vida(url, contenido.tipo_contenido)
-            self.cache.guardar(clave, contenido, tiempo_vida)
-            print(f"Cacheado: {url} por {tiempo_vida} segundos")
+        if self.cache_disco:
+            en_disco = self.cache_disco.obtener(clave)
+            if en_disco:
+                contenido, vida_restante = en_disco
+                print(f"CACHE HIT (disco): {url}")
+                if self.politicas_cache.debe_promover(contenido.tamano):
+                    self._guardar_en_memoria(clave, contenido, vida_restante)
+                return contenido
         
-        return contenido
+        print(f"CACHE MISS: {url}")
+        return self._descargar_agrupado(url, clave).result()
+    
+    def _guardar_en_memoria(self, clave: str, valor: Any, tiempo_vida: float) -> None:
+        """Guarda en la caché en memoria y baja a disco lo desalojado una vez liberado el lock."""
+        with self._lock:
+            self.cache.guardar(clave, valor, tiempo_vida)
+            desalojados, self._desalojados = self._desalojados, []
+        for clave_desalojada, item in desalojados:
+            self._bajar_a_disco(clave_desalojada, item)
+    
+    def _bajar_a_disco(self, clave: str, item: CacheItem) -> None:
+        """Conserva en disco un recurso desalojado de la memoria, si las políticas lo permiten.
+        
+        Si la clave sigue vigente en disco es la misma versión (se promovió
+        desde allí): cada descarga nueva invalida la copia en disco al guardarse.
+        """
+        vida_restante = item.expira_en - time.monotonic()
+        if (isinstance(item.valor, ContenidoWeb) and clave not in self.cache_disco
+                and self.politicas_cache.debe_bajar_a_disco(item.tamano, vida_restante)):
+            self.cache_disco.guardar(clave, item.valor, vida_restante)
+    
+    def _descargar_agrupado(self, url: str, clave: str, en_segundo_plano: bool = False) -> Future:
+        """Inicia la descarga de `url` en el pool, o se une a la que ya esté en curso."""
+        with self._lock:
+            futuro = self.en_vuelo.get(clave)
+            if futuro is not None:
+                self.solicitudes_agrupadas += 1
+                return futuro
+            # Una descarga pudo terminar entre la consulta a la caché y este punto:
+            # ya habrá cacheado el contenido antes de salir de `en_vuelo`
+            contenido = self.cache.vigente(clave)
+            if contenido is None and not en_segundo_plano and self.cache_disco and clave in self.cache_disco:
+                en_disco = self.cache_disco.obtener(clave)
+                contenido = en_disco[0] if en_disco else None
+            if contenido is not None:
+                futuro = Future()
+                futuro.set_result(contenido)
+                return futuro
+            futuro = self.en_vuelo[clave] = self.descargas.submit(self._descargar, url, clave)
+            if en_segundo_plano:
+                self.refrescos_en_segundo_plano += 1
+            return futuro
+    
+    def _descargar(self, url: str, clave: str) -> ContenidoWeb:
+        """Obtiene el recurso real y lo cachea según las políticas (se ejecuta en el pool)."""
+        try:
+            contenido = self.recurso_real.obtener_contenido(url)
+            
+            # Verificar si debemos cachear
+            if self.politicas_cache.debe_cachear(url, contenido.tamano, contenido.tipo_contenido):
+                tiempo_vida = self.politicas_cache.obtener_tiempo_vida(url, contenido.tipo_contenido)
+                if self.cache_disco and not self.politicas_cache.cabe_en_memoria(contenido.tamano):
+                    with self._lock:
+                        self.cache.eliminar(clave)
+                    self.cache_disco.guardar(clave, contenido, tiempo_vida)
+                    print(f"Cacheado en disco: {url} por {tiempo_vida} segundos")
+                else:
+                    # La copia en disco, si la hay, es de una versión anterior
+                    if self.cache_disco:
+                        self.cache_disco.eliminar(clave)
+                    self._guardar_en_memoria(clave, contenido, tiempo_vida)
+                    print(f"Cacheado: {url} por {tiempo_vida} segundos")
+            
+            return contenido
+        finally:
+            with self._lock:
+                self.en_vuelo.pop(clave, None)
     
     def obtener_metadatos(self, url: str) -> Dict:
         """Obtiene los metadatos de un recurso, usando caché cuando sea posible."""
         # Intentar obtener de la caché primero
         clave = self._generar_clave_cache(url) + "_meta"
-        metadatos_cache = self.cache.obtener(clave)
+        with self._lock:
+            metadatos_cache = self.cache.obtener(clave)
         
         if metadatos_cache:
             print(f"CACHE HIT (metadatos): {url}")
@@ -388,27 +790,46 @@ class ProxyCacheRecursos(RecursoWeb):
         
         # Cachear con un tiempo de vida más corto para metadatos
         tiempo_vida = min(300, self.politicas_cache.obtener_tiempo_vida(url, metadatos.get("tipo_contenido", "")))
-        self.cache.guardar(clave, metadatos, tiempo_vida)
+        self._guardar_en_memoria(clave, metadatos, tiempo_vida)
         
         return metadatos
     
     def invalidar_cache(self, url: str) -> bool:
         """Invalida un elemento de la caché."""
         clave = self._generar_clave_cache(url)
-        eliminado1 = self.cache.eliminar(clave)
-        eliminado2 = self.cache.eliminar(clave + "_meta")
+        with self._lock:
+            eliminado1 = self.cache.eliminar(clave)
+            eliminado2 = self.cache.eliminar(clave + "_meta")
+        if self.cache_disco:
+            eliminado1 = self.cache_disco.eliminar(clave) or eliminado1
         return eliminado1 or eliminado2
     
     def limpiar_cache(self) -> int:
-        """Limpia toda la caché y devuelve el número de elementos eliminados."""
-        elementos = len(self.cache.datos)
-        self.cache.datos.clear()
+        """Limpia ambos niveles de la caché y devuelve el número de elementos eliminados."""
+        with self._lock:
+            elementos = self.cache.limpiar()
+            self._desalojados.clear()
+        if self.cache_disco:
+            elementos += self.cache_disco.limpiar()
         self.ultimo_tiempo_limpieza = time.time()
         return elementos
     
     def obtener_estadisticas_cache(self) -> Dict:
         """Obtiene estadísticas de uso de la caché."""
-        return self.cache.obtener_estadisticas()
+        with self._lock:
+            estadisticas = self.cache.obtener_estadisticas()
+            estadisticas["descargas_en_curso"] = len(self.en_vuelo)
+        estadisticas["solicitudes_agrupadas"] = self.solicitudes_agrupadas
+        estadisticas["refrescos_en_segundo_plano"] = self.refrescos_en_segundo_plano
+        if self.cache_disco:
+            estadisticas["disco"] = self.cache_disco.obtener_estadisticas()
+        return estadisticas
+    
+    def cerrar(self) -> None:
+        """Espera a las descargas en curso y libera el pool de hilos y el archivo de disco."""
+        self.descargas.shutdown(wait=True)
+        if self.cache_disco:
+            self.cache_disco.cerrar()
 
 # Cliente que utiliza el proxy
 class GestorRecursosWeb:
@@ -428,7 +849,7 @@ class GestorRecursosWeb:
         # En un sistema real, aquí convertiríamos los bytes a un objeto de imagen
         print(f"Imagen cargada: {len(contenido.datos)} bytes de tipo {contenido.tipo_contenido}")
         
-        return contenido.datos
+        return contenido.obtener_como_bytes()
     
     def obtener_datos_api(self, url: str) -> Dict:
         """Obtiene datos de una API REST."""
@@ -468,12 +889,40 @@ class GestorRecursosWeb:
         """Muestra estadísticas de uso de la caché."""
         stats = self.proxy_cache.obtener_estadisticas_cache()
         print("\n=== Estadísticas de Caché ===")
-        print(f"Elementos en caché: {stats['elementos']}/{stats['capacidad']} ({stats['porcentaje_uso']:.1f}%)")
+        print(f"Elementos en caché: {stats['elementos']} "
+              f"({stats['bytes_usados'] / 1024:.1f}/{stats['capacidad'] / 1024:.0f} KB, {stats['porcentaje_uso']:.1f}%)")
         print(f"Hits/Misses: {stats['hits']}/{stats['misses']}")
         print(f"Tasa de aciertos: {stats['tasa_aciertos']:.1f}%")
         print(f"Elementos expirados pendientes de limpieza: {stats['elementos_expirados']}")
         print("=============================\n")
 
+def demostrar_cache_en_disco(directorio: str, recurso_real: Optional[RecursoWeb] = None) -> Dict:
+    """Muestra que el nivel en disco sobrevive a un reinicio y sirve los recursos grandes sin copiarlos."""
+    url_grande = "https://example.com/grande.jpg"
+    resultado = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        proxy = ProxyCacheRecursos(recurso_real=recurso_real, directorio_disco=directorio)
+        # Umbral bajo para que la imagen simulada (unos 20 KB) cuente como recurso grande
+        proxy.politicas_cache.tamano_maximo_memoria = 1024
+        t_inicio = time.time()
+        proxy.obtener_contenido(url_grande)
+        resultado["latencia_descarga_ms"] = (time.time() - t_inicio) * 1000
+        resultado["en_memoria_tras_descarga"] = len(proxy.cache.datos)
+        proxy.cerrar()
+        
+        # Un proxy nuevo sobre el mismo directorio arranca con la caché caliente
+        proxy = ProxyCacheRecursos(recurso_real=recurso_real, directorio_disco=directorio)
+        proxy.politicas_cache.tamano_maximo_memoria = 1024
+        t_inicio = time.time()
+        contenido = proxy.obtener_contenido(url_grande)
+        resultado["latencia_tras_reinicio_ms"] = (time.time() - t_inicio) * 1000
+        resultado["tipo_datos"] = type(contenido.datos).__name__
+        resultado["bytes"] = contenido.tamano
+        resultado["disco"] = proxy.cache_disco.obtener_estadisticas()
+        del contenido
+        proxy.cerrar()
+    return resultado
+
 # Ejemplo de uso
 if __name__ == "__main__":
     # Crear el gestor que usa el proxy
@@ -534,4 +983,11 @@ if __name__ == "__main__":
     print(f"Metadatos: {info}")
     
     # Mostrar estadísticas finales
-    gestor.mostrar_estadisticas_cache()
\ No newline at end of file
+    gestor.mostrar_estadisticas_cache()
+    
+    # Segundo nivel en disco que persiste entre reinicios
+    print("\n=== Caché en disco ===")
+    import tempfile
+    with tempfile.TemporaryDirectory() as directorio:
+        for clave, valor in demostrar_cache_en_disco(directorio).items():
+            print(f"{clave}: {valor}")
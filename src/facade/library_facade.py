@@ -1,20 +1,47 @@
 # -*- coding: utf-8 -*
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
 # Importando las clases de los subsistemas
 
 from src.subsystems.user_management import SistemaUsuarios
 from src.subsystems.book_catalog import CatalogoLibros
 from src.subsystems.loan_system import SistemaPrestamos
 from src.subsystems.notification_service import ServicioNotificaciones
-from src.models.models import Usuario, Libro, Prestamo
+from src.subsystems.scheduler import PlanificadorRecordatorios
+from src.subsystems.loan_reports import GeneradorReportes
+from src.subsystems.reservation_system import SistemaReservas
+from src.subsystems.change_stream import FlujoCambios, Suscripcion
+from src.subsystems.binary_format import ArchivoBiblioteca
+from src.subsystems.id_allocator import AsignadorIds
+from src.subsystems.memory_accounting import PerfiladorMemoria, medir_estructuras
+from src.subsystems.snapshots import GestorInstantaneas, Instantanea
+from src.models.models import Usuario, Libro, Prestamo, EventoCambio
 
 class FachadaBiblioteca:
-    def __init__(self):
-        self.sistema_usuarios = SistemaUsuarios()
-        self.catalogo_libros = CatalogoLibros()
-        self.sistema_prestamos = SistemaPrestamos(self.catalogo_libros)
-        self.servicio_notificaciones = ServicioNotificaciones()
+    def __init__(self, catalogo_libros: Optional[CatalogoLibros] = None,
+                 asignador_ids: Optional[AsignadorIds] = None,
+                 planificador: Optional[PlanificadorRecordatorios] = None):
+        self.flujo_cambios = FlujoCambios()
+        self.sistema_usuarios = SistemaUsuarios(self.flujo_cambios, asignador_ids)
+        # Permite sustituir el catálogo, p. ej. por un CatalogoLibrosPaginado
+        self.catalogo_libros = catalogo_libros or CatalogoLibros(asignador_ids=asignador_ids)
+        if self.catalogo_libros.flujo_cambios is None:
+            self.catalogo_libros.flujo_cambios = self.flujo_cambios
+        self.sistema_prestamos = SistemaPrestamos(self.catalogo_libros, self.flujo_cambios, asignador_ids)
+        # Permite inyectar un planificador con otro reloj, p. ej. en pruebas o simulaciones
+        self.servicio_notificaciones = ServicioNotificaciones(planificador=planificador)
+        self.generador_reportes = GeneradorReportes(self.sistema_prestamos)
+        self.sistema_reservas = SistemaReservas()
+        self.archivo_biblioteca = ArchivoBiblioteca(self.sistema_usuarios, self.catalogo_libros,
+                                                    self.sistema_prestamos)
+        self.perfilador_memoria: Optional[PerfiladorMemoria] = None
+        # Días de antelación de los recordatorios programados; None mientras no se activen
+        self.dias_aviso_recordatorio: Optional[int] = None
+        # Instantáneas copy-on-write del catálogo y los préstamos para lecturas largas
+        self.gestor_instantaneas = GestorInstantaneas()
+        self.catalogo_libros.versiones = self.gestor_instantaneas.registrar("libros", self.catalogo_libros.libros)
+        self.sistema_prestamos.versiones = self.gestor_instantaneas.registrar("prestamos",
+                                                                              self.sistema_prestamos.prestamos)
     
     def registrar_usuario(self, nombre: str, email: str) -> Usuario:
         """Crea un nuevo usuario en el sistema y envía email de bienvenida."""
@@ -36,9 +63,23 @@ class FachadaBiblioteca:
         """Agrega un nuevo libro al catálogo."""
         return self.catalogo_libros.agregar_libro(titulo, autor, isbn)
     
-    def buscar_libro(self, titulo: str) -> List[Libro]:
-        """Busca libros por título."""
-        return self.catalogo_libros.buscar_por_titulo(titulo)
+    def buscar_libro(self, titulo: str, solo_disponibles: bool = False) -> List[Libro]:
+        """Busca libros por título, opcionalmente sólo los disponibles."""
+        return self.catalogo_libros.buscar_por_titulo(titulo, solo_disponibles)
+    
+    def consultar_libros(self, titulo: str = "", autor: str = "", isbn: str = "",
+                         disponible: Optional[bool] = None) -> List[Libro]:
+        """Busca libros combinando título, autor, prefijo de ISBN y disponibilidad."""
+        return self.catalogo_libros.consultar(titulo, autor, isbn, disponible)
+    
+    def explicar_consulta_libros(self, titulo: str = "", autor: str = "", isbn: str = "",
+                                 disponible: Optional[bool] = None, analizar: bool = False) -> str:
+        """Plan que seguiría consultar_libros() con los mismos predicados."""
+        return self.catalogo_libros.explicar_consulta(titulo, autor, isbn, disponible, analizar)
+    
+    def contar_libros_disponibles(self) -> int:
+        """Devuelve el número de libros disponibles para préstamo."""
+        return self.catalogo_libros.contar_disponibles()
     
     def realizar_prestamo(self, id_usuario: int, id_libro: int) -> Optional[Prestamo]:
         """Realiza un préstamo completo: verifica elegibilidad, crea préstamo y notifica."""
@@ -107,11 +148,58 @@ class FachadaBiblioteca:
         contenido += "\nAtentamente,\nSistema de Biblioteca Digital"
         self.servicio_notificaciones.enviar_email(usuario.email, asunto, contenido)
         
+        # Entregar el ejemplar al siguiente usuario en espera, si lo hay
+        self._asignar_reserva(id_libro)
+        
         return True
     
-    def enviar_recordatorios_vencimiento(self) -> int:
-        """Envía recordatorios para préstamos a punto de vencer (3 días o menos)."""
+    def _asignar_reserva(self, id_libro: int) -> Optional[Prestamo]:
+        """Presta el libro al primer usuario elegible de su cola de espera."""
+        id_usuario = self.sistema_reservas.siguiente(id_libro)
+        while id_usuario is not None:
+            prestamo = self.realizar_prestamo(id_usuario, id_libro)
+            if prestamo:
+                return prestamo
+            id_usuario = self.sistema_reservas.siguiente(id_libro)
+        return None
+    
+    def reservar_libro(self, id_usuario: int, id_libro: int) -> Optional[int]:
+        """Pone al usuario en la cola de espera de un libro prestado y devuelve su posición."""
+        if not self.sistema_usuarios.buscar_usuario(id_usuario):
+            print(f"Usuario {id_usuario} no encontrado")
+            return None
+        
+        if not self.catalogo_libros.obtener_libro(id_libro):
+            print(f"Libro {id_libro} no encontrado")
+            return None
+        
+        if self.catalogo_libros.esta_disponible(id_libro):
+            print(f"El libro {id_libro} está disponible, no es necesario reservarlo")
+            return None
+        
+        return self.sistema_reservas.reservar(id_usuario, id_libro)
+    
+    def cancelar_reserva(self, id_usuario: int, id_libro: int) -> bool:
+        """Retira al usuario de la cola de espera de un libro."""
+        return self.sistema_reservas.cancelar(id_usuario, id_libro)
+    
+    def obtener_posicion_reserva(self, id_usuario: int, id_libro: int) -> Optional[int]:
+        """Devuelve la posición del usuario en la cola de espera de un libro."""
+        return self.sistema_reservas.obtener_posicion(id_usuario, id_libro)
+    
+    def obtener_longitud_cola_reservas(self, id_libro: int) -> int:
+        """Devuelve cuántos usuarios esperan un libro."""
+        return self.sistema_reservas.longitud_cola(id_libro)
+    
+    def enviar_recordatorios_vencimiento(self, resumen: bool = False) -> int:
+        """Envía recordatorios para préstamos a punto de vencer (3 días o menos).
+        
+        Con `resumen=True` se envía un solo aviso por usuario con todos sus
+        préstamos próximos a vencer, omitiendo los ya recordados recientemente.
+        """
         # Esta función podría ejecutarse diariamente mediante un programador de tareas
+        if resumen:
+            return self._enviar_resumen_vencimientos()
         
         contador_notificaciones = 0
         for prestamo in self.sistema_prestamos.prestamos.values():
@@ -129,4 +217,163 @@ class FachadaBiblioteca:
                     self.servicio_notificaciones.notificar_vencimiento(prestamo, usuario)
                     contador_notificaciones += 1
         
-        return contador_notificaciones
\ No newline at end of file
+        return contador_notificaciones
+    
+    def _enviar_resumen_vencimientos(self) -> int:
+        """Agrupa por usuario los préstamos a punto de vencer y envía un aviso a cada uno."""
+        ahora = datetime.now()
+        por_usuario: Dict[int, List[Prestamo]] = {}
+        for prestamo in self.sistema_prestamos.prestamos.values():
+            if prestamo.fecha_devolucion:
+                continue
+            if 0 <= (prestamo.fecha_vencimiento - ahora).days <= 3:
+                por_usuario.setdefault(prestamo.id_usuario, []).append(prestamo)
+        
+        self.servicio_notificaciones.purgar_recordatorios_recientes()
+        contador_notificaciones = 0
+        for id_usuario, prestamos in por_usuario.items():
+            usuario = self.sistema_usuarios.buscar_usuario(id_usuario)
+            if not usuario:
+                continue
+            titulos = {}
+            for prestamo in prestamos:
+                libro = self.catalogo_libros.obtener_libro(prestamo.id_libro)
+                if libro:
+                    titulos[prestamo.id_libro] = libro.titulo
+            if self.servicio_notificaciones.notificar_vencimientos(usuario, prestamos, titulos):
+                contador_notificaciones += 1
+        
+        return contador_notificaciones
+    
+    def obtener_estadisticas_circulacion(self, n: int = 10) -> Dict:
+        """Contadores, duración media y rankings de préstamos, sin recorrer el historial."""
+        return self.sistema_prestamos.estadisticas.resumen(n)
+    
+    def abrir_instantanea(self) -> Instantanea:
+        """Abre una vista consistente y de sólo lectura del catálogo y los préstamos.
+        
+        Los préstamos y devoluciones siguen funcionando mientras está abierta;
+        sólo copian la versión previa de cada entidad que modifican. Hay que
+        cerrarla (o usarla con `with`) al terminar.
+        """
+        return self.gestor_instantaneas.abrir()
+    
+    def generar_reporte_prestamos(self, num_procesos: Optional[int] = None,
+                                  instantanea: Optional[Instantanea] = None) -> Dict:
+        """Genera el reporte de multas, vencidos y actividad por usuario en paralelo."""
+        prestamos = instantanea["prestamos"].values() if instantanea else None
+        return self.generador_reportes.generar_reporte(num_procesos, prestamos=prestamos)
+    
+    def suscribir_cambios(self, callback: Callable[[List[EventoCambio]], None],
+                          tamano_lote: int = 100, desde: Optional[int] = None) -> Suscripcion:
+        """Suscribe un consumidor al flujo de cambios de usuarios, libros y préstamos."""
+        return self.flujo_cambios.suscribir(callback, tamano_lote, desde)
+    
+    def exportar_datos(self, ruta: str, instantanea: Optional[Instantanea] = None) -> int:
+        """Exporta usuarios, libros y préstamos a un archivo binario compacto."""
+        return self.archivo_biblioteca.exportar(ruta, instantanea)
+    
+    def importar_datos(self, ruta: str) -> Dict[str, int]:
+        """Carga usuarios, libros y préstamos desde un archivo exportado, sin enviar notificaciones.
+        
+        Las reservas en espera se descartan. La importación no pasa por
+        crear_prestamo, así que los recordatorios programados se cancelan y,
+        si están activados, se vuelven a programar para los préstamos importados.
+        """
+        conteos = self.archivo_biblioteca.importar(ruta)
+        # Las colas de espera no se exportan y apuntan a usuarios y libros sustituidos
+        self.sistema_reservas.colas.clear()
+        self.servicio_notificaciones.cancelar_recordatorios()
+        if self.dias_aviso_recordatorio is not None:
+            self._programar_recordatorios_activos()
+        return conteos
+    
+    def obtener_uso_memoria(self) -> Dict[str, Dict[str, int]]:
+        """Retorna, por subsistema e índice, el número de entidades y los bytes aproximados retenidos.
+        
+        Las estructuras que no guardan entidades, como el mapa de bits de
+        disponibilidad, los índices del catálogo o las estadísticas de
+        circulación, sólo informan de sus bytes.
+        
+        Los objetos compartidos entre estructuras se atribuyen a la primera
+        que los referencia, en el orden de la lista.
+        """
+        notificaciones = self.servicio_notificaciones
+        return medir_estructuras([
+            ("usuarios", self.sistema_usuarios.usuarios),
+            ("libros", self.catalogo_libros.libros),
+            ("mapa_disponibilidad", self.catalogo_libros.mapa_disponibilidad, None),
+            ("indices_catalogo", self.catalogo_libros.indices, None),
+            ("prestamos", self.sistema_prestamos.prestamos),
+            ("estadisticas_circulacion", self.sistema_prestamos.estadisticas, None),
+            ("reservas", self.sistema_reservas.colas),
+            ("notificaciones_enviadas", notificaciones.notificaciones_enviadas),
+            ("recordatorios_recientes", notificaciones.recordatorios_recientes),
+            ("recordatorios_programados", notificaciones.recordatorios_programados),
+            ("planificador", notificaciones.planificador.monticulo),
+            ("flujo_cambios", self.flujo_cambios.eventos, self.flujo_cambios.retenidos),
+        ])
+    
+    def iniciar_perfil_memoria(self, num_marcos: int = 25) -> None:
+        """Empieza a seguir las asignaciones con tracemalloc y toma la instantánea de referencia."""
+        self.perfilador_memoria = PerfiladorMemoria(num_marcos)
+        self.perfilador_memoria.iniciar()
+    
+    def comparar_perfil_memoria(self) -> Dict[str, Dict[str, int]]:
+        """Atribuye a cada subsistema el crecimiento de memoria desde la última instantánea."""
+        if not self.perfilador_memoria:
+            raise ValueError("Llame primero a iniciar_perfil_memoria()")
+        return self.perfilador_memoria.comparar()
+    
+    def detener_perfil_memoria(self) -> None:
+        """Deja de seguir las asignaciones de memoria."""
+        if self.perfilador_memoria:
+            self.perfilador_memoria.detener()
+            self.perfilador_memoria = None
+    
+    def activar_recordatorios_programados(self, dias_antes: int = 3) -> None:
+        """Programa un recordatorio por préstamo `dias_antes` días antes de su vencimiento.
+        
+        Los recordatorios se mantienen al día observando el sistema de
+        préstamos: se programan al crear el préstamo, se mueven al extender el
+        plazo y se cancelan al devolver el libro. Se disparan con procesar_recordatorios()
+        o con el hilo del planificador (servicio_notificaciones.planificador.iniciar()).
+        """
+        if self.dias_aviso_recordatorio is None:
+            self.sistema_prestamos.observadores.append(self._sincronizar_recordatorio)
+        self.dias_aviso_recordatorio = dias_antes
+        self.servicio_notificaciones.resolver_email = self._email_usuario
+        # Los préstamos ya activos no volverán a publicar "crear"
+        self._programar_recordatorios_activos()
+    
+    def procesar_recordatorios(self) -> int:
+        """Dispara los recordatorios programados cuya fecha ya llegó."""
+        return self.servicio_notificaciones.procesar_recordatorios()
+    
+    def _email_usuario(self, id_usuario: int) -> Optional[str]:
+        usuario = self.sistema_usuarios.buscar_usuario(id_usuario)
+        return usuario.email if usuario else None
+    
+    def _sincronizar_recordatorio(self, operacion: str, prestamo: Prestamo) -> None:
+        """Programa, mueve o cancela el recordatorio del préstamo modificado."""
+        if operacion == "finalizar":
+            self.servicio_notificaciones.cancelar_recordatorio(f"prestamo:{prestamo.id}")
+        else:
+            self._programar_recordatorio_prestamo(prestamo)
+    
+    def _programar_recordatorios_activos(self) -> None:
+        for prestamo in list(self.sistema_prestamos.prestamos.values()):
+            if not prestamo.fecha_devolucion:
+                self._programar_recordatorio_prestamo(prestamo)
+    
+    def _programar_recordatorio_prestamo(self, prestamo: Prestamo) -> None:
+        libro_info = self.catalogo_libros.obtener_informacion_detallada(prestamo.id_libro)
+        mensaje = (
+            f"Su préstamo del libro '{libro_info.get('titulo', 'Libro')}' vence el "
+            f"{prestamo.fecha_vencimiento.strftime('%d/%m/%Y')}. "
+            f"Por favor, devuélvalo a tiempo para evitar multas."
+        )
+        fecha = prestamo.fecha_vencimiento - timedelta(days=self.dias_aviso_recordatorio)
+        # Programar de nuevo la misma clave reemplaza el recordatorio anterior
+        self.servicio_notificaciones.programar_recordatorio(prestamo.id_usuario, fecha, mensaje,
+                                                            f"prestamo:{prestamo.id}")
@@ -0,0 +1,543 @@
+# -*- coding: utf-8 -*
+import multiprocessing
+import os
+import sys
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.models.models import Usuario, Libro, Prestamo, EventoCambio
+from src.subsystems.change_stream import Suscripcion
+from src.subsystems.snapshots import Instantanea
+
+# Despliegue fragmentado: usuarios, libros y préstamos se reparten entre N procesos.
+# Cada fragmento numera sus entidades con IDs de la forma indice + 1 + k * N,
+# por lo que el fragmento dueño de cualquier ID es (id - 1) % N.
+# Los préstamos viven en el fragmento del libro (así la disponibilidad se
+# comprueba y cambia de forma atómica) y se replican en el fragmento del
+# usuario para verificar elegibilidad, notificar y enviar recordatorios.
+
+
+class _FragmentoBiblioteca:
+    """Estado y operaciones de un fragmento; se ejecuta dentro de su proceso."""
+
+    def __init__(self, indice: int, num_fragmentos: int):
+        self.fachada = FachadaBiblioteca()
+        for subsistema in (self.fachada.sistema_usuarios,
+                           self.fachada.catalogo_libros,
+                           self.fachada.sistema_prestamos):
+            subsistema.contador_id = indice + 1
+            subsistema.paso_id = num_fragmentos
+        # Préstamos activos de los usuarios de este fragmento (vivan donde vivan)
+        self.prestamos_usuarios: Dict[int, Dict[int, Prestamo]] = {}
+        self.titulos_prestamos: Dict[int, str] = {}
+
+    def registrar_usuario(self, nombre: str, email: str) -> Usuario:
+        return self.fachada.registrar_usuario(nombre, email)
+
+    def agregar_libro(self, titulo: str, autor: str, isbn: str) -> Libro:
+        return self.fachada.agregar_libro(titulo, autor, isbn)
+
+    def buscar_libro(self, titulo: str, solo_disponibles: bool) -> List[Libro]:
+        return self.fachada.buscar_libro(titulo, solo_disponibles)
+
+    def consultar_libros(self, titulo: str, autor: str, isbn: str, disponible: Optional[bool]) -> List[Libro]:
+        return self.fachada.consultar_libros(titulo, autor, isbn, disponible)
+
+    def explicar_consulta_libros(self, titulo: str, autor: str, isbn: str, disponible: Optional[bool],
+                                 analizar: bool) -> str:
+        return self.fachada.explicar_consulta_libros(titulo, autor, isbn, disponible, analizar)
+
+    def contar_libros_disponibles(self) -> int:
+        return self.fachada.contar_libros_disponibles()
+
+    def obtener_estadisticas_circulacion(self, n: int) -> Dict:
+        """Resumen del fragmento con los conteos completos por usuario, para sumarlos en el router.
+
+        Los préstamos de un usuario viven en los fragmentos de sus libros, así
+        que sus conteos están repartidos y el ranking de usuarios sólo es
+        exacto tras sumarlos; el de libros ya lo es en cada fragmento.
+        """
+        estadisticas = self.fachada.sistema_prestamos.estadisticas
+        with estadisticas._lock:
+            resumen = estadisticas.resumen(n)
+            resumen["usuarios_mas_activos"] = dict(estadisticas.usuarios.conteos)
+            resumen["ventana"]["usuarios_mas_activos"] = dict(estadisticas.usuarios_ventana.conteos)
+            resumen["segundos_prestamo"] = estadisticas.segundos_prestamo
+            resumen["ventana"]["segundos_prestamo"] = estadisticas.segundos_ventana
+            resumen["ventana"]["devoluciones"] = estadisticas.devoluciones_ventana
+        return resumen
+
+    def generar_reporte_prestamos(self, fecha_corte: datetime) -> Dict:
+        # Un proceso fragmento es daemon y no puede abrir un pool propio
+        return self.fachada.generador_reportes.generar_reporte(1, fecha_corte)
+
+    def obtener_uso_memoria(self) -> Dict[str, Dict[str, int]]:
+        return self.fachada.obtener_uso_memoria()
+
+    def iniciar_perfil_memoria(self, num_marcos: int) -> None:
+        self.fachada.iniciar_perfil_memoria(num_marcos)
+
+    def comparar_perfil_memoria(self) -> Dict[str, Dict[str, int]]:
+        return self.fachada.comparar_perfil_memoria()
+
+    def detener_perfil_memoria(self) -> None:
+        self.fachada.detener_perfil_memoria()
+
+    def verificar_usuario(self, id_usuario: int) -> Tuple[Optional[Usuario], bool]:
+        """Devuelve el usuario y si es elegible para un nuevo préstamo."""
+        usuario = self.fachada.sistema_usuarios.buscar_usuario(id_usuario)
+        activos = self.prestamos_usuarios.get(id_usuario, {})
+        return usuario, not any(p.esta_vencido for p in activos.values())
+
+    def crear_prestamo(self, id_usuario: int, id_libro: int) -> Optional[Tuple[Prestamo, str]]:
+        """Crea el préstamo en el fragmento dueño del libro."""
+        prestamo = self.fachada.sistema_prestamos.crear_prestamo(id_usuario, id_libro)
+        if not prestamo:
+            return None
+        return prestamo, self.fachada.catalogo_libros.obtener_libro(id_libro).titulo
+
+    def vincular_prestamo(self, prestamo: Prestamo, titulo: str) -> None:
+        """Registra el préstamo en el fragmento del usuario y notifica la confirmación."""
+        self.prestamos_usuarios.setdefault(prestamo.id_usuario, {})[prestamo.id] = prestamo
+        self.titulos_prestamos[prestamo.id] = titulo
+        usuario = self.fachada.sistema_usuarios.buscar_usuario(prestamo.id_usuario)
+        asunto = f"Confirmación de préstamo: {titulo}"
+        contenido = (
+            f"Estimado/a {usuario.nombre},\n\n"
+            f"Confirmamos su préstamo del libro '{titulo}'.\n"
+            f"Fecha de devolución: {prestamo.fecha_vencimiento.strftime('%d/%m/%Y')}\n\n"
+            f"Atentamente,\nSistema de Biblioteca Digital"
+        )
+        self.fachada.servicio_notificaciones.enviar_email(usuario.email, asunto, contenido)
+
+    def finalizar_prestamo(self, id_prestamo: int) -> Optional[Tuple[int, int, str, float]]:
+        """Finaliza el préstamo en el fragmento del libro; devuelve usuario, libro, título y multa."""
+        sistema_prestamos = self.fachada.sistema_prestamos
+        prestamo = sistema_prestamos.prestamos.get(id_prestamo)
+        if not prestamo:
+            print(f"Préstamo {id_prestamo} no encontrado")
+            return None
+        multa = sistema_prestamos.calcular_multa(id_prestamo)
+        if not sistema_prestamos.finalizar_prestamo(id_prestamo):
+            return None
+        titulo = self.fachada.catalogo_libros.obtener_libro(prestamo.id_libro).titulo
+        return prestamo.id_usuario, prestamo.id_libro, titulo, multa
+
+    def deshacer_prestamo(self, id_prestamo: int) -> None:
+        """Finaliza un préstamo que no se pudo vincular, dejando el libro disponible otra vez."""
+        self.fachada.sistema_prestamos.finalizar_prestamo(id_prestamo)
+
+    def olvidar_prestamo(self, id_usuario: int, id_prestamo: int) -> None:
+        """Retira un préstamo del fragmento del usuario sin notificar (al deshacer un vínculo a medias)."""
+        self.prestamos_usuarios.get(id_usuario, {}).pop(id_prestamo, None)
+        self.titulos_prestamos.pop(id_prestamo, None)
+
+    def desvincular_prestamo(self, id_usuario: int, id_prestamo: int, titulo: str, multa: float) -> None:
+        """Retira el préstamo del fragmento del usuario y notifica la devolución."""
+        self.prestamos_usuarios.get(id_usuario, {}).pop(id_prestamo, None)
+        self.titulos_prestamos.pop(id_prestamo, None)
+        usuario = self.fachada.sistema_usuarios.buscar_usuario(id_usuario)
+        asunto = f"Confirmación de devolución: {titulo}"
+        contenido = (
+            f"Estimado/a {usuario.nombre},\n\n"
+            f"Confirmamos la devolución del libro '{titulo}'.\n"
+        )
+        if multa > 0:
+            contenido += f"Se ha generado una multa de ${multa:.2f} por devolución tardía.\n"
+        contenido += "\nAtentamente,\nSistema de Biblioteca Digital"
+        self.fachada.servicio_notificaciones.enviar_email(usuario.email, asunto, contenido)
+
+    def obtener_prestamos_activos(self, id_usuario: int) -> List[Prestamo]:
+        """Préstamos activos de un usuario de este fragmento, vivan donde vivan sus libros."""
+        return sorted(self.prestamos_usuarios.get(id_usuario, {}).values(), key=lambda p: p.id)
+
+    def reservar_libro(self, id_usuario: int, id_libro: int) -> Optional[int]:
+        """Encola la reserva en el fragmento del libro si éste está prestado."""
+        catalogo = self.fachada.catalogo_libros
+        if not catalogo.obtener_libro(id_libro):
+            print(f"Libro {id_libro} no encontrado")
+            return None
+        if catalogo.esta_disponible(id_libro):
+            print(f"El libro {id_libro} está disponible, no es necesario reservarlo")
+            return None
+        return self.fachada.sistema_reservas.reservar(id_usuario, id_libro)
+
+    def siguiente_reserva(self, id_libro: int) -> Optional[int]:
+        return self.fachada.sistema_reservas.siguiente(id_libro)
+
+    def cancelar_reserva(self, id_usuario: int, id_libro: int) -> bool:
+        return self.fachada.cancelar_reserva(id_usuario, id_libro)
+
+    def obtener_posicion_reserva(self, id_usuario: int, id_libro: int) -> Optional[int]:
+        return self.fachada.obtener_posicion_reserva(id_usuario, id_libro)
+
+    def obtener_longitud_cola_reservas(self, id_libro: int) -> int:
+        return self.fachada.obtener_longitud_cola_reservas(id_libro)
+
+    def enviar_recordatorios_vencimiento(self, resumen: bool) -> int:
+        """Envía recordatorios de los préstamos activos de los usuarios de este fragmento."""
+        servicio = self.fachada.servicio_notificaciones
+        ahora = datetime.now()
+        if resumen:
+            servicio.purgar_recordatorios_recientes()
+        contador_notificaciones = 0
+        for id_usuario, activos in self.prestamos_usuarios.items():
+            usuario = self.fachada.sistema_usuarios.buscar_usuario(id_usuario)
+            proximos = [p for p in activos.values() if 0 <= (p.fecha_vencimiento - ahora).days <= 3]
+            if resumen:
+                titulos = {p.id_libro: self.titulos_prestamos[p.id] for p in proximos}
+                if proximos and servicio.notificar_vencimientos(usuario, proximos, titulos):
+                    contador_notificaciones += 1
+                continue
+            for prestamo in proximos:
+                servicio.notificar_vencimiento(prestamo, usuario)
+                contador_notificaciones += 1
+        return contador_notificaciones
+
+
+def _ejecutar_fragmento(conexion, indice: int, num_fragmentos: int, silencioso: bool) -> None:
+    """Bucle del proceso trabajador: atiende lotes de llamadas hasta recibir None."""
+    if silencioso:
+        sys.stdout = open(os.devnull, "w")
+    fragmento = _FragmentoBiblioteca(indice, num_fragmentos)
+    while True:
+        lote = conexion.recv()
+        if lote is None:
+            break
+        respuestas = []
+        for metodo, args in lote:
+            try:
+                respuestas.append((True, getattr(fragmento, metodo)(*args)))
+            except Exception as error:
+                respuestas.append((False, error))
+        conexion.send(respuestas)
+    conexion.close()
+
+
+def _sumar_por_clave(parciales: Iterable[Dict[str, Dict[str, int]]]) -> Dict[str, Dict[str, int]]:
+    """Suma campo a campo los diccionarios {nombre: {campo: valor}} de cada fragmento."""
+    total: Dict[str, Dict[str, int]] = {}
+    for parcial in parciales:
+        for nombre, datos in parcial.items():
+            acumulado = total.setdefault(nombre, {})
+            for campo, valor in datos.items():
+                acumulado[campo] = acumulado.get(campo, 0) + valor
+    return total
+
+
+def _combinar_estadisticas(parciales: List[Dict], n: int) -> Dict:
+    """Junta los resúmenes de circulación de los fragmentos en uno con la forma de resumen()."""
+
+    def combinar(resumenes: List[Dict], prestamos: str, devoluciones: str) -> Dict:
+        segundos = sum(r["segundos_prestamo"] for r in resumenes)
+        total_devoluciones = sum(r[devoluciones] for r in resumenes)
+        usuarios = Counter()
+        for r in resumenes:
+            usuarios.update(r["usuarios_mas_activos"])
+        libros = sorted((par for r in resumenes for par in r["libros_mas_prestados"]), key=lambda par: -par[1])
+        return {
+            prestamos: sum(r[prestamos] for r in resumenes),
+            "duracion_media_dias": segundos / total_devoluciones / 86400 if total_devoluciones else 0.0,
+            "libros_mas_prestados": libros[:n],
+            "usuarios_mas_activos": sorted(usuarios.items(), key=lambda par: -par[1])[:n],
+        }
+
+    historico = combinar(parciales, "total_prestamos", "total_devoluciones")
+    ventana = combinar([p["ventana"] for p in parciales], "prestamos", "devoluciones")
+    return {
+        "total_prestamos": historico["total_prestamos"],
+        "prestamos_activos": sum(p["prestamos_activos"] for p in parciales),
+        "total_devoluciones": sum(p["total_devoluciones"] for p in parciales),
+        "duracion_media_dias": historico["duracion_media_dias"],
+        "libros_mas_prestados": historico["libros_mas_prestados"],
+        "usuarios_mas_activos": historico["usuarios_mas_activos"],
+        "ventana": {"dias": parciales[0]["ventana"]["dias"], **ventana},
+    }
+
+
+class FachadaBibliotecaFragmentada:
+    """Router con la misma interfaz que FachadaBiblioteca sobre N procesos fragmento.
+
+    Las operaciones que necesitan un estado global en un solo proceso
+    (instantáneas, flujo de cambios, exportación e importación y
+    recordatorios programados) lanzan NotImplementedError.
+    """
+
+    def __init__(self, num_fragmentos: Optional[int] = None, silencioso: bool = False):
+        self.num_fragmentos = num_fragmentos or os.cpu_count() or 1
+        self._conexiones = []
+        self._procesos = []
+        for indice in range(self.num_fragmentos):
+            extremo_local, extremo_remoto = multiprocessing.Pipe()
+            proceso = multiprocessing.Process(
+                target=_ejecutar_fragmento,
+                args=(extremo_remoto, indice, self.num_fragmentos, silencioso),
+                daemon=True,
+            )
+            proceso.start()
+            extremo_remoto.close()
+            self._conexiones.append(extremo_local)
+            self._procesos.append(proceso)
+        # Las altas se reparten en turno rotativo; el ID resultante fija el fragmento
+        self._siguiente_usuario = 0
+        self._siguiente_libro = 0
+
+    def _fragmento_de(self, id_entidad: int) -> int:
+        """Fragmento dueño de un ID de usuario, libro o préstamo."""
+        return (id_entidad - 1) % self.num_fragmentos
+
+    def _enviar_lote(self, peticiones: List[Tuple[int, str, tuple]]) -> List[Tuple[bool, Any]]:
+        """Envía las peticiones agrupadas por fragmento y espera todas en paralelo; devuelve (éxito, valor)."""
+        por_fragmento: Dict[int, List[int]] = {}
+        for posicion, (fragmento, _, _) in enumerate(peticiones):
+            por_fragmento.setdefault(fragmento, []).append(posicion)
+
+        for fragmento, posiciones in por_fragmento.items():
+            self._conexiones[fragmento].send([peticiones[p][1:] for p in posiciones])
+
+        respuestas: List[Tuple[bool, Any]] = [(True, None)] * len(peticiones)
+        for fragmento, posiciones in por_fragmento.items():
+            for posicion, respuesta in zip(posiciones, self._conexiones[fragmento].recv()):
+                respuestas[posicion] = respuesta
+        return respuestas
+
+    def _llamar_lote(self, peticiones: List[Tuple[int, str, tuple]]) -> List[Any]:
+        """Como _enviar_lote, pero devuelve sólo los valores y relanza el primer error."""
+        respuestas = self._enviar_lote(peticiones)
+        for exito, valor in respuestas:
+            if not exito:
+                raise valor
+        return [valor for _, valor in respuestas]
+
+    def _llamar(self, fragmento: int, metodo: str, *args) -> Any:
+        return self._llamar_lote([(fragmento, metodo, args)])[0]
+
+    def registrar_usuario(self, nombre: str, email: str) -> Usuario:
+        """Crea un nuevo usuario en el siguiente fragmento y envía email de bienvenida."""
+        fragmento = self._siguiente_usuario
+        self._siguiente_usuario = (fragmento + 1) % self.num_fragmentos
+        return self._llamar(fragmento, "registrar_usuario", nombre, email)
+
+    def agregar_libro(self, titulo: str, autor: str, isbn: str) -> Libro:
+        """Agrega un nuevo libro al catálogo del siguiente fragmento."""
+        return self.agregar_libros_lote([(titulo, autor, isbn)])[0]
+
+    def agregar_libros_lote(self, datos_libros: List[Tuple[str, str, str]]) -> List[Libro]:
+        """Agrega varios libros repartiéndolos entre fragmentos en una sola ronda."""
+        peticiones = []
+        for titulo, autor, isbn in datos_libros:
+            peticiones.append((self._siguiente_libro, "agregar_libro", (titulo, autor, isbn)))
+            self._siguiente_libro = (self._siguiente_libro + 1) % self.num_fragmentos
+        return self._llamar_lote(peticiones)
+
+    def buscar_libro(self, titulo: str, solo_disponibles: bool = False) -> List[Libro]:
+        """Busca libros por título en todos los fragmentos en paralelo."""
+        parciales = self._llamar_todos("buscar_libro", titulo, solo_disponibles)
+        return sorted((libro for parcial in parciales for libro in parcial), key=lambda l: l.id)
+
+    def _llamar_todos(self, metodo: str, *args) -> List[Any]:
+        """Llama al mismo método en todos los fragmentos en paralelo."""
+        return self._llamar_lote([(fragmento, metodo, args) for fragmento in range(self.num_fragmentos)])
+
+    def consultar_libros(self, titulo: str = "", autor: str = "", isbn: str = "",
+                         disponible: Optional[bool] = None) -> List[Libro]:
+        """Busca libros combinando título, autor, prefijo de ISBN y disponibilidad en todos los fragmentos."""
+        parciales = self._llamar_todos("consultar_libros", titulo, autor, isbn, disponible)
+        return sorted((libro for parcial in parciales for libro in parcial), key=lambda l: l.id)
+
+    def explicar_consulta_libros(self, titulo: str = "", autor: str = "", isbn: str = "",
+                                 disponible: Optional[bool] = None, analizar: bool = False) -> str:
+        """Plan de cada fragmento para la consulta; cada uno planifica con sus propios índices."""
+        planes = self._llamar_todos("explicar_consulta_libros", titulo, autor, isbn, disponible, analizar)
+        return "\n".join(f"fragmento {fragmento}:\n{plan}" for fragmento, plan in enumerate(planes))
+
+    def contar_libros_disponibles(self) -> int:
+        """Suma los libros disponibles de todos los fragmentos."""
+        return sum(self._llamar_todos("contar_libros_disponibles"))
+
+    def realizar_prestamo(self, id_usuario: int, id_libro: int) -> Optional[Prestamo]:
+        """Realiza un préstamo aunque usuario y libro estén en fragmentos distintos."""
+        return self.realizar_prestamos_lote([(id_usuario, id_libro)])[0]
+
+    def realizar_prestamos_lote(self, solicitudes: List[Tuple[int, int]]) -> List[Optional[Prestamo]]:
+        """Realiza varios préstamos en tres rondas paralelas: verificar, crear y vincular."""
+        resultados: List[Optional[Prestamo]] = [None] * len(solicitudes)
+
+        # 1. Verificar existencia y elegibilidad en el fragmento de cada usuario
+        verificaciones = self._llamar_lote(
+            [(self._fragmento_de(id_usuario), "verificar_usuario", (id_usuario,))
+             for id_usuario, _ in solicitudes]
+        )
+        aptas = []
+        for posicion, ((id_usuario, id_libro), (usuario, elegible)) in enumerate(zip(solicitudes, verificaciones)):
+            if not usuario:
+                print(f"Usuario {id_usuario} no encontrado")
+            elif not elegible:
+                print(f"Usuario {id_usuario} no es elegible (tiene préstamos vencidos)")
+            else:
+                aptas.append(posicion)
+
+        # 2. Crear el préstamo en el fragmento del libro (dueño de la disponibilidad)
+        creados = self._enviar_lote(
+            [(self._fragmento_de(solicitudes[p][1]), "crear_prestamo", solicitudes[p]) for p in aptas]
+        )
+
+        # 3. Vincular en el fragmento del usuario, que además envía la confirmación
+        pendientes = []
+        for posicion, (exito, creado) in zip(aptas, creados):
+            if not exito:
+                print(f"No se pudo crear el préstamo {solicitudes[posicion]}: {creado}")
+            elif creado:
+                pendientes.append((posicion, *creado))
+        vinculos = self._enviar_lote(
+            [(self._fragmento_de(prestamo.id_usuario), "vincular_prestamo", (prestamo, titulo))
+             for _, prestamo, titulo in pendientes]
+        )
+
+        # Un préstamo sin vincular no lo vería el fragmento del usuario: se deshace
+        deshacer = []
+        for (posicion, prestamo, _), (exito, error) in zip(pendientes, vinculos):
+            if exito:
+                resultados[posicion] = prestamo
+                continue
+            print(f"No se pudo vincular el préstamo {prestamo.id}, se deshace: {error}")
+            deshacer.append((self._fragmento_de(prestamo.id), "deshacer_prestamo", (prestamo.id,)))
+            deshacer.append((self._fragmento_de(prestamo.id_usuario), "olvidar_prestamo",
+                             (prestamo.id_usuario, prestamo.id)))
+        self._llamar_lote(deshacer)
+
+        return resultados
+
+    def devolver_libro(self, id_prestamo: int) -> bool:
+        """Procesa la devolución en el fragmento del libro y notifica desde el del usuario."""
+        finalizado = self._llamar(self._fragmento_de(id_prestamo), "finalizar_prestamo", id_prestamo)
+        if not finalizado:
+            return False
+        id_usuario, id_libro, titulo, multa = finalizado
+        self._llamar(self._fragmento_de(id_usuario), "desvincular_prestamo",
+                     id_usuario, id_prestamo, titulo, multa)
+
+        # Entregar el ejemplar al siguiente usuario en espera, si lo hay
+        fragmento_libro = self._fragmento_de(id_libro)
+        id_siguiente = self._llamar(fragmento_libro, "siguiente_reserva", id_libro)
+        while id_siguiente is not None and not self.realizar_prestamo(id_siguiente, id_libro):
+            id_siguiente = self._llamar(fragmento_libro, "siguiente_reserva", id_libro)
+        return True
+
+    def obtener_prestamos_activos(self, id_usuario: int) -> List[Prestamo]:
+        """Devuelve los préstamos activos de un usuario desde su fragmento."""
+        return self._llamar(self._fragmento_de(id_usuario), "obtener_prestamos_activos", id_usuario)
+
+    def reservar_libro(self, id_usuario: int, id_libro: int) -> Optional[int]:
+        """Pone al usuario en la cola de espera de un libro prestado y devuelve su posición."""
+        usuario, _ = self._llamar(self._fragmento_de(id_usuario), "verificar_usuario", id_usuario)
+        if not usuario:
+            print(f"Usuario {id_usuario} no encontrado")
+            return None
+        return self._llamar(self._fragmento_de(id_libro), "reservar_libro", id_usuario, id_libro)
+
+    def cancelar_reserva(self, id_usuario: int, id_libro: int) -> bool:
+        """Retira al usuario de la cola de espera de un libro."""
+        return self._llamar(self._fragmento_de(id_libro), "cancelar_reserva", id_usuario, id_libro)
+
+    def obtener_posicion_reserva(self, id_usuario: int, id_libro: int) -> Optional[int]:
+        """Devuelve la posición del usuario en la cola de espera de un libro."""
+        return self._llamar(self._fragmento_de(id_libro), "obtener_posicion_reserva", id_usuario, id_libro)
+
+    def obtener_longitud_cola_reservas(self, id_libro: int) -> int:
+        """Devuelve cuántos usuarios esperan un libro."""
+        return self._llamar(self._fragmento_de(id_libro), "obtener_longitud_cola_reservas", id_libro)
+
+    def enviar_recordatorios_vencimiento(self, resumen: bool = False) -> int:
+        """Envía recordatorios de vencimiento desde todos los fragmentos en paralelo."""
+        return sum(self._llamar_todos("enviar_recordatorios_vencimiento", resumen))
+
+    def obtener_estadisticas_circulacion(self, n: int = 10) -> Dict:
+        """Contadores, duración media y rankings de préstamos sumando los de todos los fragmentos."""
+        return _combinar_estadisticas(self._llamar_todos("obtener_estadisticas_circulacion", n), n)
+
+    def generar_reporte_prestamos(self, num_procesos: Optional[int] = None,
+                                  instantanea: Optional[Instantanea] = None) -> Dict:
+        """Genera el reporte de multas, vencidos y actividad por usuario en todos los fragmentos.
+
+        Los fragmentos ya trabajan en paralelo, así que `num_procesos` se
+        ignora. Cada préstamo vive en un solo fragmento, de modo que los
+        parciales se suman sin contar nada dos veces.
+        """
+        if instantanea is not None:
+            self._no_disponible("generar_reporte_prestamos con instantánea")
+        fecha_corte = datetime.now()
+        reporte = {"fecha_corte": fecha_corte, "total_prestamos": 0, "prestamos_activos": 0,
+                   "total_multas": 0.0, "vencidos": [], "actividad_usuarios": {}}
+        for parcial in self._llamar_todos("generar_reporte_prestamos", fecha_corte):
+            for campo in ("total_prestamos", "prestamos_activos", "total_multas"):
+                reporte[campo] += parcial[campo]
+            reporte["vencidos"].extend(parcial["vencidos"])
+            reporte["actividad_usuarios"] = _sumar_por_clave([reporte["actividad_usuarios"],
+                                                              parcial["actividad_usuarios"]])
+        reporte["vencidos"].sort()
+        return reporte
+
+    def obtener_uso_memoria(self) -> Dict[str, Dict[str, int]]:
+        """Entidades y bytes por estructura, sumados sobre todos los fragmentos."""
+        return _sumar_por_clave(self._llamar_todos("obtener_uso_memoria"))
+
+    def iniciar_perfil_memoria(self, num_marcos: int = 25) -> None:
+        """Empieza a seguir las asignaciones de memoria en todos los fragmentos."""
+        self._llamar_todos("iniciar_perfil_memoria", num_marcos)
+
+    def comparar_perfil_memoria(self) -> Dict[str, Dict[str, int]]:
+        """Crecimiento de memoria por subsistema, sumado sobre todos los fragmentos."""
+        crecimiento = _sumar_por_clave(self._llamar_todos("comparar_perfil_memoria"))
+        return dict(sorted(crecimiento.items(), key=lambda elemento: -elemento[1]["bytes"]))
+
+    def detener_perfil_memoria(self) -> None:
+        """Deja de seguir las asignaciones de memoria en todos los fragmentos."""
+        self._llamar_todos("detener_perfil_memoria")
+
+    @staticmethod
+    def _no_disponible(operacion: str):
+        raise NotImplementedError(f"{operacion} no está disponible en la biblioteca fragmentada")
+
+    def abrir_instantanea(self) -> Instantanea:
+        """No disponible: una instantánea no puede abarcar a la vez varios procesos."""
+        self._no_disponible("abrir_instantanea")
+
+    def suscribir_cambios(self, callback: Callable[[List[EventoCambio]], None],
+                          tamano_lote: int = 100, desde: Optional[int] = None) -> Suscripcion:
+        """No disponible: cada fragmento numera sus propios cambios y no hay una secuencia global."""
+        self._no_disponible("suscribir_cambios")
+
+    def exportar_datos(self, ruta: str, instantanea: Optional[Instantanea] = None) -> int:
+        """No disponible: el formato binario describe una sola biblioteca con IDs consecutivos."""
+        self._no_disponible("exportar_datos")
+
+    def importar_datos(self, ruta: str) -> Dict[str, int]:
+        """No disponible: el formato binario describe una sola biblioteca con IDs consecutivos."""
+        self._no_disponible("importar_datos")
+
+    def activar_recordatorios_programados(self, dias_antes: int = 3) -> None:
+        """No disponible: use enviar_recordatorios_vencimiento(), que recorre cada fragmento."""
+        self._no_disponible("activar_recordatorios_programados")
+
+    def procesar_recordatorios(self) -> int:
+        """No disponible: use enviar_recordatorios_vencimiento(), que recorre cada fragmento."""
+        self._no_disponible("procesar_recordatorios")
+
+    def cerrar(self) -> None:
+        """Detiene los procesos fragmento."""
+        for conexion in self._conexiones:
+            conexion.send(None)
+            conexion.close()
+        for proceso in self._procesos:
+            proceso.join()
+        self._conexiones = []
+        self._procesos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cerrar()
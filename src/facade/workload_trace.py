@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*
+import argparse
+import contextlib
+import dataclasses
+import functools
+import gzip
+import inspect
+import io
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.facade.library_facade import FachadaBiblioteca
+
+# Traza de carga: archivo JSON Lines comprimido con gzip. La primera línea es
+# una cabecera y cada una de las siguientes describe una llamada a la fachada:
+#   [segundos desde el inicio, método, argumentos, resumen del resultado]
+# El resumen reduce los modelos a su tipo e ID para poder comparar resultados
+# entre ejecuciones sin depender de fechas ni de textos de notificación.
+VERSION_TRAZA = 1
+
+# Métodos públicos de la fachada que no se graban: devuelven objetos vivos o
+# reciben callbacks que no se pueden reproducir, leen o escriben archivos fuera
+# de la biblioteca, o sólo instrumentan el proceso sin formar parte de la carga.
+METODOS_EXCLUIDOS = frozenset({
+    "abrir_instantanea",
+    "suscribir_cambios",
+    "exportar_datos",
+    "importar_datos",
+    "obtener_uso_memoria",
+    "iniciar_perfil_memoria",
+    "comparar_perfil_memoria",
+    "detener_perfil_memoria",
+})
+
+# Se graban todos los demás, de modo que un método nuevo de la fachada entra
+# en las trazas sin tener que acordarse de añadirlo aquí
+METODOS_GRABADOS = tuple(
+    nombre for nombre, _ in inspect.getmembers(FachadaBiblioteca, inspect.isfunction)
+    if not nombre.startswith("_") and nombre not in METODOS_EXCLUIDOS
+)
+
+# Su resultado depende del reloj (multas, duraciones, recordatorios vencidos),
+# así que al reproducir se miden pero no se comparan
+RESULTADO_VARIABLE = frozenset({
+    "generar_reporte_prestamos",
+    "obtener_estadisticas_circulacion",
+    "procesar_recordatorios",
+})
+
+
+def resumir_resultado(resultado: Any) -> Any:
+    """Reduce un resultado de la fachada a una forma JSON comparable."""
+    if dataclasses.is_dataclass(resultado):
+        return {"tipo": type(resultado).__name__, "id": getattr(resultado, "id", None)}
+    if isinstance(resultado, (list, tuple)):
+        return [resumir_resultado(elemento) for elemento in resultado]
+    if isinstance(resultado, dict):
+        return {str(clave): resumir_resultado(valor) for clave, valor in resultado.items()}
+    if resultado is None or isinstance(resultado, (bool, int, float, str)):
+        return resultado
+    return type(resultado).__name__
+
+
+class GrabadorTrazas:
+    """Graba en un archivo cada llamada pública hecha a una fachada.
+
+    Sustituye los métodos de METODOS_GRABADOS en la instancia por envoltorios
+    que anotan la llamada. Sólo se graban las llamadas de primer nivel: las que
+    la propia fachada hace internamente (p. ej. realizar_prestamo al asignar
+    una reserva tras una devolución) se reproducen solas.
+    """
+
+    def __init__(self, fachada: FachadaBiblioteca, ruta: str):
+        self.fachada = fachada
+        self.ruta = ruta
+        self.llamadas_grabadas = 0
+        self._archivo = gzip.open(ruta, "wt", encoding="utf-8")
+        self._archivo.write(json.dumps({"version": VERSION_TRAZA, "metodos": list(METODOS_GRABADOS)}) + "\n")
+        self._inicio = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Profundidad de llamadas anidadas por hilo
+        for metodo in METODOS_GRABADOS:
+            setattr(fachada, metodo, self._envolver(metodo, getattr(fachada, metodo)))
+
+    def _envolver(self, metodo: str, original):
+        @functools.wraps(original)
+        def envoltorio(*args, **kwargs):
+            profundidad = getattr(self._local, "profundidad", 0)
+            if profundidad:
+                return original(*args, **kwargs)
+            instante = time.perf_counter() - self._inicio
+            self._local.profundidad = 1
+            try:
+                resultado = original(*args, **kwargs)
+            finally:
+                self._local.profundidad = 0
+            self._anotar(instante, metodo, args, kwargs, resultado)
+            return resultado
+        return envoltorio
+
+    def _anotar(self, instante: float, metodo: str, args: tuple, kwargs: Dict, resultado: Any) -> None:
+        argumentos = {"args": list(args), "kwargs": kwargs} if kwargs else list(args)
+        # Un argumento no serializable (p. ej. una instantánea) se graba como null
+        linea = json.dumps([round(instante, 6), metodo, argumentos, resumir_resultado(resultado)],
+                           ensure_ascii=False, separators=(",", ":"), default=lambda _: None)
+        with self._lock:
+            if self._archivo is None:
+                return
+            self._archivo.write(linea + "\n")
+            self.llamadas_grabadas += 1
+
+    def detener(self) -> int:
+        """Restaura los métodos de la fachada, cierra el archivo y retorna las llamadas grabadas."""
+        for metodo in METODOS_GRABADOS:
+            self.fachada.__dict__.pop(metodo, None)
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+        return self.llamadas_grabadas
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.detener()
+
+
+def leer_traza(ruta: str) -> List[list]:
+    """Carga las llamadas de una traza grabada."""
+    with gzip.open(ruta, "rt", encoding="utf-8") as archivo:
+        cabecera = json.loads(archivo.readline())
+        if cabecera.get("version") != VERSION_TRAZA:
+            raise ValueError(f"Versión de traza no soportada: {cabecera.get('version')}")
+        return [json.loads(linea) for linea in archivo if linea.strip()]
+
+
+def _percentil(muestras: List[float], fraccion: float) -> float:
+    return muestras[min(len(muestras) - 1, int(len(muestras) * fraccion))]
+
+
+class ReproductorTrazas:
+    """Vuelve a ejecutar una traza contra una fachada y mide cada operación.
+
+    Con `velocidad=1.0` respeta los tiempos originales entre llamadas, con
+    2.0 los reduce a la mitad y con 0 ejecuta tan rápido como puede.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.llamadas = leer_traza(ruta)
+
+    def reproducir(self, fachada: Optional[FachadaBiblioteca] = None, velocidad: float = 0.0,
+                   silencioso: bool = True, max_discrepancias: int = 100) -> Dict:
+        """Reproduce la traza y retorna latencias por operación y discrepancias.
+
+        Una llamada que lanza una excepción cuenta como discrepancia, con el
+        error como valor obtenido, y la reproducción continúa.
+        """
+        if velocidad < 0:
+            raise ValueError("La velocidad no puede ser negativa")
+        fachada = fachada or FachadaBiblioteca()
+        latencias: Dict[str, List[float]] = {}
+        discrepancias = []
+        total_discrepancias = 0
+        salida = contextlib.redirect_stdout(io.StringIO()) if silencioso else contextlib.nullcontext()
+
+        inicio = time.perf_counter()
+        with salida:
+            for numero, (instante, metodo, argumentos, esperado) in enumerate(self.llamadas):
+                if velocidad > 0:
+                    espera = instante / velocidad - (time.perf_counter() - inicio)
+                    if espera > 0:
+                        time.sleep(espera)
+                args, kwargs = (argumentos["args"], argumentos["kwargs"]) if isinstance(argumentos, dict) \
+                    else (argumentos, {})
+                comienzo = time.perf_counter()
+                try:
+                    obtenido = resumir_resultado(getattr(fachada, metodo)(*args, **kwargs))
+                    fallo = False
+                except Exception as error:
+                    # La grabación sólo anota llamadas que terminaron bien
+                    obtenido = {"error": f"{type(error).__name__}: {error}"}
+                    fallo = True
+                latencias.setdefault(metodo, []).append(time.perf_counter() - comienzo)
+
+                if fallo or (obtenido != esperado and metodo not in RESULTADO_VARIABLE):
+                    total_discrepancias += 1
+                    if len(discrepancias) < max_discrepancias:
+                        discrepancias.append({"llamada": numero, "metodo": metodo, "argumentos": argumentos,
+                                              "esperado": esperado, "obtenido": obtenido})
+        duracion = time.perf_counter() - inicio
+
+        operaciones = {}
+        for metodo, muestras in latencias.items():
+            muestras.sort()
+            operaciones[metodo] = {
+                "llamadas": len(muestras),
+                "media_us": sum(muestras) / len(muestras) * 1e6,
+                "p50_us": _percentil(muestras, 0.50) * 1e6,
+                "p90_us": _percentil(muestras, 0.90) * 1e6,
+                "p99_us": _percentil(muestras, 0.99) * 1e6,
+                "max_us": muestras[-1] * 1e6,
+            }
+        return {
+            "llamadas": len(self.llamadas),
+            "duracion_s": duracion,
+            "operaciones_por_segundo": len(self.llamadas) / duracion if duracion > 0 else 0.0,
+            "operaciones": operaciones,
+            "total_discrepancias": total_discrepancias,
+            "discrepancias": discrepancias,
+        }
+
+
+def imprimir_informe(informe: Dict) -> None:
+    print(f"{informe['llamadas']} llamadas en {informe['duracion_s']:.3f} s "
+          f"({informe['operaciones_por_segundo']:.0f} ops/s)")
+    print(f"{'operación':>34} {'llamadas':>9} {'p50 µs':>9} {'p90 µs':>9} {'p99 µs':>9} {'máx µs':>10}")
+    for metodo, datos in sorted(informe["operaciones"].items()):
+        print(f"{metodo:>34} {datos['llamadas']:9d} {datos['p50_us']:9.1f} {datos['p90_us']:9.1f} "
+              f"{datos['p99_us']:9.1f} {datos['max_us']:10.1f}")
+    print(f"Discrepancias: {informe['total_discrepancias']}")
+    for discrepancia in informe["discrepancias"][:10]:
+        print(f"  #{discrepancia['llamada']} {discrepancia['metodo']}({discrepancia['argumentos']}): "
+              f"esperado {discrepancia['esperado']}, obtenido {discrepancia['obtenido']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduce una traza de llamadas a la fachada")
+    parser.add_argument("traza", help="archivo grabado con GrabadorTrazas")
+    parser.add_argument("--velocidad", type=float, default=0.0,
+                        help="1 = tiempo real, 2 = doble de rápido, 0 = sin esperas (por defecto)")
+    parser.add_argument("--json", action="store_true", help="imprimir el informe completo en JSON")
+    argumentos = parser.parse_args()
+
+    informe = ReproductorTrazas(argumentos.traza).reproducir(velocidad=argumentos.velocidad)
+    if argumentos.json:
+        print(json.dumps(informe, ensure_ascii=False, indent=2))
+    else:
+        imprimir_informe(informe)
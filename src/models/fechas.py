@@ -0,0 +1,18 @@
+from datetime import datetime, timedelta
+
+# Fechas como microsegundos desde EPOCA, para serializarlas como enteros
+# conservando la aritmética exacta de datetime (sin zonas horarias ni
+# redondeos de float).
+EPOCA = datetime(1970, 1, 1)
+MICROS_DIA = 86_400_000_000
+SIN_DEVOLUCION = -(2 ** 63)  # Valor reservado para una fecha ausente
+
+
+def fecha_a_micros(fecha: datetime) -> int:
+    """Convierte una fecha en microsegundos desde EPOCA."""
+    return (fecha - EPOCA) // timedelta(microseconds=1)
+
+
+def micros_a_fecha(micros: int) -> datetime:
+    """Convierte microsegundos desde EPOCA en una fecha."""
+    return EPOCA + timedelta(microseconds=micros)
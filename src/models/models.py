@@ -45,4 +45,16 @@ class Prestamo:
     
     def __str__(self):
         estado = "activo" if not self.fecha_devolucion else "devuelto"
-        return f"Prestamo(id={self.id}, libro={self.id_libro}, usuario={self.id_usuario}, {estado})"
\ No newline at end of file
+        return f"Prestamo(id={self.id}, libro={self.id_libro}, usuario={self.id_usuario}, {estado})"
+
+@dataclass
+class EventoCambio:
+    secuencia: int
+    entidad: str  # "usuario", "libro" o "prestamo"
+    operacion: str  # "crear", "actualizar", "disponibilidad", "finalizar", "extender"
+    id_entidad: int
+    datos: Dict = field(default_factory=dict)
+    fecha: datetime = field(default_factory=datetime.now)
+    
+    def __str__(self):
+        return f"EventoCambio(#{self.secuencia}, {self.entidad}:{self.id_entidad} {self.operacion})"
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*
+import argparse
+import asyncio
+import contextlib
+import dataclasses
+import io
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.facade.workload_trace import GrabadorTrazas
+from src.models.models import Prestamo
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional; sin él se usa json de la biblioteca estándar
+    orjson = None
+
+# Servidor HTTP/1.1 asíncrono (asyncio) con conexiones persistentes que expone
+# la fachada como API JSON:
+#   POST /usuarios                      {"nombre", "email"}
+#   POST /libros                        {"titulo", "autor", "isbn"}
+#   GET  /libros?titulo=..&solo_disponibles=1
+#   POST /prestamos                     {"id_usuario", "id_libro"}
+#   POST /prestamos/<id>/devolucion
+#   POST /recordatorios                 {"resumen": bool}
+#   POST /lote                          [{"operacion": nombre, "argumentos": {...}}, ...]
+# La fachada no es segura entre hilos: todas las operaciones se ejecutan en el
+# hilo del bucle de eventos, una tras otra.
+
+RAZONES = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+TAMANO_MAXIMO_CUERPO = 1024 * 1024
+
+
+def _convertir(objeto: Any) -> Any:
+    """Convierte modelos y fechas a tipos serializables en JSON."""
+    if dataclasses.is_dataclass(objeto):
+        datos = dict(vars(objeto))
+        if isinstance(objeto, Prestamo):
+            datos["fecha_vencimiento"] = objeto.fecha_vencimiento
+        return datos
+    if isinstance(objeto, datetime):
+        return objeto.isoformat()
+    raise TypeError(f"No se puede serializar {type(objeto).__name__}")
+
+
+if orjson is not None:
+    def codificar_json(datos: Any) -> bytes:
+        return orjson.dumps(datos, default=_convertir, option=orjson.OPT_PASSTHROUGH_DATACLASS)
+
+    decodificar_json = orjson.loads
+else:
+    _codificador = json.JSONEncoder(default=_convertir, ensure_ascii=False, separators=(",", ":"))
+
+    def codificar_json(datos: Any) -> bytes:
+        return _codificador.encode(datos).encode("utf-8")
+
+    decodificar_json = json.loads
+
+
+class ErrorSolicitud(Exception):
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class ServidorBibliotecaHTTP:
+    def __init__(self, fachada: FachadaBiblioteca, host: str = "127.0.0.1", puerto: int = 8080,
+                 silencioso: bool = False):
+        self.fachada = fachada
+        self.host = host
+        self.puerto = puerto
+        self.silencioso = silencioso  # Oculta los print() de los subsistemas
+        self.solicitudes_atendidas = 0
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        # Operaciones disponibles por nombre (también para /lote)
+        self.operaciones: Dict[str, Callable[[Dict], Tuple[int, Any]]] = {
+            "registrar_usuario": self._registrar_usuario,
+            "agregar_libro": self._agregar_libro,
+            "buscar_libro": self._buscar_libro,
+            "realizar_prestamo": self._realizar_prestamo,
+            "devolver_libro": self._devolver_libro,
+            "enviar_recordatorios_vencimiento": self._enviar_recordatorios,
+        }
+
+    # Operaciones: reciben los argumentos ya decodificados y devuelven (estado, respuesta)
+
+    def _registrar_usuario(self, argumentos: Dict) -> Tuple[int, Any]:
+        return 201, self.fachada.registrar_usuario(str(argumentos["nombre"]), str(argumentos["email"]))
+
+    def _agregar_libro(self, argumentos: Dict) -> Tuple[int, Any]:
+        return 201, self.fachada.agregar_libro(str(argumentos["titulo"]), str(argumentos["autor"]),
+                                               str(argumentos["isbn"]))
+
+    def _buscar_libro(self, argumentos: Dict) -> Tuple[int, Any]:
+        solo_disponibles = str(argumentos.get("solo_disponibles", "")).lower() in ("1", "true", "si", "sí")
+        return 200, self.fachada.buscar_libro(str(argumentos.get("titulo", "")), solo_disponibles)
+
+    def _realizar_prestamo(self, argumentos: Dict) -> Tuple[int, Any]:
+        prestamo = self.fachada.realizar_prestamo(int(argumentos["id_usuario"]), int(argumentos["id_libro"]))
+        if not prestamo:
+            return 409, {"error": "No se pudo realizar el préstamo"}
+        return 201, prestamo
+
+    def _devolver_libro(self, argumentos: Dict) -> Tuple[int, Any]:
+        if not self.fachada.devolver_libro(int(argumentos["id_prestamo"])):
+            return 404, {"error": "Préstamo no encontrado o ya devuelto"}
+        return 200, {"devuelto": True}
+
+    def _enviar_recordatorios(self, argumentos: Dict) -> Tuple[int, Any]:
+        enviados = self.fachada.enviar_recordatorios_vencimiento(bool(argumentos.get("resumen", False)))
+        return 200, {"enviados": enviados}
+
+    def _ejecutar(self, operacion: str, argumentos: Dict) -> Tuple[int, Any]:
+        manejador = self.operaciones.get(operacion)
+        if manejador is None:
+            return 404, {"error": f"Operación desconocida: {operacion}"}
+        try:
+            if self.silencioso:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return manejador(argumentos)
+            return manejador(argumentos)
+        except (KeyError, TypeError, ValueError) as error:
+            return 400, {"error": f"Argumentos inválidos: {error}"}
+
+    def _ejecutar_lote(self, operaciones: Any) -> Tuple[int, Any]:
+        if not isinstance(operaciones, list):
+            raise ErrorSolicitud(400, "El lote debe ser una lista de operaciones")
+        resultados = []
+        for elemento in operaciones:
+            if not isinstance(elemento, dict):
+                resultados.append({"estado": 400, "respuesta": {"error": "Operación inválida"}})
+                continue
+            estado, respuesta = self._ejecutar(str(elemento.get("operacion")), elemento.get("argumentos") or {})
+            resultados.append({"estado": estado, "respuesta": respuesta})
+        return 200, resultados
+
+    def _enrutar(self, metodo: str, ruta: str, consulta: Dict, cuerpo: Any) -> Tuple[int, Any]:
+        partes = [parte for parte in ruta.split("/") if parte]
+        if partes == ["libros"] and metodo == "GET":
+            return self._ejecutar("buscar_libro", consulta)
+        if metodo != "POST":
+            raise ErrorSolicitud(405 if partes else 404, f"{metodo} {ruta} no soportado")
+        if partes == ["lote"]:
+            return self._ejecutar_lote(cuerpo)
+        argumentos = cuerpo if isinstance(cuerpo, dict) else {}
+        if partes == ["usuarios"]:
+            return self._ejecutar("registrar_usuario", argumentos)
+        if partes == ["libros"]:
+            return self._ejecutar("agregar_libro", argumentos)
+        if partes == ["prestamos"]:
+            return self._ejecutar("realizar_prestamo", argumentos)
+        if len(partes) == 3 and partes[0] == "prestamos" and partes[2] == "devolucion":
+            return self._ejecutar("devolver_libro", {"id_prestamo": partes[1]})
+        if partes == ["recordatorios"]:
+            return self._ejecutar("enviar_recordatorios_vencimiento", argumentos)
+        raise ErrorSolicitud(404, f"Ruta no encontrada: {ruta}")
+
+    @staticmethod
+    async def _leer_linea(lector: asyncio.StreamReader) -> bytes:
+        try:
+            return await lector.readline()
+        except ValueError:
+            # La línea supera el límite del StreamReader (64 KiB): no se puede seguir leyendo la solicitud
+            raise ErrorSolicitud(431, "Línea de solicitud o cabecera demasiado larga")
+
+    async def _responder(self, escritor: asyncio.StreamWriter, estado: int, respuesta: Any, mantener: bool) -> None:
+        contenido = codificar_json(respuesta)
+        escritor.write(
+            f"HTTP/1.1 {estado} {RAZONES.get(estado, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(contenido)}\r\n"
+            f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n".encode("latin-1") + contenido
+        )
+        await escritor.drain()
+        self.solicitudes_atendidas += 1
+
+    async def _atender_conexion(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    linea = await self._leer_linea(lector)
+                    if not linea:
+                        break
+                    try:
+                        metodo, objetivo, version = linea.decode("latin-1").split()
+                    except ValueError:
+                        break
+
+                    cabeceras = {}
+                    while True:
+                        linea = await self._leer_linea(lector)
+                        if linea in (b"\r\n", b"\n", b""):
+                            break
+                        nombre, _, valor = linea.decode("latin-1").partition(":")
+                        cabeceras[nombre.strip().lower()] = valor.strip()
+                except ErrorSolicitud as error:
+                    await self._responder(escritor, error.estado, {"error": str(error)}, False)
+                    break
+
+                conexion = cabeceras.get("connection", "").lower()
+                mantener = conexion != "close" if version == "HTTP/1.1" else conexion == "keep-alive"
+
+                try:
+                    try:
+                        longitud = int(cabeceras.get("content-length", 0))
+                    except ValueError:
+                        longitud = -1
+                    if longitud < 0:
+                        # Sin una longitud válida no se sabe dónde empieza la siguiente solicitud
+                        mantener = False
+                        raise ErrorSolicitud(400, "Content-Length inválido")
+                    if longitud > TAMANO_MAXIMO_CUERPO:
+                        mantener = False
+                        raise ErrorSolicitud(413, "Cuerpo demasiado grande")
+                    cuerpo = await lector.readexactly(longitud) if longitud else b""
+                    try:
+                        datos = decodificar_json(cuerpo) if cuerpo else None
+                    except ValueError:
+                        raise ErrorSolicitud(400, "JSON inválido")
+                    url = urlsplit(objetivo)
+                    consulta = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+                    estado, respuesta = self._enrutar(metodo.upper(), url.path, consulta, datos)
+                except ErrorSolicitud as error:
+                    estado, respuesta = error.estado, {"error": str(error)}
+                except Exception as error:
+                    estado, respuesta = 500, {"error": str(error)}
+
+                await self._responder(escritor, estado, respuesta, mantener)
+                if not mantener:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            escritor.close()
+
+    async def iniciar(self) -> None:
+        self._servidor = await asyncio.start_server(self._atender_conexion, self.host, self.puerto)
+        self.puerto = self._servidor.sockets[0].getsockname()[1]
+        print(f"Servidor de la biblioteca escuchando en http://{self.host}:{self.puerto}", flush=True)
+
+    async def servir_para_siempre(self) -> None:
+        if self._servidor is None:
+            await self.iniciar()
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    async def detener(self) -> None:
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP/JSON de la Biblioteca Digital")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--silencioso", action="store_true", help="no imprimir la actividad de los subsistemas")
+    parser.add_argument("--grabar", metavar="RUTA", help="grabar las llamadas a la fachada en una traza")
+    argumentos = parser.parse_args()
+
+    fachada = FachadaBiblioteca()
+    grabador = GrabadorTrazas(fachada, argumentos.grabar) if argumentos.grabar else None
+    servidor = ServidorBibliotecaHTTP(fachada, argumentos.host, argumentos.puerto, argumentos.silencioso)
+    try:
+        asyncio.run(servidor.servir_para_siempre())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if grabador:
+            print(f"Traza guardada en {argumentos.grabar}: {grabador.detener()} llamadas")
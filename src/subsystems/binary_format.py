@@ -0,0 +1,283 @@
+import mmap
+import struct
+import sys
+from array import array
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+from src.models.fechas import fecha_a_micros, micros_a_fecha, SIN_DEVOLUCION
+from src.models.models import Usuario, Libro, Prestamo
+from src.subsystems.user_management import SistemaUsuarios
+from src.subsystems.book_catalog import CatalogoLibros
+from src.subsystems.circulation_stats import EstadisticasCirculacion
+from src.subsystems.loan_system import SistemaPrestamos
+from src.subsystems.snapshots import Instantanea
+
+# Formato binario de exportación (little-endian, secciones alineadas a 8 bytes):
+#   cabecera   MAGIA
+#   por tabla  "<qqq" filas, contador_id, paso_id, seguido de sus columnas
+#   columna numérica   filas valores de ancho fijo
+#   columna de texto   filas longitudes "I" + "<q" tamaño del bloque + bloque UTF-8
+# Tablas en orden: usuarios, libros, préstamos.
+MAGIA = b"BIBLIO\x00\x01"
+CABECERA_TABLA = struct.Struct("<qqq")
+TAMANO_BLOQUE = struct.Struct("<q")
+
+
+class _Escritor:
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.escritos = 0
+
+    def escribir(self, datos: bytes) -> None:
+        self.archivo.write(datos)
+        self.escritos += len(datos)
+        relleno = -len(datos) % 8
+        if relleno:
+            self.archivo.write(bytes(relleno))
+            self.escritos += relleno
+
+    def numeros(self, tipo: str, valores: List) -> None:
+        columna = array(tipo, valores)
+        if sys.byteorder != "little":
+            columna.byteswap()
+        self.escribir(columna.tobytes())
+
+    def textos(self, valores: List[str]) -> None:
+        codificados = [valor.encode("utf-8") for valor in valores]
+        self.numeros("I", [len(valor) for valor in codificados])
+        bloque = b"".join(codificados)
+        self.escribir(TAMANO_BLOQUE.pack(len(bloque)))
+        self.escribir(bloque)
+
+
+class _Lector:
+    def __init__(self, vista: memoryview):
+        self.vista = vista
+        self.posicion = 0
+
+    def leer(self, tamano: int) -> memoryview:
+        if tamano < 0 or self.posicion + tamano > len(self.vista):
+            raise ValueError("Archivo de exportación truncado o corrupto")
+        trozo = self.vista[self.posicion:self.posicion + tamano]
+        self.posicion += tamano + (-tamano % 8)
+        return trozo
+
+    def numeros(self, tipo: str, filas: int) -> List:
+        trozo = self.leer(filas * array(tipo).itemsize)
+        if sys.byteorder != "little":
+            columna = array(tipo, trozo.tobytes())
+            columna.byteswap()
+            return columna.tolist()
+        # Lectura directa sobre el buffer mapeado, sin copia intermedia
+        with trozo, trozo.cast(tipo) as columna:
+            return columna.tolist()
+
+    def textos(self, filas: int) -> List[str]:
+        longitudes = self.numeros("I", filas)
+        with self.leer(TAMANO_BLOQUE.size) as trozo:
+            tamano, = TAMANO_BLOQUE.unpack(trozo)
+        resultado = []
+        with self.leer(tamano) as bloque:
+            inicio = 0
+            for longitud in longitudes:
+                resultado.append(str(bloque[inicio:inicio + longitud], "utf-8"))
+                inicio += longitud
+        return resultado
+
+    def cabecera(self):
+        with self.leer(CABECERA_TABLA.size) as trozo:
+            filas, contador_id, paso_id = CABECERA_TABLA.unpack(trozo)
+        if filas < 0:
+            raise ValueError("Archivo de exportación truncado o corrupto")
+        return filas, contador_id, paso_id
+
+
+def _validar_ids(tabla: str, ids: List[int], contador_id: int) -> None:
+    """Los IDs deben ser positivos, únicos y menores que el siguiente ID libre guardado."""
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"hay IDs de {tabla} repetidos")
+    if ids and (min(ids) < 1 or max(ids) >= contador_id):
+        raise ValueError(f"hay IDs de {tabla} fuera del rango [1, {contador_id})")
+
+
+class ArchivoBiblioteca:
+    """Exporta e importa usuarios, libros y préstamos en formato binario columnar."""
+
+    def __init__(self, sistema_usuarios: SistemaUsuarios, catalogo_libros: CatalogoLibros,
+                 sistema_prestamos: SistemaPrestamos):
+        self.sistema_usuarios = sistema_usuarios
+        self.catalogo_libros = catalogo_libros
+        self.sistema_prestamos = sistema_prestamos
+
+    def exportar(self, ruta: str, instantanea: Optional[Instantanea] = None) -> int:
+        """Escribe las tres tablas en `ruta` y devuelve los bytes escritos.
+        
+        Con `instantanea`, los libros y préstamos se toman de ella en lugar
+        del estado vivo, que puede seguir cambiando mientras se exporta.
+        """
+        usuarios = list(self.sistema_usuarios.usuarios.values())
+        if instantanea:
+            libros = list(instantanea["libros"].values())
+            prestamos = list(instantanea["prestamos"].values())
+        else:
+            libros = list(self.catalogo_libros.libros.values())
+            prestamos = list(self.sistema_prestamos.prestamos.values())
+
+        with open(ruta, "wb") as archivo:
+            escritor = _Escritor(archivo)
+            escritor.escribir(MAGIA)
+
+            escritor.escribir(CABECERA_TABLA.pack(len(usuarios), self.sistema_usuarios.contador_id,
+                                                  self.sistema_usuarios.paso_id))
+            escritor.numeros("q", [u.id for u in usuarios])
+            escritor.numeros("q", [fecha_a_micros(u.fecha_registro) for u in usuarios])
+            escritor.numeros("B", [u.activo for u in usuarios])
+            escritor.textos([u.nombre for u in usuarios])
+            escritor.textos([u.email for u in usuarios])
+
+            escritor.escribir(CABECERA_TABLA.pack(len(libros), self.catalogo_libros.contador_id,
+                                                  self.catalogo_libros.paso_id))
+            escritor.numeros("q", [l.id for l in libros])
+            escritor.numeros("B", [l.disponible for l in libros])
+            escritor.textos([l.titulo for l in libros])
+            escritor.textos([l.autor for l in libros])
+            escritor.textos([l.isbn for l in libros])
+
+            escritor.escribir(CABECERA_TABLA.pack(len(prestamos), self.sistema_prestamos.contador_id,
+                                                  self.sistema_prestamos.paso_id))
+            escritor.numeros("q", [p.id for p in prestamos])
+            escritor.numeros("q", [p.id_usuario for p in prestamos])
+            escritor.numeros("q", [p.id_libro for p in prestamos])
+            escritor.numeros("q", [fecha_a_micros(p.fecha_prestamo) for p in prestamos])
+            escritor.numeros("q", [fecha_a_micros(p.fecha_devolucion) if p.fecha_devolucion else SIN_DEVOLUCION
+                                   for p in prestamos])
+            escritor.numeros("i", [p.dias_plazo for p in prestamos])
+
+        print(f"Exportados {len(usuarios)} usuarios, {len(libros)} libros y {len(prestamos)} préstamos a {ruta}")
+        return escritor.escritos
+
+    def importar(self, ruta: str) -> Dict[str, int]:
+        """Reemplaza el contenido de las tablas con el de `ruta`.
+
+        La carga no pasa por crear_usuario ni agregar_libro: no se envían
+        notificaciones ni se publican cambios, y se restauran los contadores de IDs.
+        Todo el archivo se lee y valida antes de tocar ninguna tabla; si está
+        truncado o corrupto se lanza ValueError y el estado no cambia.
+        """
+        with open(ruta, "rb") as archivo:
+            if not archivo.seek(0, 2):
+                raise ValueError(f"{ruta} está vacío")
+            with mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa, memoryview(mapa) as vista:
+                try:
+                    usuarios, libros, prestamos = self._leer_tablas(_Lector(vista))
+                except (ValueError, OverflowError, struct.error) as error:
+                    raise ValueError(f"{ruta} no es un archivo de exportación válido: {error}") from error
+        try:
+            derivados = self._preparar_derivados(libros[0], prestamos[0].values())
+        except (ValueError, OverflowError, OSError) as error:
+            raise ValueError(f"{ruta} no es un archivo de exportación válido: {error}") from error
+
+        self._sustituir_tablas(usuarios, libros, prestamos, derivados)
+        catalogo = self.catalogo_libros
+
+        # Con un asignador compartido, los IDs importados no deben volver a entregarse
+        for entidad, sistema, tabla in (("usuario", self.sistema_usuarios, self.sistema_usuarios.usuarios),
+                                        ("libro", catalogo, catalogo.libros),
+                                        ("prestamo", self.sistema_prestamos, self.sistema_prestamos.prestamos)):
+            if sistema.asignador_ids and len(tabla):
+                sistema.asignador_ids.asegurar_minimo(entidad, max(tabla) + 1)
+
+        conteos = {
+            "usuarios": len(self.sistema_usuarios.usuarios),
+            "libros": len(catalogo.libros),
+            "prestamos": len(self.sistema_prestamos.prestamos),
+        }
+        print(f"Importados {conteos['usuarios']} usuarios, {conteos['libros']} libros "
+              f"y {conteos['prestamos']} préstamos desde {ruta}")
+        return conteos
+
+    def _leer_tablas(self, lector: _Lector):
+        """Lee las tres tablas sin modificar el estado; devuelve (filas, contador_id, paso_id) de cada una."""
+        with lector.leer(len(MAGIA)) as magia:
+            if magia != MAGIA:
+                raise ValueError("la cabecera no coincide")
+
+        filas, contador_id, paso_id = lector.cabecera()
+        ids = lector.numeros("q", filas)
+        fechas = lector.numeros("q", filas)
+        activos = lector.numeros("B", filas)
+        nombres = lector.textos(filas)
+        emails = lector.textos(filas)
+        _validar_ids("usuarios", ids, contador_id)
+        usuarios = ({ids[i]: Usuario(id=ids[i], nombre=nombres[i], email=emails[i],
+                                     fecha_registro=micros_a_fecha(fechas[i]), activo=bool(activos[i]))
+                     for i in range(filas)}, contador_id, paso_id)
+
+        filas, contador_id, paso_id = lector.cabecera()
+        ids = lector.numeros("q", filas)
+        disponibles = lector.numeros("B", filas)
+        titulos = lector.textos(filas)
+        autores = lector.textos(filas)
+        isbns = lector.textos(filas)
+        _validar_ids("libros", ids, contador_id)
+        libros = ([Libro(id=ids[i], titulo=titulos[i], autor=autores[i], isbn=isbns[i],
+                         disponible=bool(disponibles[i])) for i in range(filas)], contador_id, paso_id)
+
+        filas, contador_id, paso_id = lector.cabecera()
+        ids = lector.numeros("q", filas)
+        id_usuarios = lector.numeros("q", filas)
+        id_libros = lector.numeros("q", filas)
+        inicios = lector.numeros("q", filas)
+        devoluciones = lector.numeros("q", filas)
+        plazos = lector.numeros("i", filas)
+        _validar_ids("préstamos", ids, contador_id)
+        prestamos = ({ids[i]: Prestamo(id=ids[i], id_usuario=id_usuarios[i], id_libro=id_libros[i],
+                                       fecha_prestamo=micros_a_fecha(inicios[i]),
+                                       fecha_devolucion=(micros_a_fecha(devoluciones[i])
+                                                         if devoluciones[i] != SIN_DEVOLUCION else None),
+                                       dias_plazo=plazos[i])
+                      for i in range(filas)}, contador_id, paso_id)
+
+        if lector.posicion != len(lector.vista):
+            raise ValueError("hay datos sobrantes al final")
+        return usuarios, libros, prestamos
+
+    def _preparar_derivados(self, filas_libros: List[Libro], prestamos):
+        """Construye el mapa de bits, los índices y las estadísticas de las tablas leídas.
+
+        Se hace antes de sustituir nada, de modo que un fallo aquí deja el
+        estado como estaba.
+        """
+        catalogo = CatalogoLibros(indexar=self.catalogo_libros.indices.activos)
+        for libro in filas_libros:
+            catalogo._marcar_disponibilidad(libro.id, libro.disponible)
+        catalogo.indices.reconstruir((l.id, l.titulo, l.autor, l.isbn) for l in filas_libros)
+        actuales = self.sistema_prestamos.estadisticas
+        estadisticas = EstadisticasCirculacion(actuales.ventana, actuales.num_ranuras)
+        estadisticas.reconstruir(prestamos)
+        return catalogo.mapa_disponibilidad, catalogo.total_disponibles, catalogo.indices, estadisticas
+
+    def _sustituir_tablas(self, usuarios, libros, prestamos, derivados) -> None:
+        """Cambia las tres tablas por las leídas, sin que una instantánea pueda ver el cambio a medias."""
+        catalogo = self.catalogo_libros
+        sistema_prestamos = self.sistema_prestamos
+        # Exclusivo: ni instantáneas ni escritores pueden ver el cambio a medias
+        with sistema_prestamos.versiones.gestor.exclusivo() if sistema_prestamos.versiones else nullcontext():
+            self.sistema_usuarios.usuarios, self.sistema_usuarios.contador_id, \
+                self.sistema_usuarios.paso_id = usuarios
+
+            filas_libros, catalogo.contador_id, catalogo.paso_id = libros
+            if catalogo.versiones:
+                catalogo.versiones.antes_de_reiniciar()
+            catalogo.libros.clear()
+            catalogo.libros.update((libro.id, libro) for libro in filas_libros)
+            catalogo.mapa_disponibilidad, catalogo.total_disponibles, catalogo.indices, \
+                sistema_prestamos.estadisticas = derivados
+            if catalogo.versiones:
+                catalogo.versiones.reiniciar(catalogo.libros)
+
+            if sistema_prestamos.versiones:
+                sistema_prestamos.versiones.antes_de_reiniciar()
+            sistema_prestamos.prestamos, sistema_prestamos.contador_id, sistema_prestamos.paso_id = prestamos
+            if sistema_prestamos.versiones:
+                sistema_prestamos.versiones.reiniciar(sistema_prestamos.prestamos)
@@ -1,30 +1,101 @@
-from typing import List, Dict, Optional
+import threading
+from contextlib import nullcontext
+from typing import Iterator, List, Dict, Optional
 from src.models.models import Libro
+from src.subsystems.catalog_index import IndicesCatalogo, PlanConsulta
+from src.subsystems.change_stream import FlujoCambios
+from src.subsystems.id_allocator import AsignadorIds
+from src.subsystems.snapshots import RegistroVersiones
 
 class CatalogoLibros:
-    def __init__(self):
+    def __init__(self, flujo_cambios: Optional[FlujoCambios] = None,
+                 asignador_ids: Optional[AsignadorIds] = None, indexar: bool = True):
         self.libros = {}
         self.contador_id = 1
+        self.paso_id = 1  # Salto entre IDs consecutivos (N en modo fragmentado)
+        self.mapa_disponibilidad = bytearray()  # Bit i a 1 si el libro con ID i está disponible
+        self.total_disponibles = 0
+        self.flujo_cambios = flujo_cambios
+        self.asignador_ids = asignador_ids  # Si se indica, sustituye a contador_id
+        self.versiones: Optional[RegistroVersiones] = None  # Para instantáneas de sólo lectura
+        self.indices = IndicesCatalogo(indexar)  # Título, autor e ISBN para consultar()
+        self._lock_ids = threading.Lock()
+    
+    def _siguiente_id(self) -> int:
+        """Obtiene un nuevo ID de forma segura entre hilos."""
+        if self.asignador_ids:
+            id_libro = self.asignador_ids.siguiente_id("libro")
+            with self._lock_ids:
+                # Al día para que una exportación guarde el siguiente ID libre
+                self.contador_id = max(self.contador_id, id_libro + 1)
+            return id_libro
+        with self._lock_ids:
+            id_libro = self.contador_id
+            self.contador_id += self.paso_id
+            return id_libro
+    
+    def _modificando(self, id_libro: int):
+        """Conserva la versión previa del libro para las instantáneas abiertas."""
+        return self.versiones.modificando(id_libro) if self.versiones else nullcontext()
     
     def agregar_libro(self, titulo: str, autor: str, isbn: str) -> Libro:
         """Agrega un nuevo libro al catálogo."""
-        id_libro = self.contador_id
-        self.contador_id += 1
+        id_libro = self._siguiente_id()
         libro = Libro(id=id_libro, titulo=titulo, autor=autor, isbn=isbn)
-        self.libros[id_libro] = libro
+        with self._modificando(id_libro):
+            self.libros[id_libro] = libro
+            self.indices.agregar(id_libro, titulo, autor, isbn)
+        self._marcar_disponibilidad(id_libro, True)
+        if self.flujo_cambios:
+            # Si nadie puede leer el evento sólo avanza la secuencia: no hace falta copiar el libro
+            datos = dict(vars(libro)) if self.flujo_cambios.activo else None
+            self.flujo_cambios.publicar("libro", "crear", id_libro, datos)
         print(f"Libro agregado: {libro}")
         return libro
     
-    def buscar_por_titulo(self, titulo: str) -> List[Libro]:
-        """Busca libros por título."""
+    def buscar_por_titulo(self, titulo: str, solo_disponibles: bool = False) -> List[Libro]:
+        """Busca libros por título, opcionalmente sólo entre los disponibles."""
+        titulo = titulo.lower()
+        if solo_disponibles:
+            # Sólo se leen los libros con su bit a 1, no todo el catálogo
+            return [libro for libro in (self.libros.get(id_libro) for id_libro in self.ids_disponibles())
+                    if libro is not None and titulo in libro.titulo.lower()]
         return [libro for libro in self.libros.values() 
-                if titulo.lower() in libro.titulo.lower()]
+                if titulo in libro.titulo.lower()]
     
     def buscar_por_autor(self, autor: str) -> List[Libro]:
         """Busca libros por autor."""
         return [libro for libro in self.libros.values() 
                 if autor.lower() in libro.autor.lower()]
     
+    def buscar_por_isbn(self, isbn: str) -> List[Libro]:
+        """Busca libros por ISBN."""
+        return [libro for libro in self.libros.values() if libro.isbn == isbn]
+    
+    def planificar_consulta(self, titulo: str = "", autor: str = "", isbn: str = "",
+                            disponible: Optional[bool] = None) -> PlanConsulta:
+        """Elige el orden de los índices para una consulta sin ejecutarla."""
+        return self.indices.planificar(self, titulo, autor, isbn, disponible)
+    
+    def consultar(self, titulo: str = "", autor: str = "", isbn: str = "",
+                  disponible: Optional[bool] = None) -> List[Libro]:
+        """Busca libros que cumplan a la vez todos los predicados indicados.
+        
+        Cada palabra de `titulo` y `autor` debe ser el comienzo de alguna
+        palabra del campo (sin distinguir mayúsculas), `isbn` es un prefijo y
+        `disponible` filtra por disponibilidad si no es None.
+        """
+        plan = self.planificar_consulta(titulo, autor, isbn, disponible)
+        return [self.libros[id_libro] for id_libro in self.indices.ejecutar(plan, self)]
+    
+    def explicar_consulta(self, titulo: str = "", autor: str = "", isbn: str = "",
+                          disponible: Optional[bool] = None, analizar: bool = False) -> str:
+        """Describe el plan elegido; con `analizar` lo ejecuta y añade los candidatos tras cada paso."""
+        plan = self.planificar_consulta(titulo, autor, isbn, disponible)
+        if analizar:
+            self.indices.ejecutar(plan, self)
+        return plan.describir()
+    
     def obtener_libro(self, id_libro: int) -> Optional[Libro]:
         """Obtiene un libro por su ID."""
         return self.libros.get(id_libro)
@@ -32,10 +103,53 @@ class CatalogoLibros:
     def actualizar_disponibilidad(self, id_libro: int, disponible: bool) -> bool:
         """Actualiza la disponibilidad de un libro."""
         if id_libro in self.libros:
-            self.libros[id_libro].disponible = disponible
+            with self._modificando(id_libro):
+                self.libros[id_libro].disponible = disponible
+            self._marcar_disponibilidad(id_libro, disponible)
+            if self.flujo_cambios:
+                self.flujo_cambios.publicar("libro", "disponibilidad", id_libro, {"disponible": disponible})
             return True
         return False
     
+    def _marcar_disponibilidad(self, id_libro: int, disponible: bool) -> None:
+        """Actualiza el bit del libro en el mapa y el contador de disponibles."""
+        byte, bit = divmod(id_libro, 8)
+        if byte >= len(self.mapa_disponibilidad):
+            # Crecer al doble para amortizar las altas consecutivas
+            nuevo_tamano = max(byte + 1, 2 * len(self.mapa_disponibilidad))
+            self.mapa_disponibilidad.extend(bytes(nuevo_tamano - len(self.mapa_disponibilidad)))
+        
+        mascara = 1 << bit
+        if bool(self.mapa_disponibilidad[byte] & mascara) == disponible:
+            return
+        if disponible:
+            self.mapa_disponibilidad[byte] |= mascara
+            self.total_disponibles += 1
+        else:
+            self.mapa_disponibilidad[byte] &= ~mascara
+            self.total_disponibles -= 1
+    
+    def esta_disponible(self, id_libro: int) -> bool:
+        """Consulta la disponibilidad de un libro en el mapa de bits."""
+        byte = id_libro >> 3
+        return byte < len(self.mapa_disponibilidad) and bool(self.mapa_disponibilidad[byte] & (1 << (id_libro & 7)))
+    
+    def ids_disponibles(self) -> Iterator[int]:
+        """Recorre en orden los IDs con su bit a 1, saltando los bytes del mapa sin ninguno."""
+        for byte, valor in enumerate(self.mapa_disponibilidad):
+            while valor:
+                bit = (valor & -valor).bit_length() - 1
+                yield byte * 8 + bit
+                valor &= valor - 1
+    
+    def contar_disponibles(self) -> int:
+        """Devuelve cuántos libros están disponibles sin recorrer el catálogo."""
+        return self.total_disponibles
+    
+    def filtrar_disponibles(self, libros: List[Libro]) -> List[Libro]:
+        """Intersecta una lista de libros con el mapa de disponibilidad."""
+        return [libro for libro in libros if self.esta_disponible(libro.id)]
+    
     def obtener_informacion_detallada(self, id_libro: int) -> Dict:
         """Obtiene información detallada de un libro."""
         libro = self.obtener_libro(id_libro)
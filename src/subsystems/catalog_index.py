@@ -0,0 +1,260 @@
+import bisect
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+_PALABRA = re.compile(r"\w+")
+
+# Si un índice devolvería más de FACTOR_FILTRO veces los candidatos que ya
+# quedan, es más barato comprobar cada candidato que materializar el índice.
+FACTOR_FILTRO = 8
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Palabras del texto en minúsculas, sin repetir y en orden de aparición."""
+    return list(dict.fromkeys(_PALABRA.findall(texto.lower())))
+
+
+class IndiceInvertido:
+    """Palabra -> IDs de los libros que la contienen, con búsqueda por prefijo."""
+
+    def __init__(self):
+        self.entradas: Dict[str, Set[int]] = {}
+        self.vocabulario: List[str] = []  # Palabras ordenadas, para los prefijos
+
+    def agregar(self, id_libro: int, texto: str, ordenar: bool = True) -> None:
+        for palabra in tokenizar(texto):
+            ids = self.entradas.get(palabra)
+            if ids is None:
+                ids = self.entradas[palabra] = set()
+                if ordenar:
+                    bisect.insort(self.vocabulario, palabra)
+                else:
+                    self.vocabulario.append(palabra)
+            ids.add(id_libro)
+
+    def _palabras_con_prefijo(self, prefijo: str) -> List[str]:
+        inicio = bisect.bisect_left(self.vocabulario, prefijo)
+        fin = bisect.bisect_left(self.vocabulario, prefijo + "\uffff", inicio)
+        return self.vocabulario[inicio:fin]
+
+    def estimar(self, prefijo: str) -> int:
+        """Cota superior de los libros con alguna palabra que empieza por `prefijo`."""
+        return sum(len(self.entradas[palabra]) for palabra in self._palabras_con_prefijo(prefijo))
+
+    def buscar(self, prefijo: str) -> Set[int]:
+        palabras = self._palabras_con_prefijo(prefijo)
+        if len(palabras) == 1:
+            return self.entradas[palabras[0]]
+        return set().union(*(self.entradas[palabra] for palabra in palabras))
+
+    def contiene(self, id_libro: int, prefijo: str) -> bool:
+        """Si el libro tiene alguna palabra que empieza por `prefijo`, sin materializar el resultado."""
+        return any(id_libro in self.entradas[palabra] for palabra in self._palabras_con_prefijo(prefijo))
+
+    def limpiar(self) -> None:
+        self.entradas.clear()
+        self.vocabulario.clear()
+
+
+class IndiceIsbn:
+    """Lista ordenada de (ISBN, ID) para buscar por prefijo con bisección."""
+
+    def __init__(self):
+        self.claves: List[Tuple[str, int]] = []
+
+    def agregar(self, id_libro: int, isbn: str, ordenar: bool = True) -> None:
+        if ordenar:
+            bisect.insort(self.claves, (isbn, id_libro))
+        else:
+            self.claves.append((isbn, id_libro))
+
+    def _rango(self, prefijo: str) -> Tuple[int, int]:
+        inicio = bisect.bisect_left(self.claves, (prefijo,))
+        return inicio, bisect.bisect_left(self.claves, (prefijo + "\uffff",), inicio)
+
+    def estimar(self, prefijo: str) -> int:
+        inicio, fin = self._rango(prefijo)
+        return fin - inicio
+
+    def buscar(self, prefijo: str) -> Set[int]:
+        inicio, fin = self._rango(prefijo)
+        return {id_libro for _, id_libro in self.claves[inicio:fin]}
+
+    def limpiar(self) -> None:
+        self.claves.clear()
+
+
+@dataclass
+class PasoPlan:
+    predicado: str  # p. ej. "titulo~quijote"
+    indice: str  # "titulo", "autor", "isbn", "disponibilidad" o "recorrido" (sin índices)
+    estimado: int  # Libros que devolvería el índice por sí solo
+    operacion: str = ""  # "candidatos", "intersectar" o "filtrar"
+    resultado: Optional[int] = None  # Candidatos que quedan tras el paso (al ejecutar)
+    _buscar: Optional[Callable[[], Set[int]]] = field(default=None, repr=False)
+    _cumple: Optional[Callable[[int], bool]] = field(default=None, repr=False)
+
+
+@dataclass
+class PlanConsulta:
+    pasos: List[PasoPlan]
+    total_libros: int
+    ejecutado: bool = False
+
+    def describir(self) -> str:
+        """Texto del plan, un paso por línea, al estilo de un EXPLAIN."""
+        if not self.pasos:
+            return f"recorrido completo ({self.total_libros} libros)"
+        lineas = []
+        for numero, paso in enumerate(self.pasos, 1):
+            linea = f"{numero}. {paso.operacion:<11} {paso.predicado:<30} indice={paso.indice} estimado={paso.estimado}"
+            if paso.resultado is not None:
+                linea += f" -> {paso.resultado}"
+            lineas.append(linea)
+        return "\n".join(lineas)
+
+
+def _cumple_prefijo(libro, campo: str, prefijo: str) -> bool:
+    """Comprueba un predicado sobre los campos del libro, sin índices."""
+    if libro is None:
+        return False
+    if campo == "isbn":
+        return libro.isbn.startswith(prefijo)
+    return any(palabra.startswith(prefijo) for palabra in tokenizar(getattr(libro, campo)))
+
+
+class IndicesCatalogo:
+    """Índices secundarios del catálogo y planificador de consultas con varios predicados.
+
+    Cada predicado se estima sin materializar nada: las palabras y los ISBN
+    por bisección sobre listas ordenadas y la disponibilidad con el contador
+    del mapa de bits. Se parte del índice más selectivo y se intersecta con
+    los siguientes de menor a mayor; cuando un índice devolvería muchos más
+    libros que los candidatos que quedan, se comprueba cada candidato en su
+    lugar. La disponibilidad siempre se comprueba sobre el mapa de bits.
+
+    Con `activos=False` no se guarda nada por libro (p. ej. en el catálogo
+    paginado, cuya memoria no debe crecer con el número de libros) y los
+    predicados de texto se comprueban en un único recorrido del catálogo.
+    """
+
+    def __init__(self, activos: bool = True):
+        self.activos = activos
+        self.titulos = IndiceInvertido()
+        self.autores = IndiceInvertido()
+        self.isbns = IndiceIsbn()
+        self._lock = threading.Lock()  # Las inserciones ordenadas no pueden intercalarse
+
+    def agregar(self, id_libro: int, titulo: str, autor: str, isbn: str, ordenar: bool = True) -> None:
+        if not self.activos:
+            return
+        with self._lock:
+            self.titulos.agregar(id_libro, titulo, ordenar)
+            self.autores.agregar(id_libro, autor, ordenar)
+            self.isbns.agregar(id_libro, isbn, ordenar)
+
+    def reconstruir(self, filas: Iterable[Tuple[int, str, str, str]]) -> None:
+        """Vuelve a indexar desde (id, título, autor, ISBN) ordenando una sola vez al final."""
+        if not self.activos:
+            return
+        with self._lock:
+            self._limpiar()
+            for id_libro, titulo, autor, isbn in filas:
+                self.titulos.agregar(id_libro, titulo, ordenar=False)
+                self.autores.agregar(id_libro, autor, ordenar=False)
+                self.isbns.agregar(id_libro, isbn, ordenar=False)
+            self.titulos.vocabulario.sort()
+            self.autores.vocabulario.sort()
+            self.isbns.claves.sort()
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._limpiar()
+
+    def _limpiar(self) -> None:
+        self.titulos.limpiar()
+        self.autores.limpiar()
+        self.isbns.limpiar()
+
+    @staticmethod
+    def _recorrido(catalogo, predicados: List[Tuple[str, str, str]]) -> List[PasoPlan]:
+        """Un solo paso que comprueba todos los predicados de texto recorriendo el catálogo."""
+        if not predicados:
+            return []
+        return [PasoPlan(
+            " ".join(predicado for predicado, _, _ in predicados), "recorrido", len(catalogo.libros),
+            _buscar=lambda: {id_libro for id_libro, libro in catalogo.libros.items()
+                             if all(_cumple_prefijo(libro, campo, valor) for _, campo, valor in predicados)})]
+
+    def planificar(self, catalogo, titulo: str = "", autor: str = "", isbn: str = "",
+                   disponible: Optional[bool] = None) -> PlanConsulta:
+        """Ordena los predicados de la consulta de más a menos selectivo."""
+        predicados = [(f"{campo}~{palabra}", campo, palabra)
+                      for campo, texto in (("titulo", titulo), ("autor", autor)) for palabra in tokenizar(texto)]
+        if isbn:
+            predicados.append((f"isbn^{isbn}", "isbn", isbn))
+
+        if not self.activos:
+            pasos = self._recorrido(catalogo, predicados)
+        else:
+            pasos = []
+            with self._lock:
+                for predicado, campo, valor in predicados:
+                    if campo == "isbn":
+                        pasos.append(PasoPlan(
+                            predicado, campo, self.isbns.estimar(valor),
+                            _buscar=lambda valor=valor: self.isbns.buscar(valor),
+                            _cumple=lambda id_libro, valor=valor: _cumple_prefijo(catalogo.obtener_libro(id_libro),
+                                                                                  "isbn", valor)))
+                    else:
+                        indice = self.titulos if campo == "titulo" else self.autores
+                        pasos.append(PasoPlan(
+                            predicado, campo, indice.estimar(valor),
+                            _buscar=lambda indice=indice, valor=valor: indice.buscar(valor),
+                            _cumple=lambda id_libro, indice=indice, valor=valor: indice.contiene(id_libro, valor)))
+            pasos.sort(key=lambda paso: paso.estimado)
+
+        if disponible is not None:
+            total_disponibles = catalogo.contar_disponibles()
+            pasos.append(PasoPlan(
+                f"disponible={disponible}", "disponibilidad",
+                total_disponibles if disponible else len(catalogo.libros) - total_disponibles,
+                _cumple=lambda id_libro: catalogo.esta_disponible(id_libro) == disponible))
+
+        candidatos = None
+        for paso in pasos:
+            if candidatos is None and paso._buscar is not None:
+                paso.operacion = "candidatos"
+                candidatos = paso.estimado
+            elif candidatos is not None and paso._buscar is not None and paso.estimado <= candidatos * FACTOR_FILTRO:
+                paso.operacion = "intersectar"
+                candidatos = min(candidatos, paso.estimado)
+            else:
+                paso.operacion = "filtrar"
+        return PlanConsulta(pasos, len(catalogo.libros))
+
+    def ejecutar(self, plan: PlanConsulta, catalogo) -> List[int]:
+        """IDs (ordenados) de los libros que cumplen todos los predicados del plan."""
+        candidatos: Optional[Set[int]] = None
+        for paso in plan.pasos:
+            if candidatos is not None and not candidatos:
+                paso.resultado = 0
+                continue
+            if paso.operacion == "candidatos":
+                with self._lock:
+                    candidatos = set(paso._buscar())
+            elif paso.operacion == "intersectar":
+                with self._lock:
+                    candidatos &= paso._buscar()
+            elif candidatos is None:
+                # Sólo hay predicados de filtro (p. ej. únicamente disponibilidad)
+                candidatos = {id_libro for id_libro in catalogo.libros if paso._cumple(id_libro)}
+            else:
+                candidatos = {id_libro for id_libro in candidatos if paso._cumple(id_libro)}
+            paso.resultado = len(candidatos)
+        plan.ejecutado = True
+        if candidatos is None:
+            return sorted(catalogo.libros)
+        return sorted(candidatos)
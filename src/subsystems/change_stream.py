@@ -0,0 +1,151 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from src.models.models import EventoCambio
+
+
+class Suscripcion:
+    def __init__(self, callback: Callable[[List[EventoCambio]], None], tamano_lote: int, ultima_secuencia: int):
+        self.callback = callback
+        self.tamano_lote = tamano_lote
+        self.ultima_secuencia = ultima_secuencia  # Último evento entregado al suscriptor
+        self.perdida = False  # Se dio de baja por quedarse demasiado atrás
+
+
+class FlujoCambios:
+    """Flujo en memoria de cambios publicados por los subsistemas.
+
+    Cada evento recibe un número de secuencia creciente. Siempre se retienen
+    los últimos `capacidad_retencion` eventos (y los que algún suscriptor aún
+    no ha recibido), haya o no suscriptores, para que un consumidor pueda
+    darse de baja y reanudar más tarde desde su última secuencia. Con
+    `capacidad_retencion=0` y sin suscriptores no se retiene nada. Un
+    suscriptor que se queda más de `retraso_maximo` eventos atrás (p. ej.
+    porque su callback falla siempre) se da de baja y se marca como perdido,
+    para que no retenga el flujo indefinidamente.
+    """
+
+    def __init__(self, capacidad_retencion: int = 100_000, retraso_maximo: int = 100_000):
+        self.capacidad_retencion = capacidad_retencion
+        self.retraso_maximo = retraso_maximo
+        self.eventos: List[EventoCambio] = []
+        self.inicio = 0  # Índice en `eventos` del evento retenido más antiguo
+        self.ultima_secuencia = 0
+        self.suscripciones: List[Suscripcion] = []
+        self._lock = threading.RLock()
+
+    @property
+    def activo(self) -> bool:
+        """Si alguien puede leer los eventos; si no, los publicadores pueden evitar preparar los datos."""
+        return self.capacidad_retencion > 0 or bool(self.suscripciones)
+
+    @property
+    def retenidos(self) -> int:
+        """Eventos retenidos, sin contar los descartados que aún no se han compactado."""
+        return len(self.eventos) - self.inicio
+
+    @property
+    def primera_secuencia(self) -> int:
+        """Secuencia del evento retenido más antiguo."""
+        return self.ultima_secuencia - self.retenidos + 1
+
+    def publicar(self, entidad: str, operacion: str, id_entidad: int, datos: Optional[Dict[str, Any]] = None) -> EventoCambio:
+        """Registra un cambio y entrega los lotes completos a los suscriptores."""
+        with self._lock:
+            self.ultima_secuencia += 1
+            evento = EventoCambio(self.ultima_secuencia, entidad, operacion, id_entidad, datos or {})
+            if not self.activo:
+                # Nadie lo leerá: sólo avanza la secuencia
+                return evento
+            self.eventos.append(evento)
+            for suscripcion in list(self.suscripciones):
+                if self.ultima_secuencia - suscripcion.ultima_secuencia >= suscripcion.tamano_lote:
+                    self._entregar(suscripcion)
+            self._recortar()
+        return evento
+
+    def leer_desde(self, secuencia: int, limite: Optional[int] = None) -> List[EventoCambio]:
+        """Devuelve los eventos con secuencia mayor que la indicada.
+
+        Lanza ValueError si alguno de esos eventos ya no está retenido, para
+        que quien reanuda no confunda un hueco con la ausencia de cambios.
+        """
+        with self._lock:
+            self._validar_secuencia(secuencia)
+            desde = self.inicio + (secuencia - self.primera_secuencia + 1)
+            hasta = len(self.eventos) if limite is None else min(len(self.eventos), desde + limite)
+            return self.eventos[desde:hasta]
+
+    def suscribir(self, callback: Callable[[List[EventoCambio]], None], tamano_lote: int = 100,
+                  desde: Optional[int] = None) -> Suscripcion:
+        """Registra un consumidor que recibirá los eventos en lotes.
+
+        Si se indica `desde`, la suscripción se reanuda a partir de esa
+        secuencia; si no, sólo recibe los cambios posteriores.
+        """
+        with self._lock:
+            if desde is None:
+                desde = self.ultima_secuencia
+            else:
+                self._validar_secuencia(desde)
+            suscripcion = Suscripcion(callback, tamano_lote, desde)
+            self.suscripciones.append(suscripcion)
+            return suscripcion
+
+    def desuscribir(self, suscripcion: Suscripcion) -> bool:
+        """Da de baja un consumidor."""
+        with self._lock:
+            if suscripcion in self.suscripciones:
+                self.suscripciones.remove(suscripcion)
+                self._recortar()
+                return True
+            return False
+
+    def _validar_secuencia(self, secuencia: int) -> None:
+        """Comprueba que se pueda leer sin huecos a partir de la secuencia indicada."""
+        if secuencia > self.ultima_secuencia:
+            raise ValueError(f"La secuencia {secuencia} aún no se ha publicado "
+                             f"(la última es {self.ultima_secuencia})")
+        if secuencia < self.primera_secuencia - 1:
+            raise ValueError(f"La secuencia {secuencia} ya no está retenida "
+                             f"(la más antigua es {self.primera_secuencia})")
+
+    def despachar(self) -> int:
+        """Entrega a todos los suscriptores los eventos pendientes, aunque el lote no esté completo."""
+        with self._lock:
+            entregados = sum(self._entregar(suscripcion) for suscripcion in self.suscripciones)
+            self._recortar()
+            return entregados
+
+    def _entregar(self, suscripcion: Suscripcion) -> int:
+        """Entrega en lotes los eventos pendientes de una suscripción."""
+        entregados = 0
+        while suscripcion.ultima_secuencia < self.ultima_secuencia:
+            lote = self.leer_desde(suscripcion.ultima_secuencia, suscripcion.tamano_lote)
+            try:
+                suscripcion.callback(lote)
+            except Exception as error:
+                # El cursor no avanza: el lote se reintentará en la próxima entrega
+                print(f"Error en suscriptor de cambios: {error}")
+                break
+            suscripcion.ultima_secuencia = lote[-1].secuencia
+            entregados += len(lote)
+        return entregados
+
+    def _recortar(self) -> None:
+        """Descarta los eventos que exceden la retención y ya fueron entregados."""
+        for suscripcion in list(self.suscripciones):
+            if self.ultima_secuencia - suscripcion.ultima_secuencia > self.retraso_maximo:
+                self.suscripciones.remove(suscripcion)
+                suscripcion.perdida = True
+                print(f"Suscriptor de cambios dado de baja: {self.ultima_secuencia - suscripcion.ultima_secuencia} "
+                      f"eventos pendientes")
+        limite = self.ultima_secuencia - self.capacidad_retencion
+        for suscripcion in self.suscripciones:
+            limite = min(limite, suscripcion.ultima_secuencia)
+        descartar = limite - self.primera_secuencia + 1
+        if descartar > 0:
+            self.inicio += descartar
+            # Compactar la lista cuando la parte descartada domina
+            if self.inicio > len(self.eventos) // 2:
+                del self.eventos[:self.inicio]
+                self.inicio = 0
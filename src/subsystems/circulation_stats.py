@@ -0,0 +1,250 @@
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+from src.models.models import Prestamo
+
+
+class ConteoOrdenado:
+    """Contadores que sólo suben o bajan de uno en uno, con los mayores en O(k).
+
+    Las claves se agrupan por conteo y los conteos no vacíos forman una lista
+    doblemente enlazada (el 0 hace de centinela). Como cada cambio mueve la
+    clave al conteo vecino, incrementar y decrementar cuestan O(1), y obtener
+    las k mayores recorre como mucho k grupos desde el máximo.
+    """
+
+    def __init__(self):
+        self.conteos: Dict[Hashable, int] = {}
+        self.grupos: Dict[int, Dict[Hashable, None]] = {0: {}}  # conteo -> claves (por orden de llegada)
+        self.mayor: Dict[int, Optional[int]] = {0: None}  # Siguiente conteo no vacío hacia arriba
+        self.menor: Dict[int, int] = {}  # Siguiente conteo no vacío hacia abajo
+        self.maximo = 0
+
+    def _enlazar(self, nuevo: int, debajo: int) -> None:
+        arriba = self.mayor[debajo]
+        self.grupos[nuevo] = {}
+        self.mayor[nuevo], self.menor[nuevo] = arriba, debajo
+        self.mayor[debajo] = nuevo
+        if arriba is None:
+            self.maximo = nuevo
+        else:
+            self.menor[arriba] = nuevo
+
+    def _desenlazar(self, conteo: int) -> None:
+        debajo, arriba = self.menor.pop(conteo), self.mayor.pop(conteo)
+        del self.grupos[conteo]
+        self.mayor[debajo] = arriba
+        if arriba is None:
+            self.maximo = debajo
+        else:
+            self.menor[arriba] = debajo
+
+    def _mover(self, clave: Hashable, actual: int, nuevo: int) -> None:
+        if nuevo not in self.grupos:
+            self._enlazar(nuevo, actual if nuevo > actual else self.menor[actual])
+        if nuevo:
+            self.grupos[nuevo][clave] = None
+            self.conteos[clave] = nuevo
+        else:
+            del self.conteos[clave]
+        if actual:
+            del self.grupos[actual][clave]
+            if not self.grupos[actual]:
+                self._desenlazar(actual)
+
+    def incrementar(self, clave: Hashable) -> None:
+        actual = self.conteos.get(clave, 0)
+        self._mover(clave, actual, actual + 1)
+
+    def decrementar(self, clave: Hashable) -> None:
+        actual = self.conteos.get(clave, 0)
+        if actual:
+            self._mover(clave, actual, actual - 1)
+
+    def obtener(self, clave: Hashable) -> int:
+        return self.conteos.get(clave, 0)
+
+    def mayores(self, n: int) -> List[Tuple[Hashable, int]]:
+        """Las `n` claves con más cuenta, de mayor a menor (empates por orden de llegada)."""
+        resultado = []
+        conteo = self.maximo
+        while conteo and len(resultado) < n:
+            for clave in self.grupos[conteo]:
+                resultado.append((clave, conteo))
+                if len(resultado) == n:
+                    break
+            conteo = self.menor[conteo]
+        return resultado
+
+    def __len__(self) -> int:
+        return len(self.conteos)
+
+
+@dataclass
+class _Ranura:
+    """Actividad registrada en un intervalo de la ventana deslizante."""
+    libros: Dict[int, int] = field(default_factory=dict)
+    usuarios: Dict[int, int] = field(default_factory=dict)
+    prestamos: int = 0
+    segundos_prestamo: float = 0.0  # Suma de duraciones de los préstamos devueltos en la ranura
+    devoluciones: int = 0
+
+
+class EstadisticasCirculacion:
+    """Estadísticas de préstamos mantenidas al crear y finalizar cada préstamo.
+
+    Guarda contadores globales, la suma de duraciones para la media y, para
+    libros y usuarios, conteos históricos y de la ventana deslizante más
+    reciente. La ventana se divide en `num_ranuras` intervalos: al avanzar el
+    reloj, la ranura que sale resta su actividad de los conteos de la ventana,
+    así que cada préstamo se suma y se resta una sola vez. Ninguna lectura
+    recorre el historial de préstamos.
+    """
+
+    def __init__(self, ventana: timedelta = timedelta(days=7), num_ranuras: int = 28):
+        if num_ranuras < 1 or ventana <= timedelta(0):
+            raise ValueError("La ventana y el número de ranuras deben ser positivos")
+        self.ventana = ventana
+        self.num_ranuras = num_ranuras
+        self.segundos_ranura = ventana.total_seconds() / num_ranuras
+        self._lock = threading.RLock()
+        self.limpiar()
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self.total_prestamos = 0
+            self.total_devoluciones = 0
+            self.prestamos_activos = 0
+            self.segundos_prestamo = 0.0
+            self.libros = ConteoOrdenado()
+            self.usuarios = ConteoOrdenado()
+            self.activos_por_usuario: Dict[int, int] = {}
+            self.libros_ventana = ConteoOrdenado()
+            self.usuarios_ventana = ConteoOrdenado()
+            self.prestamos_ventana = 0
+            self.segundos_ventana = 0.0
+            self.devoluciones_ventana = 0
+            self._ranuras: Dict[int, _Ranura] = {}
+            self._ranura_actual: Optional[int] = None
+
+    def _indice_ranura(self, fecha: datetime) -> int:
+        return int(fecha.timestamp() // self.segundos_ranura)
+
+    def _avanzar(self, ahora: datetime) -> int:
+        """Descarta de la ventana las ranuras que han quedado fuera y retorna la actual."""
+        actual = self._indice_ranura(ahora)
+        if actual != self._ranura_actual:
+            self._ranura_actual = actual
+            for indice in [indice for indice in self._ranuras if indice <= actual - self.num_ranuras]:
+                ranura = self._ranuras.pop(indice)
+                for conteos, ventana in ((ranura.libros, self.libros_ventana),
+                                         (ranura.usuarios, self.usuarios_ventana)):
+                    for clave, veces in conteos.items():
+                        for _ in range(veces):
+                            ventana.decrementar(clave)
+                self.prestamos_ventana -= ranura.prestamos
+                self.segundos_ventana -= ranura.segundos_prestamo
+                self.devoluciones_ventana -= ranura.devoluciones
+        return actual
+
+    def _ranura(self, fecha: datetime) -> Optional[_Ranura]:
+        """Ranura de la ventana en la que cae `fecha`, o None si es más antigua que la ventana."""
+        actual = self._avanzar(datetime.now())
+        indice = min(self._indice_ranura(fecha), actual)
+        if indice <= actual - self.num_ranuras:
+            return None
+        ranura = self._ranuras.get(indice)
+        if ranura is None:
+            ranura = self._ranuras[indice] = _Ranura()
+        return ranura
+
+    def registrar_prestamo(self, prestamo: Prestamo) -> None:
+        with self._lock:
+            self.total_prestamos += 1
+            self.prestamos_activos += 1
+            self.activos_por_usuario[prestamo.id_usuario] = self.activos_por_usuario.get(prestamo.id_usuario, 0) + 1
+            self.libros.incrementar(prestamo.id_libro)
+            self.usuarios.incrementar(prestamo.id_usuario)
+            ranura = self._ranura(prestamo.fecha_prestamo)
+            if ranura is not None:
+                ranura.libros[prestamo.id_libro] = ranura.libros.get(prestamo.id_libro, 0) + 1
+                ranura.usuarios[prestamo.id_usuario] = ranura.usuarios.get(prestamo.id_usuario, 0) + 1
+                ranura.prestamos += 1
+                self.prestamos_ventana += 1
+                self.libros_ventana.incrementar(prestamo.id_libro)
+                self.usuarios_ventana.incrementar(prestamo.id_usuario)
+
+    def registrar_devolucion(self, prestamo: Prestamo) -> None:
+        with self._lock:
+            segundos = (prestamo.fecha_devolucion - prestamo.fecha_prestamo).total_seconds()
+            self.total_devoluciones += 1
+            self.prestamos_activos -= 1
+            activos = self.activos_por_usuario.get(prestamo.id_usuario, 0) - 1
+            if activos > 0:
+                self.activos_por_usuario[prestamo.id_usuario] = activos
+            else:
+                self.activos_por_usuario.pop(prestamo.id_usuario, None)
+            self.segundos_prestamo += segundos
+            ranura = self._ranura(prestamo.fecha_devolucion)
+            if ranura is not None:
+                ranura.segundos_prestamo += segundos
+                ranura.devoluciones += 1
+                self.segundos_ventana += segundos
+                self.devoluciones_ventana += 1
+
+    def reconstruir(self, prestamos: Iterable[Prestamo]) -> None:
+        """Recalcula todo a partir de los préstamos existentes (p. ej. tras una importación)."""
+        with self._lock:
+            self.limpiar()
+            for prestamo in prestamos:
+                self.registrar_prestamo(prestamo)
+                if prestamo.fecha_devolucion:
+                    self.registrar_devolucion(prestamo)
+
+    def duracion_media_dias(self, ventana: bool = False) -> float:
+        """Duración media de los préstamos devueltos, histórica o de la ventana."""
+        with self._lock:
+            if ventana:
+                self._avanzar(datetime.now())
+                segundos, devoluciones = self.segundos_ventana, self.devoluciones_ventana
+            else:
+                segundos, devoluciones = self.segundos_prestamo, self.total_devoluciones
+            return segundos / devoluciones / 86400 if devoluciones else 0.0
+
+    def libros_mas_prestados(self, n: int = 10, ventana: bool = False) -> List[Tuple[int, int]]:
+        """(id_libro, préstamos) de los `n` libros más prestados."""
+        with self._lock:
+            if ventana:
+                self._avanzar(datetime.now())
+            return (self.libros_ventana if ventana else self.libros).mayores(n)
+
+    def usuarios_mas_activos(self, n: int = 10, ventana: bool = False) -> List[Tuple[int, int]]:
+        """(id_usuario, préstamos) de los `n` usuarios con más préstamos."""
+        with self._lock:
+            if ventana:
+                self._avanzar(datetime.now())
+            return (self.usuarios_ventana if ventana else self.usuarios).mayores(n)
+
+    def prestamos_activos_usuario(self, id_usuario: int) -> int:
+        return self.activos_por_usuario.get(id_usuario, 0)
+
+    def resumen(self, n: int = 10) -> Dict:
+        """Datos para un panel: contadores, medias y los `n` primeros de cada ranking."""
+        with self._lock:
+            self._avanzar(datetime.now())
+            return {
+                "total_prestamos": self.total_prestamos,
+                "prestamos_activos": self.prestamos_activos,
+                "total_devoluciones": self.total_devoluciones,
+                "duracion_media_dias": self.duracion_media_dias(),
+                "libros_mas_prestados": self.libros.mayores(n),
+                "usuarios_mas_activos": self.usuarios.mayores(n),
+                "ventana": {
+                    "dias": self.ventana.total_seconds() / 86400,
+                    "prestamos": self.prestamos_ventana,
+                    "duracion_media_dias": self.duracion_media_dias(ventana=True),
+                    "libros_mas_prestados": self.libros_ventana.mayores(n),
+                    "usuarios_mas_activos": self.usuarios_ventana.mayores(n),
+                },
+            }
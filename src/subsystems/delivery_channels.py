@@ -0,0 +1,266 @@
+import heapq
+import itertools
+import json
+import random
+import smtplib
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from email.message import EmailMessage
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+class ErrorEntrega(Exception):
+    """Fallo al entregar un mensaje; `transitorio` indica si merece reintento."""
+
+    def __init__(self, mensaje: str, transitorio: bool = True):
+        super().__init__(mensaje)
+        self.transitorio = transitorio
+
+
+class CubetaTokens:
+    """Limitador de tasa tipo token bucket: `tasa` mensajes/s con ráfagas de `capacidad`."""
+
+    def __init__(self, tasa: float, capacidad: int, reloj: Callable[[], float] = time.monotonic):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.reloj = reloj
+        self.tokens = float(capacidad)
+        self.ultimo = reloj()
+        self._lock = threading.Lock()
+
+    def reservar(self) -> float:
+        """Toma un token y devuelve cuántos segundos hay que esperar para usarlo."""
+        with self._lock:
+            ahora = self.reloj()
+            self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+            self.ultimo = ahora
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.tasa
+
+
+class TransporteSMTP:
+    """Envía emails a un servidor SMTP reutilizando la conexión."""
+
+    def __init__(self, host: str = "localhost", puerto: int = 25,
+                 remitente: str = "biblioteca@example.com", timeout: float = 10.0):
+        self.host = host
+        self.puerto = puerto
+        self.remitente = remitente
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def enviar(self, mensaje: Dict) -> None:
+        email = EmailMessage()
+        email["From"] = self.remitente
+        email["To"] = mensaje["destinatario"]
+        email["Subject"] = mensaje.get("asunto", "")
+        email.set_content(mensaje["contenido"])
+        try:
+            if self._smtp is None:
+                self._smtp = smtplib.SMTP(self.host, self.puerto, timeout=self.timeout)
+            self._smtp.send_message(email)
+        except smtplib.SMTPResponseException as error:
+            raise ErrorEntrega(f"SMTP {error.smtp_code}: {error.smtp_error!r}",
+                               transitorio=400 <= error.smtp_code < 500)
+        except smtplib.SMTPRecipientsRefused as error:
+            codigos = [codigo for codigo, _ in error.recipients.values()]
+            raise ErrorEntrega(f"Destinatarios rechazados: {codigos}",
+                               transitorio=any(400 <= codigo < 500 for codigo in codigos))
+        except (smtplib.SMTPException, OSError):
+            # Conexión caída: se reabrirá en el siguiente intento
+            self.cerrar()
+            raise
+
+    def cerrar(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+
+class TransporteSMSHTTP:
+    """Envía SMS con un POST JSON a la API HTTP de un proveedor."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def enviar(self, mensaje: Dict) -> None:
+        cuerpo = json.dumps({"numero": mensaje["destinatario"], "mensaje": mensaje["contenido"]}).encode("utf-8")
+        solicitud = urllib.request.Request(self.url, data=cuerpo, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(solicitud, timeout=self.timeout) as respuesta:
+                respuesta.read()
+        except urllib.error.HTTPError as error:
+            raise ErrorEntrega(f"HTTP {error.code}", transitorio=error.code == 429 or error.code >= 500)
+
+    def cerrar(self) -> None:
+        pass
+
+
+class CanalEntrega:
+    """Canal asíncrono de entrega con límite de tasa, reintentos y cartas muertas.
+
+    `enviar` sólo encola el mensaje; un hilo del canal lo entrega respetando
+    la cubeta de tokens. Los fallos transitorios se reintentan con espera
+    exponencial con jitter completo; los permanentes, o los que agotan
+    `max_intentos`, pasan a `cartas_muertas`. Si se inyecta `dormir` junto
+    con `reloj`, todas las esperas (tokens y reintentos) pasan por él en vez
+    de por el tiempo real.
+    """
+
+    def __init__(self, nombre: str, transporte, mensajes_por_segundo: float = 10.0, rafaga: int = 10,
+                 max_intentos: int = 5, espera_base: float = 0.5, espera_maxima: float = 30.0,
+                 reloj: Callable[[], float] = time.monotonic,
+                 dormir: Optional[Callable[[float], None]] = None):
+        self.nombre = nombre
+        self.transporte = transporte
+        self.cubeta = CubetaTokens(mensajes_por_segundo, rafaga, reloj)
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.reloj = reloj
+        self.dormir = dormir
+        self.pendientes: Deque[Dict] = deque()
+        self.reintentos: List[Tuple[float, int, Dict]] = []  # (listo_en, orden, mensaje)
+        self.cartas_muertas: List[Dict] = []
+        self.metricas = {"aceptados": 0, "enviados": 0, "reintentos": 0, "fallidos": 0}
+        self._orden = itertools.count()
+        self._en_curso = 0
+        self._condicion = threading.Condition()
+        self._hilo: Optional[threading.Thread] = None
+        self._activo = False
+        self._inicio: Optional[float] = None
+
+    def enviar(self, destinatario: str, contenido: str, asunto: str = "", id_mensaje: Optional[str] = None) -> bool:
+        """Encola un mensaje para entrega asíncrona."""
+        mensaje = {
+            "id": id_mensaje or str(next(self._orden)),
+            "destinatario": destinatario,
+            "asunto": asunto,
+            "contenido": contenido,
+            "intentos": 0,
+            "aceptado_en": self.reloj(),
+        }
+        with self._condicion:
+            self.pendientes.append(mensaje)
+            self.metricas["aceptados"] += 1
+            self._condicion.notify()
+        self.iniciar()
+        return True
+
+    def iniciar(self) -> None:
+        with self._condicion:
+            if self._activo:
+                return
+            self._activo = True
+            self._inicio = self._inicio or self.reloj()
+        self._hilo = threading.Thread(target=self._bucle, name=f"canal-{self.nombre}", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        """Detiene el hilo de entrega; los mensajes pendientes se conservan."""
+        with self._condicion:
+            self._activo = False
+            self._condicion.notify_all()
+        if self._hilo and self._hilo is not threading.current_thread():
+            self._hilo.join()
+        self._hilo = None
+        self.transporte.cerrar()
+
+    def esperar_vacio(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no queden mensajes pendientes, en reintento ni en curso."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._condicion:
+            while self.pendientes or self.reintentos or self._en_curso:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._condicion.wait(restante)
+            return True
+
+    def _siguiente(self) -> Optional[Dict]:
+        with self._condicion:
+            while self._activo:
+                ahora = self.reloj()
+                if self.reintentos and self.reintentos[0][0] <= ahora:
+                    mensaje = heapq.heappop(self.reintentos)[2]
+                elif self.pendientes:
+                    mensaje = self.pendientes.popleft()
+                else:
+                    self._esperar(self.reintentos[0][0] - ahora if self.reintentos else None)
+                    continue
+                self._en_curso += 1
+                return mensaje
+            return None
+
+    def _esperar(self, segundos: Optional[float]) -> None:
+        """Espera con la condición tomada; con `dormir` inyectado no depende del tiempo real."""
+        if self.dormir is None or segundos is None:
+            self._condicion.wait(segundos)
+            return
+        self._condicion.release()
+        try:
+            self.dormir(segundos)
+        finally:
+            self._condicion.acquire()
+
+    def _bucle(self) -> None:
+        while True:
+            mensaje = self._siguiente()
+            if mensaje is None:
+                return
+            espera = self.cubeta.reservar()
+            if espera > 0:
+                (self.dormir or time.sleep)(espera)
+            self._entregar(mensaje)
+
+    def _entregar(self, mensaje: Dict) -> None:
+        mensaje["intentos"] += 1
+        try:
+            self.transporte.enviar(mensaje)
+            error, transitorio = None, False
+        except ErrorEntrega as fallo:
+            error, transitorio = fallo, fallo.transitorio
+        except (smtplib.SMTPException, OSError) as fallo:
+            error, transitorio = fallo, True
+        except Exception as fallo:
+            # Mensaje inválido (p. ej. un salto de línea en una cabecera): reintentar no lo arregla
+            error, transitorio = fallo, False
+
+        with self._condicion:
+            try:
+                if error is None:
+                    self.metricas["enviados"] += 1
+                elif transitorio and mensaje["intentos"] < self.max_intentos:
+                    # Espera exponencial con jitter completo
+                    tope = min(self.espera_maxima, self.espera_base * 2 ** (mensaje["intentos"] - 1))
+                    heapq.heappush(self.reintentos,
+                                   (self.reloj() + random.uniform(0, tope), next(self._orden), mensaje))
+                    self.metricas["reintentos"] += 1
+                else:
+                    mensaje["error"] = f"{type(error).__name__}: {error}"
+                    self.cartas_muertas.append(mensaje)
+                    self.metricas["fallidos"] += 1
+                    print(f"Canal {self.nombre}: mensaje {mensaje['id']} a {mensaje['destinatario']} "
+                          f"descartado tras {mensaje['intentos']} intento(s): {error}")
+            finally:
+                self._en_curso -= 1
+                self._condicion.notify_all()
+
+    def obtener_metricas(self) -> Dict:
+        """Retorna contadores y rendimiento del canal."""
+        with self._condicion:
+            transcurrido = self.reloj() - self._inicio if self._inicio else 0.0
+            return {
+                **self.metricas,
+                "pendientes": len(self.pendientes),
+                "en_reintento": len(self.reintentos),
+                "cartas_muertas": len(self.cartas_muertas),
+                "mensajes_por_segundo": self.metricas["enviados"] / transcurrido if transcurrido > 0 else 0.0,
+            }
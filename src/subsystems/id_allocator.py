@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Tuple
+
+
+class _BloqueIds:
+    def __init__(self):
+        self.siguiente = 0
+        self.limite = 0  # Primer ID fuera del bloque actual
+        self.lock = threading.Lock()
+
+
+class AsignadorIds:
+    """Asignador de IDs por bloques (estilo hi/lo) respaldado por SQLite.
+
+    Cada entidad ("usuario", "libro", "prestamo", ...) tiene su propia
+    secuencia. Un proceso reserva bloques contiguos de `tamano_bloque` IDs
+    en una transacción de SQLite y luego los entrega desde memoria bajo un
+    lock propio de la entidad, de modo que varios hilos y procesos pueden
+    compartir el mismo archivo sin repetir IDs, también tras un reinicio.
+    Los IDs no usados de un bloque se pierden al terminar el proceso.
+    """
+
+    def __init__(self, ruta_bd: str, tamano_bloque: int = 1000):
+        self.ruta_bd = ruta_bd
+        self.tamano_bloque = tamano_bloque
+        self.bloques: Dict[str, _BloqueIds] = {}
+        self._lock_bloques = threading.Lock()
+        self._lock_bd = threading.Lock()
+        self._conexion = None
+        self._pid = None
+        with self._lock_bd:
+            self._obtener_conexion().execute(
+                "CREATE TABLE IF NOT EXISTS secuencias (entidad TEXT PRIMARY KEY, siguiente INTEGER NOT NULL)"
+            )
+
+    def _obtener_conexion(self) -> sqlite3.Connection:
+        """Conexión del proceso actual (se reabre tras un fork)."""
+        if self._conexion is None or self._pid != os.getpid():
+            self._conexion = sqlite3.connect(self.ruta_bd, timeout=30, isolation_level=None,
+                                             check_same_thread=False)
+            self._pid = os.getpid()
+        return self._conexion
+
+    def _avanzar_secuencia(self, entidad: str, nuevo_siguiente: Callable[[int], int]) -> int:
+        """Actualiza de forma atómica la secuencia de una entidad y retorna su valor anterior."""
+        with self._lock_bd:
+            conexion = self._obtener_conexion()
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                fila = conexion.execute("SELECT siguiente FROM secuencias WHERE entidad = ?", (entidad,)).fetchone()
+                actual = fila[0] if fila else 1
+                conexion.execute(
+                    "INSERT INTO secuencias (entidad, siguiente) VALUES (?, ?) "
+                    "ON CONFLICT(entidad) DO UPDATE SET siguiente = excluded.siguiente",
+                    (entidad, nuevo_siguiente(actual)),
+                )
+                conexion.execute("COMMIT")
+            except Exception:
+                # SQLite deshace por sí mismo algunos errores (p. ej. disco lleno);
+                # un ROLLBACK sin transacción ocultaría el error original
+                if conexion.in_transaction:
+                    conexion.execute("ROLLBACK")
+                raise
+        return actual
+
+    def reservar_bloque(self, entidad: str, tamano: int) -> Tuple[int, int]:
+        """Reserva de forma atómica los IDs [inicio, fin) de una entidad."""
+        inicio = self._avanzar_secuencia(entidad, lambda actual: actual + tamano)
+        return inicio, inicio + tamano
+
+    def asegurar_minimo(self, entidad: str, minimo: int) -> None:
+        """Impide que se entreguen IDs menores que `minimo` (p. ej. tras importar datos con IDs propios).
+
+        Adelanta la secuencia compartida si hace falta y descarta el bloque
+        local si aún contenía IDs por debajo del mínimo.
+        """
+        bloque = self._bloque(entidad)
+        with bloque.lock:
+            self._avanzar_secuencia(entidad, lambda actual: max(actual, minimo))
+            if bloque.siguiente < minimo:
+                bloque.siguiente = bloque.limite = 0
+
+    def _bloque(self, entidad: str) -> _BloqueIds:
+        bloque = self.bloques.get(entidad)
+        if bloque is None:
+            with self._lock_bloques:
+                bloque = self.bloques.setdefault(entidad, _BloqueIds())
+        return bloque
+
+    def siguiente_id(self, entidad: str) -> int:
+        """Entrega el siguiente ID de la entidad, reservando un bloque nuevo si hace falta."""
+        bloque = self._bloque(entidad)
+        with bloque.lock:
+            if bloque.siguiente >= bloque.limite:
+                bloque.siguiente, bloque.limite = self.reservar_bloque(entidad, self.tamano_bloque)
+            id_entidad = bloque.siguiente
+            bloque.siguiente += 1
+            return id_entidad
+
+    def siguientes_ids(self, entidad: str, cantidad: int) -> List[int]:
+        """Entrega varios IDs de una vez, útil para cargas masivas."""
+        bloque = self._bloque(entidad)
+        ids: List[int] = []
+        with bloque.lock:
+            while len(ids) < cantidad:
+                if bloque.siguiente >= bloque.limite:
+                    tamano = max(self.tamano_bloque, cantidad - len(ids))
+                    bloque.siguiente, bloque.limite = self.reservar_bloque(entidad, tamano)
+                tomar = min(cantidad - len(ids), bloque.limite - bloque.siguiente)
+                ids.extend(range(bloque.siguiente, bloque.siguiente + tomar))
+                bloque.siguiente += tomar
+        return ids
+
+    def cerrar(self) -> None:
+        with self._lock_bd:
+            if self._conexion is not None and self._pid == os.getpid():
+                self._conexion.close()
+            self._conexion = None
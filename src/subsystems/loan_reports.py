@@ -0,0 +1,139 @@
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.models.fechas import MICROS_DIA, SIN_DEVOLUCION, fecha_a_micros
+from src.models.models import Prestamo
+from src.subsystems.loan_system import SistemaPrestamos
+
+# Formato compacto de un préstamo para enviarlo a los procesos del pool:
+# id, id_usuario, id_libro, fecha_prestamo, fecha_devolucion, dias_plazo,
+# con las fechas en microsegundos (ver src.models.fechas).
+REGISTRO_PRESTAMO = struct.Struct("<qqqqqi")
+
+
+def _agregar_particion(datos: bytes, corte: int, tarifa_diaria: float) -> Tuple:
+    """Calcula los agregados parciales de una partición serializada."""
+    total = activos = 0
+    total_multas = 0.0
+    vencidos = []
+    actividad: Dict[int, List] = {}
+
+    for id_prestamo, id_usuario, _, inicio, devolucion, dias_plazo in REGISTRO_PRESTAMO.iter_unpack(datos):
+        vencimiento = inicio + dias_plazo * MICROS_DIA
+        devuelto = devolucion != SIN_DEVOLUCION
+
+        # Mismo criterio que SistemaPrestamos.calcular_multa y Prestamo.esta_vencido
+        fin = devolucion if devuelto else corte
+        multa = (fin - vencimiento) // MICROS_DIA * tarifa_diaria if fin > vencimiento else 0.0
+
+        registro = actividad.get(id_usuario)
+        if registro is None:
+            registro = actividad[id_usuario] = [0, 0, 0.0]
+        registro[0] += 1
+        registro[2] += multa
+        total += 1
+        total_multas += multa
+        if not devuelto:
+            registro[1] += 1
+            activos += 1
+            if corte > vencimiento:
+                vencidos.append(id_prestamo)
+
+    return total, activos, total_multas, vencidos, actividad
+
+
+class GeneradorReportes:
+    def __init__(self, sistema_prestamos: SistemaPrestamos):
+        self.sistema_prestamos = sistema_prestamos
+
+    def _particionar(self, num_particiones: int, prestamos: Optional[Iterable[Prestamo]] = None) -> List[bytes]:
+        """Serializa la tabla de préstamos (u otra colección de préstamos) en particiones compactas."""
+        prestamos = list(self.sistema_prestamos.prestamos.values() if prestamos is None else prestamos)
+        tamano = max(1, -(-len(prestamos) // num_particiones))
+        empaquetar = REGISTRO_PRESTAMO.pack
+        particiones = []
+        for desde in range(0, len(prestamos), tamano):
+            particiones.append(b"".join(
+                empaquetar(p.id, p.id_usuario, p.id_libro, fecha_a_micros(p.fecha_prestamo),
+                           fecha_a_micros(p.fecha_devolucion) if p.fecha_devolucion else SIN_DEVOLUCION,
+                           p.dias_plazo)
+                for p in prestamos[desde:desde + tamano]
+            ))
+        return particiones
+
+    def generar_reporte(self, num_procesos: Optional[int] = None, fecha_corte: Optional[datetime] = None,
+                        prestamos: Optional[Iterable[Prestamo]] = None) -> Dict:
+        """Genera el reporte de multas, vencidos y actividad en un pool de procesos.
+        
+        Por defecto recorre los préstamos vivos; `prestamos` permite pasar
+        otros, p. ej. los de una instantánea.
+        """
+        num_procesos = num_procesos or os.cpu_count() or 1
+        fecha_corte = fecha_corte or datetime.now()
+        corte = fecha_a_micros(fecha_corte)
+        tarifa = self.sistema_prestamos.TARIFA_MULTA_DIARIA
+
+        # Varias particiones por proceso para equilibrar la carga
+        particiones = self._particionar(num_procesos * 4, prestamos)
+        if num_procesos == 1:
+            parciales = [_agregar_particion(datos, corte, tarifa) for datos in particiones]
+        else:
+            with ProcessPoolExecutor(max_workers=num_procesos) as pool:
+                parciales = list(pool.map(_agregar_particion, particiones,
+                                          [corte] * len(particiones), [tarifa] * len(particiones)))
+
+        return self._combinar(parciales, fecha_corte)
+
+    def _combinar(self, parciales: List[Tuple], fecha_corte: datetime) -> Dict:
+        """Combina los agregados parciales en el reporte final."""
+        total = activos = 0
+        total_multas = 0.0
+        vencidos = []
+        actividad: Dict[int, Dict] = {}
+        for p_total, p_activos, p_multas, p_vencidos, p_actividad in parciales:
+            total += p_total
+            activos += p_activos
+            total_multas += p_multas
+            vencidos.extend(p_vencidos)
+            for id_usuario, (prestamos, activos_usuario, multas) in p_actividad.items():
+                registro = actividad.setdefault(id_usuario, {"prestamos": 0, "activos": 0, "multas": 0.0})
+                registro["prestamos"] += prestamos
+                registro["activos"] += activos_usuario
+                registro["multas"] += multas
+
+        return {
+            "fecha_corte": fecha_corte,
+            "total_prestamos": total,
+            "prestamos_activos": activos,
+            "total_multas": total_multas,
+            "vencidos": sorted(vencidos),
+            "actividad_usuarios": actividad,
+        }
+
+    def generar_reporte_secuencial(self, fecha_corte: Optional[datetime] = None) -> Dict:
+        """Genera el mismo reporte recorriendo los préstamos en el proceso actual."""
+        fecha_corte = fecha_corte or datetime.now()
+        total_multas = 0.0
+        vencidos = []
+        actividad: Dict[int, Dict] = {}
+        for prestamo in self.sistema_prestamos.prestamos.values():
+            multa = self.sistema_prestamos.calcular_multa(prestamo.id, fecha_corte)
+            registro = actividad.setdefault(prestamo.id_usuario, {"prestamos": 0, "activos": 0, "multas": 0.0})
+            registro["prestamos"] += 1
+            registro["multas"] += multa
+            total_multas += multa
+            if not prestamo.fecha_devolucion:
+                registro["activos"] += 1
+            if not prestamo.fecha_devolucion and fecha_corte > prestamo.fecha_vencimiento:
+                vencidos.append(prestamo.id)
+
+        return {
+            "fecha_corte": fecha_corte,
+            "total_prestamos": len(self.sistema_prestamos.prestamos),
+            "prestamos_activos": sum(r["activos"] for r in actividad.values()),
+            "total_multas": total_multas,
+            "vencidos": sorted(vencidos),
+            "actividad_usuarios": actividad,
+        }
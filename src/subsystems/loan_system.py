@@ -1,53 +1,115 @@
+import threading
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from src.models.models import Prestamo
 from src.subsystems.book_catalog import CatalogoLibros
+from src.subsystems.change_stream import FlujoCambios
+from src.subsystems.circulation_stats import EstadisticasCirculacion
+from src.subsystems.id_allocator import AsignadorIds
+from src.subsystems.snapshots import RegistroVersiones
 
 class SistemaPrestamos:
-    def __init__(self, catalogo_libros: CatalogoLibros):
+    TARIFA_MULTA_DIARIA = 1.5  # Tarifa diaria de multa
+    
+    def __init__(self, catalogo_libros: CatalogoLibros, flujo_cambios: Optional[FlujoCambios] = None,
+                 asignador_ids: Optional[AsignadorIds] = None):
         self.prestamos = {}
         self.contador_id = 1
+        self.paso_id = 1  # Salto entre IDs consecutivos (N en modo fragmentado)
         self.catalogo = catalogo_libros
+        self.flujo_cambios = flujo_cambios
+        self.asignador_ids = asignador_ids  # Si se indica, sustituye a contador_id
+        self.versiones: Optional[RegistroVersiones] = None  # Para instantáneas de sólo lectura
+        self.estadisticas = EstadisticasCirculacion()  # Se actualiza en cada alta y devolución
+        # Llamados con (operación, préstamo) tras crear, extender o finalizar un préstamo
+        self.observadores: List[Callable[[str, Prestamo], None]] = []
+        self._lock_ids = threading.Lock()
+    
+    def _siguiente_id(self) -> int:
+        """Obtiene un nuevo ID de forma segura entre hilos."""
+        if self.asignador_ids:
+            id_prestamo = self.asignador_ids.siguiente_id("prestamo")
+            with self._lock_ids:
+                # Al día para que una exportación guarde el siguiente ID libre
+                self.contador_id = max(self.contador_id, id_prestamo + 1)
+            return id_prestamo
+        with self._lock_ids:
+            id_prestamo = self.contador_id
+            self.contador_id += self.paso_id
+            return id_prestamo
+    
+    def _modificando(self, id_prestamo: int):
+        """Conserva la versión previa del préstamo para las instantáneas abiertas."""
+        return self.versiones.modificando(id_prestamo) if self.versiones else nullcontext()
+    
+    def _operacion_atomica(self):
+        """Impide abrir instantáneas a mitad de un cambio que toca catálogo y préstamos.
+        
+        Mientras haya instantáneas abiertas se toma el lock que comparten los
+        registros de versiones durante toda la operación, así que una
+        instantánea ve el libro y su préstamo antes o después del cambio, nunca
+        a medias. Sin instantáneas no se toma: abrir una espera a que termine.
+        """
+        return self.versiones.gestor.escribiendo() if self.versiones else nullcontext()
+    
+    def _avisar(self, operacion: str, prestamo: Prestamo) -> None:
+        for observador in self.observadores:
+            observador(operacion, prestamo)
     
     def crear_prestamo(self, id_usuario: int, id_libro: int) -> Optional[Prestamo]:
         """Crea un nuevo préstamo si el libro está disponible."""
-        libro = self.catalogo.obtener_libro(id_libro)
-        if not libro or not libro.disponible:
-            print(f"El libro {id_libro} no está disponible para préstamo")
-            return None
-        
-        # Marcar libro como no disponible
-        self.catalogo.actualizar_disponibilidad(id_libro, False)
-        
-        # Crear préstamo
-        id_prestamo = self.contador_id
-        self.contador_id += 1
-        prestamo = Prestamo(id=id_prestamo, id_usuario=id_usuario, id_libro=id_libro)
-        self.prestamos[id_prestamo] = prestamo
+        with self._operacion_atomica():
+            libro = self.catalogo.obtener_libro(id_libro)
+            if not libro or not libro.disponible:
+                print(f"El libro {id_libro} no está disponible para préstamo")
+                return None
+            
+            # Marcar libro como no disponible
+            self.catalogo.actualizar_disponibilidad(id_libro, False)
+            
+            # Crear préstamo
+            id_prestamo = self._siguiente_id()
+            prestamo = Prestamo(id=id_prestamo, id_usuario=id_usuario, id_libro=id_libro)
+            with self._modificando(id_prestamo):
+                self.prestamos[id_prestamo] = prestamo
+        self.estadisticas.registrar_prestamo(prestamo)
+        if self.flujo_cambios:
+            # Si nadie puede leer el evento sólo avanza la secuencia: no hace falta copiar el préstamo
+            datos = dict(vars(prestamo)) if self.flujo_cambios.activo else None
+            self.flujo_cambios.publicar("prestamo", "crear", id_prestamo, datos)
+        self._avisar("crear", prestamo)
         
         print(f"Préstamo creado: {prestamo}")
         return prestamo
     
     def finalizar_prestamo(self, id_prestamo: int) -> bool:
         """Finaliza un préstamo y marca el libro como disponible."""
-        if id_prestamo not in self.prestamos:
-            return False
-        
-        prestamo = self.prestamos[id_prestamo]
-        if prestamo.fecha_devolucion:
-            return False  # Ya fue devuelto
-        
-        # Marcar libro como disponible
-        self.catalogo.actualizar_disponibilidad(prestamo.id_libro, True)
-        
-        # Actualizar fecha de devolución
-        prestamo.fecha_devolucion = datetime.now()
+        with self._operacion_atomica():
+            if id_prestamo not in self.prestamos:
+                return False
+            
+            prestamo = self.prestamos[id_prestamo]
+            if prestamo.fecha_devolucion:
+                return False  # Ya fue devuelto
+            
+            # Marcar libro como disponible
+            self.catalogo.actualizar_disponibilidad(prestamo.id_libro, True)
+            
+            # Actualizar fecha de devolución
+            with self._modificando(id_prestamo):
+                prestamo.fecha_devolucion = datetime.now()
+        self.estadisticas.registrar_devolucion(prestamo)
+        if self.flujo_cambios:
+            self.flujo_cambios.publicar("prestamo", "finalizar", id_prestamo,
+                                        {"fecha_devolucion": prestamo.fecha_devolucion})
+        self._avisar("finalizar", prestamo)
         print(f"Préstamo finalizado: {prestamo}")
         
         return True
     
-    def calcular_multa(self, id_prestamo: int) -> float:
-        """Calcula la multa por devolución tardía."""
+    def calcular_multa(self, id_prestamo: int, fecha_corte: Optional[datetime] = None) -> float:
+        """Calcula la multa por devolución tardía (si sigue activo, hasta `fecha_corte` o ahora)."""
         if id_prestamo not in self.prestamos:
             return 0.0
         
@@ -59,15 +121,14 @@ class SistemaPrestamos:
         
         # Calcular días de retraso
         fecha_limite = prestamo.fecha_vencimiento
-        fecha_actual = prestamo.fecha_devolucion or datetime.now()
+        fecha_actual = prestamo.fecha_devolucion or fecha_corte or datetime.now()
         
         if fecha_actual <= fecha_limite:
             return 0.0
         
         dias_retraso = (fecha_actual - fecha_limite).days
-        tarifa_diaria = 1.5  # Tarifa diaria de multa
         
-        return dias_retraso * tarifa_diaria
+        return dias_retraso * self.TARIFA_MULTA_DIARIA
     
     def extender_plazo(self, id_prestamo: int, dias_adicionales: int) -> bool:
         """Extiende el plazo de devolución de un préstamo."""
@@ -78,7 +139,11 @@ class SistemaPrestamos:
         if prestamo.fecha_devolucion or prestamo.esta_vencido:
             return False
         
-        prestamo.dias_plazo += dias_adicionales
+        with self._modificando(id_prestamo):
+            prestamo.dias_plazo += dias_adicionales
+        if self.flujo_cambios:
+            self.flujo_cambios.publicar("prestamo", "extender", id_prestamo, {"dias_plazo": prestamo.dias_plazo})
+        self._avisar("extender", prestamo)
         print(f"Plazo extendido para préstamo {id_prestamo}. Nueva fecha: {prestamo.fecha_vencimiento}")
         
         return True
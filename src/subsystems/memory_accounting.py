@@ -0,0 +1,140 @@
+import os
+import sys
+import tracemalloc
+import types
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Módulo de cada subsistema -> nombre con el que se le atribuye la memoria
+MODULOS_SUBSISTEMAS = {
+    "user_management.py": "usuarios",
+    "book_catalog.py": "libros",
+    "paged_catalog.py": "libros",
+    "catalog_index.py": "libros",
+    "loan_system.py": "prestamos",
+    "circulation_stats.py": "prestamos",
+    "notification_service.py": "notificaciones",
+    "scheduler.py": "notificaciones",
+    "delivery_channels.py": "notificaciones",
+    "reservation_system.py": "reservas",
+    "change_stream.py": "flujo_cambios",
+    "loan_reports.py": "reportes",
+    "binary_format.py": "archivo",
+    "library_facade.py": "fachada",
+}
+
+_NO_RECORRER = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+
+
+def tamano_profundo(objeto: Any, vistos: Optional[Set[int]] = None) -> int:
+    """Bytes aproximados retenidos por un objeto y lo que contiene.
+
+    Recorre contenedores y atributos de instancia, pero no funciones, clases
+    ni otros invocables. Un objeto ya presente en `vistos` no se vuelve a
+    contar, de modo que compartiendo el conjunto entre varias mediciones cada
+    objeto se atribuye sólo a la primera.
+    """
+    if vistos is None:
+        vistos = set()
+    total = 0
+    pendientes = [objeto]
+    while pendientes:
+        actual = pendientes.pop()
+        if id(actual) in vistos or isinstance(actual, _NO_RECORRER) or callable(actual):
+            continue
+        vistos.add(id(actual))
+        total += sys.getsizeof(actual)
+        if isinstance(actual, dict):
+            pendientes.extend(actual.keys())
+            pendientes.extend(actual.values())
+        elif isinstance(actual, (list, tuple, set, frozenset, deque)):
+            pendientes.extend(actual)
+        elif isinstance(actual, (str, bytes, bytearray, int, float, bool)) or actual is None:
+            continue
+        else:
+            if hasattr(actual, "__dict__"):
+                pendientes.append(actual.__dict__)
+            for atributo in getattr(type(actual), "__slots__", ()):
+                if hasattr(actual, atributo):
+                    pendientes.append(getattr(actual, atributo))
+    return total
+
+
+def medir_estructuras(estructuras: List[Tuple]) -> Dict[str, Dict[str, int]]:
+    """Cuenta entidades y bytes de cada estructura, sin contar dos veces lo compartido.
+
+    Cada elemento es (nombre, estructura) o (nombre, estructura, entidades):
+    sin tercer elemento se cuentan con len(); con None la estructura no
+    contiene entidades (p. ej. un mapa de bits) y sólo se miden sus bytes.
+    """
+    vistos: Set[int] = set()
+    uso = {}
+    for nombre, estructura, *explicitas in estructuras:
+        entidades = explicitas[0] if explicitas else len(estructura)
+        uso[nombre] = {"bytes": tamano_profundo(estructura, vistos)}
+        if entidades is not None:
+            uso[nombre]["entidades"] = entidades
+    uso["total"] = {
+        "entidades": sum(datos.get("entidades", 0) for datos in uso.values()),
+        "bytes": sum(datos["bytes"] for datos in uso.values()),
+    }
+    return uso
+
+
+def subsistema_de(traza: tracemalloc.Traceback) -> str:
+    """Subsistema del marco más reciente de la traza que pertenece a uno de ellos."""
+    for marco in reversed(traza):
+        subsistema = MODULOS_SUBSISTEMAS.get(os.path.basename(marco.filename))
+        if subsistema:
+            return subsistema
+    return "otros"
+
+
+class PerfiladorMemoria:
+    """Atribuye a cada subsistema el crecimiento de memoria entre dos instantáneas.
+
+    Usa tracemalloc guardando `num_marcos` marcos por asignación, para poder
+    subir desde el código que reserva la memoria (p. ej. el __init__ de un
+    dataclass) hasta el subsistema que lo llamó. tracemalloc ralentiza las
+    asignaciones, así que sólo está activo entre iniciar() y detener().
+    """
+
+    def __init__(self, num_marcos: int = 25):
+        self.num_marcos = num_marcos
+        self.instantanea: Optional[tracemalloc.Snapshot] = None
+        self._iniciado_aqui = False
+
+    def iniciar(self) -> None:
+        """Activa tracemalloc (si hace falta) y toma la instantánea de referencia."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.num_marcos)
+            self._iniciado_aqui = True
+        self.instantanea = self._tomar()
+
+    def _tomar(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+
+    def comparar(self) -> Dict[str, Dict[str, int]]:
+        """Crecimiento por subsistema desde la instantánea anterior, que pasa a ser la actual."""
+        if self.instantanea is None:
+            raise ValueError("El perfilador de memoria no está iniciado")
+        actual = self._tomar()
+        crecimiento: Dict[str, Dict[str, int]] = {}
+        for diferencia in actual.compare_to(self.instantanea, "traceback"):
+            if not diferencia.size_diff and not diferencia.count_diff:
+                continue
+            datos = crecimiento.setdefault(subsistema_de(diferencia.traceback), {"bytes": 0, "bloques": 0})
+            datos["bytes"] += diferencia.size_diff
+            datos["bloques"] += diferencia.count_diff
+        self.instantanea = actual
+        return dict(sorted(crecimiento.items(), key=lambda elemento: -elemento[1]["bytes"]))
+
+    def detener(self) -> None:
+        """Desactiva tracemalloc si lo activó este perfilador."""
+        if self._iniciado_aqui:
+            tracemalloc.stop()
+            self._iniciado_aqui = False
+        self.instantanea = None
@@ -1,16 +1,30 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 from src.models.models import Usuario, Prestamo
+from src.subsystems.scheduler import PlanificadorRecordatorios
+from src.subsystems.delivery_channels import CanalEntrega
 # Servicio de Notificaciones
 
 class ServicioNotificaciones:
-    def __init__(self):
+    def __init__(self, ventana_supresion: timedelta = timedelta(hours=12),
+                 planificador: Optional[PlanificadorRecordatorios] = None,
+                 canal_email: Optional[CanalEntrega] = None, canal_sms: Optional[CanalEntrega] = None):
         self.notificaciones_enviadas = []
+        # Canales de entrega reales; sin ellos los mensajes sólo se registran
+        self.canal_email = canal_email
+        self.canal_sms = canal_sms
+        # Un planificador vacío es falso (define __len__), así que se compara con None
+        self.planificador = planificador if planificador is not None else PlanificadorRecordatorios()
+        self.recordatorios_programados: Dict[str, Dict] = {}  # clave -> recordatorio pendiente
+        # Obtiene el email de un usuario al disparar sus recordatorios
+        self.resolver_email: Optional[Callable[[int], Optional[str]]] = None
+        # Recordatorios ya enviados: (id_usuario, id_prestamo, vencimiento) -> fecha de envío
+        self.ventana_supresion = ventana_supresion
+        self.recordatorios_recientes: Dict[Tuple[int, int, datetime], datetime] = {}
     
     def enviar_email(self, destinatario: str, asunto: str, contenido: str) -> bool:
-        """Envía un email a un usuario."""
-        # En un sistema real, aquí se conectaría con un servicio de email
+        """Envía un email a un usuario (o lo encola en el canal de email, si hay uno)."""
         notificacion = {
             "tipo": "email",
             "destinatario": destinatario,
@@ -20,12 +34,13 @@ class ServicioNotificaciones:
             "id": str(uuid.uuid4())
         }
         self.notificaciones_enviadas.append(notificacion)
+        if self.canal_email:
+            return self.canal_email.enviar(destinatario, contenido, asunto, notificacion["id"])
         print(f"Email enviado a {destinatario}: {asunto}")
         return True
     
     def enviar_sms(self, numero: str, mensaje: str) -> bool:
-        """Envía un SMS a un usuario."""
-        # En un sistema real, aquí se conectaría con un servicio de SMS
+        """Envía un SMS a un usuario (o lo encola en el canal de SMS, si hay uno)."""
         notificacion = {
             "tipo": "sms",
             "destinatario": numero,
@@ -34,12 +49,18 @@ class ServicioNotificaciones:
             "id": str(uuid.uuid4())
         }
         self.notificaciones_enviadas.append(notificacion)
+        if self.canal_sms:
+            return self.canal_sms.enviar(numero, mensaje, id_mensaje=notificacion["id"])
         print(f"SMS enviado a {numero}: {mensaje[:20]}...")
         return True
     
-    def programar_recordatorio(self, id_usuario: int, fecha: datetime, mensaje: str) -> bool:
-        """Programa un recordatorio para un usuario."""
-        # En un sistema real, esto se guardaría en una cola de tareas programadas
+    def programar_recordatorio(self, id_usuario: int, fecha: datetime, mensaje: str,
+                               clave: Optional[str] = None) -> bool:
+        """Programa un recordatorio para un usuario.
+        
+        Si se indica `clave`, el recordatorio puede cancelarse o reprogramarse
+        con ella; programar otra vez la misma clave reemplaza al anterior.
+        """
         notificacion = {
             "tipo": "recordatorio",
             "id_usuario": id_usuario,
@@ -48,10 +69,56 @@ class ServicioNotificaciones:
             "fecha_creacion": datetime.now(),
             "id": str(uuid.uuid4())
         }
-        self.notificaciones_enviadas.append(notificacion)
+        clave = clave or notificacion["id"]
+        with self.planificador.lock:
+            self.recordatorios_programados[clave] = notificacion
+            self.planificador.programar(clave, fecha, lambda: self._disparar_recordatorio(clave, notificacion))
         print(f"Recordatorio programado para usuario {id_usuario} el {fecha}")
         return True
     
+    def cancelar_recordatorio(self, clave: str) -> bool:
+        """Cancela un recordatorio programado."""
+        with self.planificador.lock:
+            self.recordatorios_programados.pop(clave, None)
+            return self.planificador.cancelar(clave)
+    
+    def cancelar_recordatorios(self) -> int:
+        """Cancela todos los recordatorios programados y retorna cuántos había."""
+        with self.planificador.lock:
+            claves = list(self.recordatorios_programados)
+            for clave in claves:
+                self.cancelar_recordatorio(clave)
+            return len(claves)
+    
+    def reprogramar_recordatorio(self, clave: str, fecha: datetime, mensaje: Optional[str] = None) -> bool:
+        """Mueve un recordatorio programado a otra fecha, opcionalmente con otro mensaje."""
+        with self.planificador.lock:
+            notificacion = self.recordatorios_programados.get(clave)
+            if notificacion is None or not self.planificador.reprogramar(clave, fecha):
+                return False
+            notificacion["fecha_programada"] = fecha
+            if mensaje is not None:
+                notificacion["mensaje"] = mensaje
+            return True
+    
+    def procesar_recordatorios(self) -> int:
+        """Dispara los recordatorios cuya fecha ya llegó."""
+        return self.planificador.ejecutar_pendientes()
+    
+    def _disparar_recordatorio(self, clave: str, notificacion: Dict) -> None:
+        """Entrega un recordatorio vencido por email o, sin destinatario, lo registra."""
+        with self.planificador.lock:
+            # La clave pudo cancelarse o reprogramarse con otro recordatorio mientras éste se disparaba
+            if self.recordatorios_programados.get(clave) is notificacion:
+                del self.recordatorios_programados[clave]
+        email = self.resolver_email(notificacion["id_usuario"]) if self.resolver_email else None
+        if email:
+            self.enviar_email(email, "Recordatorio de la Biblioteca Digital", notificacion["mensaje"])
+            return
+        notificacion["fecha_envio"] = datetime.now()
+        self.notificaciones_enviadas.append(notificacion)
+        print(f"Recordatorio para usuario {notificacion['id_usuario']}: {notificacion['mensaje'][:20]}...")
+    
     def notificar_vencimiento(self, prestamo: Prestamo, usuario: Usuario) -> bool:
         """Notifica a un usuario sobre un préstamo a punto de vencer."""
         dias_restantes = (prestamo.fecha_vencimiento - datetime.now()).days
@@ -64,4 +131,49 @@ class ServicioNotificaciones:
             f"Atentamente,\nSistema de Biblioteca Digital"
         )
         
-        return self.enviar_email(usuario.email, asunto, contenido)
\ No newline at end of file
+        return self.enviar_email(usuario.email, asunto, contenido)
+    
+    def notificar_vencimientos(self, usuario: Usuario, prestamos: List[Prestamo], titulos: Dict[int, str]) -> bool:
+        """Envía un único recordatorio con todos los préstamos del usuario a punto de vencer.
+        
+        Se omiten los préstamos ya recordados dentro de la ventana de supresión,
+        de modo que repetir el proceso no reenvía los mismos avisos.
+        """
+        ahora = datetime.now()
+        pendientes = []
+        for prestamo in prestamos:
+            clave = (usuario.id, prestamo.id, prestamo.fecha_vencimiento)
+            enviado = self.recordatorios_recientes.get(clave)
+            if enviado is None or ahora - enviado > self.ventana_supresion:
+                pendientes.append((clave, prestamo))
+        
+        if not pendientes:
+            return False
+        
+        lineas = "".join(
+            f"- '{titulos.get(prestamo.id_libro, prestamo.id_libro)}': "
+            f"devolver antes del {prestamo.fecha_vencimiento.strftime('%d/%m/%Y')}\n"
+            for _, prestamo in sorted(pendientes, key=lambda p: p[1].fecha_vencimiento)
+        )
+        asunto = f"Recordatorio: {len(pendientes)} préstamo(s) a punto de vencer"
+        contenido = (
+            f"Estimado/a {usuario.nombre},\n\n"
+            f"Le recordamos que los siguientes préstamos vencen pronto:\n"
+            f"{lineas}\n"
+            f"Por favor, devuelva los libros a tiempo para evitar multas.\n\n"
+            f"Atentamente,\nSistema de Biblioteca Digital"
+        )
+        
+        if not self.enviar_email(usuario.email, asunto, contenido):
+            return False
+        for clave, _ in pendientes:
+            self.recordatorios_recientes[clave] = ahora
+        return True
+    
+    def purgar_recordatorios_recientes(self) -> int:
+        """Olvida los recordatorios enviados fuera de la ventana de supresión."""
+        limite = datetime.now() - self.ventana_supresion
+        antiguos = [clave for clave, fecha in self.recordatorios_recientes.items() if fecha < limite]
+        for clave in antiguos:
+            del self.recordatorios_recientes[clave]
+        return len(antiguos)
\ No newline at end of file
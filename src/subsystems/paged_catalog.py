@@ -0,0 +1,257 @@
+import mmap
+import os
+import struct
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional, Tuple
+from src.models.models import Libro
+from src.subsystems.book_catalog import CatalogoLibros
+from src.subsystems.change_stream import FlujoCambios
+from src.subsystems.id_allocator import AsignadorIds
+
+# Registro de un libro en disco: cabecera + título, autor e ISBN en UTF-8.
+# Los registros se agrupan en páginas de tamaño fijo y sólo cruzan el límite
+# de página cuando no caben en una página entera.
+CABECERA_LIBRO = struct.Struct("<qBHHH")  # id, disponible, longitudes de título, autor, ISBN
+
+
+def _codificar(libro: Libro) -> bytes:
+    titulo = libro.titulo.encode("utf-8")
+    autor = libro.autor.encode("utf-8")
+    isbn = libro.isbn.encode("utf-8")
+    return CABECERA_LIBRO.pack(libro.id, libro.disponible, len(titulo), len(autor), len(isbn)) + titulo + autor + isbn
+
+
+def _decodificar(datos) -> Libro:
+    id_libro, disponible, l_titulo, l_autor, l_isbn = CABECERA_LIBRO.unpack_from(datos)
+    inicio = CABECERA_LIBRO.size
+    titulo = str(datos[inicio:inicio + l_titulo], "utf-8")
+    inicio += l_titulo
+    autor = str(datos[inicio:inicio + l_autor], "utf-8")
+    inicio += l_autor
+    isbn = str(datos[inicio:inicio + l_isbn], "utf-8")
+    return Libro(id=id_libro, titulo=titulo, autor=autor, isbn=isbn, disponible=bool(disponible))
+
+
+class _LibrosPaginados(MutableMapping):
+    """Diccionario id -> Libro respaldado por un archivo paginado.
+
+    Los índices por ID e ISBN están siempre en memoria; de los registros sólo
+    se mantienen los usados más recientemente, hasta `max_residentes`
+    registros y, si se indica, hasta `max_bytes_residentes` bytes de registro
+    codificado (los objetos Libro ocupan algo más). Un registro residente
+    modificado se vuelve a escribir al ser desalojado o al sincronizar. Los
+    libros obtenidos al recorrer `values()` que no están residentes son
+    copias de sólo lectura.
+
+    Un registro que cambia de longitud se escribe al final y deja un hueco;
+    cuando los huecos superan a los datos vivos, el archivo se compacta.
+    """
+
+    def __init__(self, ruta_archivo: str, max_residentes: int, tamano_pagina: int,
+                 max_bytes_residentes: Optional[int] = None):
+        self.ruta_archivo = ruta_archivo
+        self.max_residentes = max_residentes
+        self.max_bytes_residentes = max_bytes_residentes
+        self.tamano_pagina = tamano_pagina
+        self.archivo = open(ruta_archivo, "w+b")
+        self.indice: Dict[int, Tuple[int, int]] = {}  # id -> (desplazamiento, longitud)
+        self.indice_isbn: Dict[str, List[int]] = {}
+        # id -> (libro, bytes con los que se leyó o escribió por última vez)
+        self.residentes: "OrderedDict[int, Tuple[Libro, bytes]]" = OrderedDict()
+        self.bytes_residentes = 0
+        self.fin = 0
+        self.bytes_vivos = 0  # Suma de las longitudes de los registros del índice
+        self.bytes_libres = 0  # Huecos dejados por registros movidos o borrados
+        self.lecturas_disco = 0
+        self.compactaciones = 0
+
+    def _escribir(self, id_libro: int, datos: bytes) -> None:
+        """Escribe un registro en su sitio si cabe; si no, al final de la última página."""
+        ubicacion = self.indice.get(id_libro)
+        if ubicacion and ubicacion[1] == len(datos):
+            desplazamiento = ubicacion[0]
+        else:
+            if ubicacion:
+                self._liberar(ubicacion[1])
+            libre_en_pagina = self.tamano_pagina - self.fin % self.tamano_pagina
+            if len(datos) > libre_en_pagina and len(datos) <= self.tamano_pagina:
+                self.fin += libre_en_pagina
+            desplazamiento = self.fin
+            self.fin += len(datos)
+            self.bytes_vivos += len(datos)
+            self.indice[id_libro] = (desplazamiento, len(datos))
+        os.pwrite(self.archivo.fileno(), datos, desplazamiento)
+        if self.bytes_libres > max(self.bytes_vivos, 16 * self.tamano_pagina):
+            self._compactar()
+
+    def _liberar(self, longitud: int) -> None:
+        self.bytes_vivos -= longitud
+        self.bytes_libres += longitud
+
+    def _compactar(self) -> None:
+        """Reescribe los registros vivos en un archivo nuevo, sin huecos."""
+        temporal = self.ruta_archivo + ".tmp"
+        viejo, self.archivo = self.archivo, open(temporal, "w+b")
+        ubicaciones, self.indice = self.indice, {}
+        self.fin = self.bytes_vivos = self.bytes_libres = 0
+        with mmap.mmap(viejo.fileno(), 0, access=mmap.ACCESS_READ) as origen:
+            for id_libro, (desplazamiento, longitud) in ubicaciones.items():
+                self._escribir(id_libro, origen[desplazamiento:desplazamiento + longitud])
+        # Se reemplaza en lugar de truncar: un recorrido en curso conserva el mapa antiguo
+        os.replace(temporal, self.ruta_archivo)
+        viejo.close()
+        self.compactaciones += 1
+
+    def _leer(self, id_libro: int) -> bytes:
+        desplazamiento, longitud = self.indice[id_libro]
+        self.lecturas_disco += 1
+        return os.pread(self.archivo.fileno(), longitud, desplazamiento)
+
+    def _residir(self, id_libro: int, libro: Libro, datos: bytes) -> None:
+        anterior = self.residentes.get(id_libro)
+        if anterior is not None:
+            self.bytes_residentes -= len(anterior[1])
+        self.residentes[id_libro] = (libro, datos)
+        self.bytes_residentes += len(datos)
+        self.residentes.move_to_end(id_libro)
+        while len(self.residentes) > self.max_residentes or (
+                self.max_bytes_residentes is not None and self.bytes_residentes > self.max_bytes_residentes
+                and len(self.residentes) > 1):
+            id_viejo, (viejo, original) = self.residentes.popitem(last=False)
+            self.bytes_residentes -= len(original)
+            actual = _codificar(viejo)
+            if actual != original:
+                self._escribir(id_viejo, actual)
+
+    def __getitem__(self, id_libro: int) -> Libro:
+        residente = self.residentes.get(id_libro)
+        if residente is not None:
+            self.residentes.move_to_end(id_libro)
+            return residente[0]
+        if id_libro not in self.indice:
+            raise KeyError(id_libro)
+        datos = self._leer(id_libro)
+        libro = _decodificar(datos)
+        self._residir(id_libro, libro, datos)
+        return libro
+
+    def __setitem__(self, id_libro: int, libro: Libro) -> None:
+        if id_libro in self.indice:
+            self._quitar_isbn(id_libro)
+        datos = _codificar(libro)
+        self._escribir(id_libro, datos)
+        self.indice_isbn.setdefault(libro.isbn, []).append(id_libro)
+        self._residir(id_libro, libro, datos)
+
+    def __delitem__(self, id_libro: int) -> None:
+        if id_libro not in self.indice:
+            raise KeyError(id_libro)
+        self._quitar_isbn(id_libro)
+        self._liberar(self.indice.pop(id_libro)[1])
+        residente = self.residentes.pop(id_libro, None)
+        if residente is not None:
+            self.bytes_residentes -= len(residente[1])
+
+    def _quitar_isbn(self, id_libro: int) -> None:
+        residente = self.residentes.get(id_libro)
+        isbn = residente[0].isbn if residente else _decodificar(self._leer(id_libro)).isbn
+        ids = self.indice_isbn.get(isbn, [])
+        if id_libro in ids:
+            ids.remove(id_libro)
+            if not ids:
+                del self.indice_isbn[isbn]
+
+    def __contains__(self, id_libro) -> bool:
+        return id_libro in self.indice
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(list(self.indice))
+
+    def __len__(self) -> int:
+        return len(self.indice)
+
+    def _recorrer(self) -> Iterator[Tuple[int, Libro]]:
+        """Recorre el archivo mapeado sin alterar el conjunto residente."""
+        self.sincronizar()
+        if not self.indice:
+            return
+        with mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+            for id_libro, (desplazamiento, longitud) in list(self.indice.items()):
+                residente = self.residentes.get(id_libro)
+                if residente is not None:
+                    yield id_libro, residente[0]
+                elif desplazamiento + longitud <= len(mapa):
+                    yield id_libro, _decodificar(mapa[desplazamiento:desplazamiento + longitud])
+                elif id_libro in self.indice:
+                    yield id_libro, _decodificar(self._leer(id_libro))
+
+    def values(self):
+        return (libro for _, libro in self._recorrer())
+
+    def items(self):
+        return self._recorrer()
+
+    def clear(self) -> None:
+        self.archivo.truncate(0)
+        self.indice.clear()
+        self.indice_isbn.clear()
+        self.residentes.clear()
+        self.fin = self.bytes_vivos = self.bytes_libres = self.bytes_residentes = 0
+
+    def sincronizar(self) -> int:
+        """Escribe en disco los registros residentes modificados."""
+        escritos = 0
+        for id_libro, (libro, original) in list(self.residentes.items()):
+            actual = _codificar(libro)
+            if actual != original:
+                self._escribir(id_libro, actual)
+                self.residentes[id_libro] = (libro, actual)
+                self.bytes_residentes += len(actual) - len(original)
+                escritos += 1
+        return escritos
+
+    def cerrar(self) -> None:
+        self.sincronizar()
+        self.archivo.close()
+
+
+class CatalogoLibrosPaginado(CatalogoLibros):
+    """Catálogo cuyos libros viven en un archivo paginado con un LRU de residentes.
+
+    Por defecto no mantiene los índices de título y autor, que ocuparían
+    memoria por cada libro: consultar() comprueba los predicados leyendo los
+    libros. Con `indexar=True` se mantienen en memoria como en CatalogoLibros.
+    """
+
+    def __init__(self, ruta_archivo: str, max_residentes: int = 10_000, tamano_pagina: int = 4096,
+                 flujo_cambios: Optional[FlujoCambios] = None, asignador_ids: Optional[AsignadorIds] = None,
+                 indexar: bool = False, max_bytes_residentes: Optional[int] = None):
+        super().__init__(flujo_cambios, asignador_ids, indexar)
+        self.libros = _LibrosPaginados(ruta_archivo, max_residentes, tamano_pagina, max_bytes_residentes)
+
+    def buscar_por_isbn(self, isbn: str) -> List[Libro]:
+        """Busca libros por ISBN usando el índice residente."""
+        return [self.libros[id_libro] for id_libro in self.libros.indice_isbn.get(isbn, [])]
+
+    def obtener_estadisticas_memoria(self) -> Dict:
+        """Retorna el uso del conjunto residente y del archivo."""
+        return {
+            "libros": len(self.libros),
+            "residentes": len(self.libros.residentes),
+            "max_residentes": self.libros.max_residentes,
+            "bytes_residentes": self.libros.bytes_residentes,
+            "max_bytes_residentes": self.libros.max_bytes_residentes,
+            "lecturas_disco": self.libros.lecturas_disco,
+            "tamano_archivo": self.libros.fin,
+            "bytes_libres": self.libros.bytes_libres,
+            "compactaciones": self.libros.compactaciones,
+        }
+
+    def sincronizar(self) -> int:
+        """Escribe en disco los libros residentes modificados."""
+        return self.libros.sincronizar()
+
+    def cerrar(self) -> None:
+        """Sincroniza y cierra el archivo de páginas."""
+        self.libros.cerrar()
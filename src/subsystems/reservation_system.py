@@ -0,0 +1,126 @@
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class _ColaEspera:
+    """Cola FIFO de reservas de un libro.
+
+    Cada reserva recibe un turno creciente. Un árbol de Fenwick sobre los
+    turnos cuenta las reservas activas, de modo que la posición de un usuario
+    se obtiene en O(log n) aunque haya cancelaciones en medio de la cola.
+    """
+
+    def __init__(self):
+        self.cola = deque()  # (turno, id_usuario); las canceladas se descartan al salir
+        self.turnos: Dict[int, int] = {}  # id_usuario -> turno
+        self.base = 0  # Turno correspondiente a la posición 1 del árbol
+        self.arbol: List[int] = [0] * 17
+        self.siguiente_turno = 0
+
+    def _actualizar(self, turno: int, delta: int) -> None:
+        indice = turno - self.base + 1
+        while indice < len(self.arbol):
+            self.arbol[indice] += delta
+            indice += indice & -indice
+
+    def _prefijo(self, turno: int) -> int:
+        """Número de reservas activas con turno menor o igual que el dado."""
+        indice, total = turno - self.base + 1, 0
+        while indice > 0:
+            total += self.arbol[indice]
+            indice -= indice & -indice
+        return total
+
+    def _reconstruir(self) -> None:
+        """Desplaza la base al primer turno vivo y duplica la capacidad si hace falta."""
+        self.base = min(self.turnos.values(), default=self.siguiente_turno)
+        capacidad = len(self.arbol) - 1
+        if self.siguiente_turno - self.base >= capacidad // 2:
+            capacidad *= 2
+        self.arbol = [0] * (capacidad + 1)
+        for turno in self.turnos.values():
+            self._actualizar(turno, 1)
+
+    def __len__(self) -> int:
+        return len(self.turnos)
+
+    def encolar(self, id_usuario: int) -> int:
+        """Añade al usuario al final de la cola y devuelve su posición."""
+        if id_usuario in self.turnos:
+            return self.posicion(id_usuario)
+        if self.siguiente_turno - self.base + 1 >= len(self.arbol):
+            self._reconstruir()
+        turno = self.siguiente_turno
+        self.siguiente_turno += 1
+        self.turnos[id_usuario] = turno
+        self.cola.append((turno, id_usuario))
+        self._actualizar(turno, 1)
+        return len(self.turnos)
+
+    def desencolar(self) -> Optional[int]:
+        """Saca al primer usuario en espera."""
+        while self.cola:
+            turno, id_usuario = self.cola.popleft()
+            if self.turnos.get(id_usuario) == turno:
+                del self.turnos[id_usuario]
+                self._actualizar(turno, -1)
+                return id_usuario
+        return None
+
+    def cancelar(self, id_usuario: int) -> bool:
+        """Retira al usuario de la cola; su entrada se descarta al llegar al frente."""
+        turno = self.turnos.pop(id_usuario, None)
+        if turno is None:
+            return False
+        self._actualizar(turno, -1)
+        return True
+
+    def posicion(self, id_usuario: int) -> Optional[int]:
+        """Posición (desde 1) del usuario en la cola."""
+        turno = self.turnos.get(id_usuario)
+        if turno is None:
+            return None
+        return self._prefijo(turno)
+
+
+class SistemaReservas:
+    def __init__(self):
+        self.colas: Dict[int, _ColaEspera] = {}
+
+    def reservar(self, id_usuario: int, id_libro: int) -> int:
+        """Pone al usuario en la cola de espera del libro y devuelve su posición."""
+        cola = self.colas.get(id_libro)
+        if cola is None:
+            cola = self.colas[id_libro] = _ColaEspera()
+        posicion = cola.encolar(id_usuario)
+        print(f"Reserva del libro {id_libro} para usuario {id_usuario}: posición {posicion}")
+        return posicion
+
+    def siguiente(self, id_libro: int) -> Optional[int]:
+        """Saca de la cola al siguiente usuario en espera del libro."""
+        cola = self.colas.get(id_libro)
+        if not cola:
+            return None
+        id_usuario = cola.desencolar()
+        if not cola:
+            del self.colas[id_libro]
+        return id_usuario
+
+    def cancelar(self, id_usuario: int, id_libro: int) -> bool:
+        """Cancela la reserva de un usuario sobre un libro."""
+        cola = self.colas.get(id_libro)
+        if not cola or not cola.cancelar(id_usuario):
+            return False
+        if not cola:
+            del self.colas[id_libro]
+        return True
+
+    def obtener_posicion(self, id_usuario: int, id_libro: int) -> Optional[int]:
+        """Devuelve la posición del usuario en la cola del libro, si está en ella."""
+        cola = self.colas.get(id_libro)
+        return cola.posicion(id_usuario) if cola else None
+
+    def longitud_cola(self, id_libro: int) -> int:
+        """Devuelve cuántos usuarios esperan el libro."""
+        cola = self.colas.get(id_libro)
+        return len(cola) if cola else 0
@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class PlanificadorRecordatorios:
+    """Planificador en memoria basado en un montículo de fechas.
+
+    Programar y sacar la siguiente tarea cuestan O(log n). Cancelar o
+    reprogramar invalida la entrada antigua del montículo, que se descarta al
+    llegar a la cima; cuando las entradas inválidas superan a las vivas, el
+    montículo se reconstruye. El reloj es inyectable para pruebas y
+    simulaciones.
+    """
+
+    def __init__(self, reloj: Callable[[], datetime] = datetime.now, intervalo_maximo: float = 60.0):
+        self.reloj = reloj
+        self.intervalo_maximo = intervalo_maximo  # Espera máxima del hilo entre comprobaciones
+        self.monticulo: List[Tuple[datetime, int, str]] = []
+        self.tareas: Dict[str, Tuple[int, datetime, Callable[[], None]]] = {}  # clave -> (secuencia, fecha, acción)
+        self._secuencia = itertools.count()
+        # Público para que quien guarde datos junto a las tareas los actualice de forma atómica
+        self.lock = threading.RLock()
+        self._condicion = threading.Condition(self.lock)
+        self._hilo: Optional[threading.Thread] = None
+        self._activo = False
+
+    def __len__(self) -> int:
+        return len(self.tareas)
+
+    def programar(self, clave: str, fecha: datetime, accion: Callable[[], None]) -> None:
+        """Programa (o reemplaza) la tarea identificada por `clave`."""
+        with self._condicion:
+            secuencia = next(self._secuencia)
+            self.tareas[clave] = (secuencia, fecha, accion)
+            heapq.heappush(self.monticulo, (fecha, secuencia, clave))
+            self._compactar()
+            self._condicion.notify()
+
+    def cancelar(self, clave: str) -> bool:
+        """Cancela una tarea pendiente."""
+        with self._condicion:
+            if self.tareas.pop(clave, None) is None:
+                return False
+            self._compactar()
+            return True
+
+    def reprogramar(self, clave: str, fecha: datetime) -> bool:
+        """Mueve una tarea pendiente a otra fecha conservando su acción."""
+        with self._condicion:
+            tarea = self.tareas.get(clave)
+            if tarea is None:
+                return False
+            self.programar(clave, fecha, tarea[2])
+            return True
+
+    def proxima_fecha(self) -> Optional[datetime]:
+        """Fecha de la próxima tarea viva."""
+        with self._condicion:
+            self._descartar_invalidas()
+            return self.monticulo[0][0] if self.monticulo else None
+
+    def ejecutar_pendientes(self) -> int:
+        """Ejecuta en orden todas las tareas cuya fecha ya llegó."""
+        ejecutadas = 0
+        while True:
+            with self._condicion:
+                self._descartar_invalidas()
+                if not self.monticulo or self.monticulo[0][0] > self.reloj():
+                    return ejecutadas
+                _, _, clave = heapq.heappop(self.monticulo)
+                _, _, accion = self.tareas.pop(clave)
+            try:
+                accion()
+            except Exception as error:
+                print(f"Error al ejecutar la tarea programada {clave}: {error}")
+            ejecutadas += 1
+
+    def _descartar_invalidas(self) -> None:
+        while self.monticulo:
+            _, secuencia, clave = self.monticulo[0]
+            tarea = self.tareas.get(clave)
+            if tarea is not None and tarea[0] == secuencia:
+                return
+            heapq.heappop(self.monticulo)
+
+    def _compactar(self) -> None:
+        """Reconstruye el montículo cuando la mayoría de sus entradas son inválidas."""
+        if len(self.monticulo) > 1024 and len(self.monticulo) > 2 * len(self.tareas):
+            self.monticulo = [(fecha, secuencia, clave) for clave, (secuencia, fecha, _) in self.tareas.items()]
+            heapq.heapify(self.monticulo)
+
+    def iniciar(self) -> None:
+        """Arranca un hilo que ejecuta las tareas a medida que vencen."""
+        with self._condicion:
+            if self._activo:
+                return
+            self._activo = True
+        self._hilo = threading.Thread(target=self._bucle, name="planificador-recordatorios", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        """Detiene el hilo del planificador."""
+        with self._condicion:
+            self._activo = False
+            self._condicion.notify()
+        if self._hilo:
+            self._hilo.join()
+            self._hilo = None
+
+    def _bucle(self) -> None:
+        while True:
+            with self._condicion:
+                if not self._activo:
+                    return
+                proxima = self.proxima_fecha()
+                espera = self.intervalo_maximo
+                if proxima is not None:
+                    espera = min(espera, max(0.0, (proxima - self.reloj()).total_seconds()))
+                if espera > 0:
+                    self._condicion.wait(espera)
+                if not self._activo:
+                    return
+            self.ejecutar_pendientes()
@@ -0,0 +1,247 @@
+import copy
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+_AUSENTE = object()
+TAMANO_BLOQUE_LECTURA = 256  # Elementos leídos por cada toma del lock al recorrer una instantánea
+
+
+class InstantaneaMapa:
+    """Vista de sólo lectura de un diccionario tal como estaba al abrirla.
+
+    Abrirla cuesta O(1): no se copia nada por adelantado. Mientras está
+    abierta, cada escritor guarda una copia del valor antes de modificarlo
+    (copy-on-write por entidad) y anota las claves nuevas. Al leer se usa la
+    copia guardada o, si la entidad no ha cambiado, una copia del valor vivo,
+    de modo que los objetos obtenidos tampoco cambian después.
+    """
+
+    def __init__(self, registro: "RegistroVersiones", longitud: int):
+        self._registro = registro
+        self._mapa = registro.mapa
+        self._orden = registro.orden
+        self._longitud = longitud
+        self.previos: Dict[Any, Any] = {}  # clave -> copia del valor al abrir la instantánea
+        self.nuevas: Set[Any] = set()  # Claves dadas de alta después de abrirla
+        self.congelada = False  # El original se reinició: sólo valen las copias de `previos`
+        self.cerrada = False  # Tras cerrar ya no se guardan copias, así que leer daría datos vivos
+
+    def _preservar(self, clave) -> None:
+        """Guarda el valor actual de `clave` antes de que un escritor lo cambie (con el lock tomado)."""
+        if clave in self.previos or clave in self.nuevas:
+            return
+        valor = self._mapa.get(clave, _AUSENTE)
+        if valor is _AUSENTE:
+            self.nuevas.add(clave)
+        else:
+            self.previos[clave] = copy.copy(valor)
+
+    def _congelar(self) -> None:
+        """Copia todo lo que aún se leía del original, que está a punto de vaciarse."""
+        for clave in self._orden[:self._longitud]:
+            self._preservar(clave)
+        self.congelada = True
+
+    def _comprobar_abierta(self) -> None:
+        if self.cerrada:
+            raise ValueError("La instantánea está cerrada")
+
+    def _referencia(self, clave) -> Tuple[Any, bool]:
+        """Con el lock tomado: el valor que ve la instantánea y si ya es una copia propia."""
+        valor = self.previos.get(clave, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor, True
+        if self.congelada or clave in self.nuevas:
+            return None, True
+        return self._mapa.get(clave), False
+
+    def _leer(self, claves) -> List[Tuple[Any, Any]]:
+        """Lee varias claves copiando los valores vivos fuera del lock.
+
+        Bajo el lock sólo se toman referencias. Si un escritor cambia una
+        entidad mientras se copia, antes guardó su versión en `previos`, así
+        que al volver a tomar el lock se descarta la copia a medias.
+        """
+        with self._registro.lock:
+            self._comprobar_abierta()
+            referencias = [(clave, *self._referencia(clave)) for clave in claves]
+        if all(es_copia or valor is None for _, valor, es_copia in referencias):
+            return [(clave, valor) for clave, valor, _ in referencias]
+        copias = [(clave, valor if es_copia or valor is None else copy.copy(valor))
+                  for clave, valor, es_copia in referencias]
+        with self._registro.lock:
+            self._comprobar_abierta()
+            return [(clave, self.previos.get(clave, valor)) for clave, valor in copias]
+
+    def get(self, clave, predeterminado=None) -> Any:
+        valor = self._leer([clave])[0][1]
+        return predeterminado if valor is None else valor
+
+    def __getitem__(self, clave) -> Any:
+        valor = self.get(clave)
+        if valor is None:
+            raise KeyError(clave)
+        return valor
+
+    def __contains__(self, clave) -> bool:
+        return self.get(clave) is not None
+
+    def __len__(self) -> int:
+        self._comprobar_abierta()
+        return self._longitud
+
+    def items(self) -> Iterator[Tuple[Any, Any]]:
+        self._comprobar_abierta()
+        for desde in range(0, self._longitud, TAMANO_BLOQUE_LECTURA):
+            for clave, valor in self._leer(self._orden[desde:min(desde + TAMANO_BLOQUE_LECTURA, self._longitud)]):
+                if valor is not None:
+                    yield clave, valor
+
+    def values(self) -> Iterator[Any]:
+        return (valor for _, valor in self.items())
+
+    def keys(self) -> Iterator[Any]:
+        return (clave for clave, _ in self.items())
+
+    __iter__ = keys
+
+
+class RegistroVersiones:
+    """Lleva el orden de alta de las claves de un diccionario y sus instantáneas abiertas."""
+
+    def __init__(self, mapa, gestor: "GestorInstantaneas"):
+        self.mapa = mapa
+        self.orden: List[Any] = list(mapa)
+        self.abiertas: List[InstantaneaMapa] = []
+        self.gestor = gestor
+        self.lock = gestor.lock
+
+    @contextmanager
+    def modificando(self, clave):
+        """Envuelve el alta o la modificación de `clave` en el diccionario."""
+        with self.gestor.escribiendo():
+            es_alta = clave not in self.mapa
+            for instantanea in self.abiertas:
+                instantanea._preservar(clave)
+            yield
+            if es_alta and clave in self.mapa:
+                self.orden.append(clave)
+
+    def _abrir(self) -> InstantaneaMapa:
+        instantanea = InstantaneaMapa(self, len(self.orden))
+        self.abiertas.append(instantanea)
+        return instantanea
+
+    def _cerrar(self, instantanea: InstantaneaMapa) -> None:
+        if instantanea in self.abiertas:
+            self.abiertas.remove(instantanea)
+
+    def antes_de_reiniciar(self) -> None:
+        """Desliga las instantáneas abiertas antes de vaciar o sustituir el diccionario."""
+        with self.lock:
+            for instantanea in self.abiertas:
+                instantanea._congelar()
+            self.abiertas = []
+
+    def reiniciar(self, mapa) -> None:
+        """Empieza a seguir el diccionario cargado de nuevo (p. ej. tras una importación)."""
+        with self.lock:
+            self.mapa = mapa
+            self.orden = list(mapa)
+
+
+class Instantanea:
+    """Estado consistente de varios diccionarios en un mismo instante.
+
+    Cada vista se obtiene por nombre (`instantanea["prestamos"]`). Hay que
+    cerrarla al terminar, o usarla con `with`, para que los escritores dejen
+    de guardar copias para ella.
+    """
+
+    def __init__(self, vistas: Dict[str, InstantaneaMapa]):
+        self.vistas = vistas
+        self.fecha = datetime.now()
+
+    def __getitem__(self, nombre: str) -> InstantaneaMapa:
+        return self.vistas[nombre]
+
+    def copias_guardadas(self) -> int:
+        """Entidades copiadas por los escritores desde que se abrió."""
+        return sum(len(vista.previos) for vista in self.vistas.values())
+
+    def cerrar(self) -> None:
+        for vista in self.vistas.values():
+            with vista._registro.lock:
+                vista._registro._cerrar(vista)
+                vista.cerrada = True
+            vista.previos = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cerrar()
+
+
+class GestorInstantaneas:
+    """Abre instantáneas atómicas sobre un conjunto de diccionarios registrados.
+
+    Todos los registros comparten un lock, de modo que una instantánea ve a
+    la vez el catálogo y los préstamos tal como estaban en el mismo instante.
+    Mientras no hay ninguna abierta los escritores no toman ese lock: sólo
+    se cuentan, y abrir una instantánea espera a que terminen los que ya
+    habían empezado. Un hilo no debe abrir una instantánea desde dentro de
+    una escritura.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.registros: Dict[str, RegistroVersiones] = {}
+        self._estado = threading.Condition(threading.Lock())
+        self._escritores_sin_lock = 0
+        self._esperando_exclusivo = 0
+
+    def registrar(self, nombre: str, mapa) -> RegistroVersiones:
+        registro = self.registros[nombre] = RegistroVersiones(mapa, self)
+        return registro
+
+    @contextmanager
+    def escribiendo(self):
+        """Envuelve un cambio: sin instantáneas abiertas no toma el lock compartido."""
+        with self._estado:
+            sin_lock = not self._esperando_exclusivo and not any(
+                registro.abiertas for registro in self.registros.values())
+            if sin_lock:
+                self._escritores_sin_lock += 1
+        if not sin_lock:
+            with self.lock:
+                yield
+            return
+        try:
+            yield
+        finally:
+            with self._estado:
+                self._escritores_sin_lock -= 1
+                if not self._escritores_sin_lock:
+                    self._estado.notify_all()
+
+    @contextmanager
+    def exclusivo(self):
+        """Toma el lock compartido tras esperar a los escritores que no lo tomaron."""
+        with self._estado:
+            # Desde aquí los escritores nuevos toman el lock
+            self._esperando_exclusivo += 1
+            while self._escritores_sin_lock:
+                self._estado.wait()
+        try:
+            with self.lock:
+                yield
+        finally:
+            with self._estado:
+                self._esperando_exclusivo -= 1
+
+    def abrir(self, nombres: Optional[List[str]] = None) -> Instantanea:
+        with self.exclusivo():
+            return Instantanea({nombre: self.registros[nombre]._abrir() for nombre in nombres or self.registros})
@@ -1,18 +1,42 @@
+import threading
 from typing import Optional
 from src.models.models import Usuario
+from src.subsystems.change_stream import FlujoCambios
+from src.subsystems.id_allocator import AsignadorIds
 
 
 class SistemaUsuarios:
-    def __init__(self):
+    def __init__(self, flujo_cambios: Optional[FlujoCambios] = None,
+                 asignador_ids: Optional[AsignadorIds] = None):
         self.usuarios = {}
         self.contador_id = 1
+        self.paso_id = 1  # Salto entre IDs consecutivos (N en modo fragmentado)
+        self.flujo_cambios = flujo_cambios
+        self.asignador_ids = asignador_ids  # Si se indica, sustituye a contador_id
+        self._lock_ids = threading.Lock()
+    
+    def _siguiente_id(self) -> int:
+        """Obtiene un nuevo ID de forma segura entre hilos."""
+        if self.asignador_ids:
+            id_usuario = self.asignador_ids.siguiente_id("usuario")
+            with self._lock_ids:
+                # Al día para que una exportación guarde el siguiente ID libre
+                self.contador_id = max(self.contador_id, id_usuario + 1)
+            return id_usuario
+        with self._lock_ids:
+            id_usuario = self.contador_id
+            self.contador_id += self.paso_id
+            return id_usuario
     
     def crear_usuario(self, nombre: str, email: str) -> Usuario:
         """Crea un nuevo usuario en el sistema."""
-        id_usuario = self.contador_id
-        self.contador_id += 1
+        id_usuario = self._siguiente_id()
         usuario = Usuario(id=id_usuario, nombre=nombre, email=email)
         self.usuarios[id_usuario] = usuario
+        if self.flujo_cambios:
+            # Si nadie puede leer el evento sólo avanza la secuencia: no hace falta copiar el usuario
+            datos = dict(vars(usuario)) if self.flujo_cambios.activo else None
+            self.flujo_cambios.publicar("usuario", "crear", id_usuario, datos)
         print(f"Usuario creado: {usuario}")
         return usuario
     
@@ -24,6 +48,9 @@ class SistemaUsuarios:
         """Actualiza la información de un usuario existente."""
         if usuario.id in self.usuarios:
             self.usuarios[usuario.id] = usuario
+            if self.flujo_cambios:
+                datos = dict(vars(usuario)) if self.flujo_cambios.activo else None
+                self.flujo_cambios.publicar("usuario", "actualizar", usuario.id, datos)
             return True
         return False
     
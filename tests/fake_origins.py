@@ -0,0 +1,37 @@
+import json
+import threading
+import time
+from typing import Dict
+
+from ignore.main_proxy import ContenidoWeb, RecursoWeb
+
+
+class OrigenFalso(RecursoWeb):
+    """Origen local de pruebas: no usa la red y cuenta las solicitudes que recibe."""
+
+    def __init__(self, latencia: float = 0.05, tipo_contenido: str = "application/json", relleno: int = 0):
+        self.latencia = latencia
+        self.tipo_contenido = tipo_contenido
+        self.relleno = relleno  # Bytes extra por respuesta, para simular recursos grandes
+        self.solicitudes = 0
+        self.solicitudes_por_url: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, url: str) -> int:
+        with self._lock:
+            self.solicitudes += 1
+            self.solicitudes_por_url[url] = self.solicitudes_por_url.get(url, 0) + 1
+            return self.solicitudes_por_url[url]
+
+    def obtener_contenido(self, url: str) -> ContenidoWeb:
+        """Devuelve un JSON con el número de versión del recurso tras `latencia` segundos."""
+        version = self._registrar(url)
+        time.sleep(self.latencia)
+        datos = json.dumps({"url": url, "version": version, "relleno": "x" * self.relleno}).encode("utf-8")
+        return ContenidoWeb(datos, self.tipo_contenido, 200, len(datos), self.latencia)
+
+    def obtener_metadatos(self, url: str) -> Dict:
+        """Devuelve metadatos fijos tras `latencia` segundos."""
+        self._registrar(url)
+        time.sleep(self.latencia)
+        return {"url": url, "codigo_respuesta": 200, "tipo_contenido": self.tipo_contenido, "tamano": 0}
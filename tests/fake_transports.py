@@ -0,0 +1,149 @@
+import json
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+# Servidores locales de prueba para los canales de entrega: aceptan mensajes,
+# los guardan en memoria y fallan de forma transitoria con `tasa_fallos` (o
+# siempre en las `fallos_iniciales` primeras entregas). `latencia` retrasa
+# cada respuesta para simular un proveedor lento.
+
+
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linea: str) -> None:
+        self.wfile.write((linea + "\r\n").encode("ascii"))
+
+    def handle(self) -> None:
+        servidor = self.server.falso
+        self.responder("220 smtp-falso listo")
+        mensaje: Dict = {"destinatarios": []}
+        while True:
+            linea = self.rfile.readline()
+            if not linea:
+                return
+            comando = linea.decode("utf-8", "replace").strip()
+            verbo = comando[:4].upper()
+            if verbo in ("EHLO", "HELO"):
+                self.responder("250 smtp-falso")
+            elif verbo == "MAIL":
+                mensaje = {"remitente": comando[10:].strip("<> "), "destinatarios": []}
+                self.responder("250 OK")
+            elif verbo == "RCPT":
+                mensaje["destinatarios"].append(comando[8:].strip("<> "))
+                self.responder("250 OK")
+            elif verbo == "DATA":
+                self.responder("354 Fin con <CRLF>.<CRLF>")
+                lineas = []
+                while True:
+                    linea = self.rfile.readline()
+                    if not linea or linea in (b".\r\n", b".\n"):
+                        break
+                    lineas.append(linea)
+                servidor.esperar_latencia()
+                if servidor.debe_fallar():
+                    self.responder("451 Error temporal simulado")
+                else:
+                    mensaje["datos"] = b"".join(lineas)
+                    servidor.registrar(mensaje)
+                    self.responder("250 Aceptado")
+            elif verbo == "RSET":
+                mensaje = {"destinatarios": []}
+                self.responder("250 OK")
+            elif verbo == "NOOP":
+                self.responder("250 OK")
+            elif verbo == "QUIT":
+                self.responder("221 Adios")
+                return
+            else:
+                self.responder("502 Comando no implementado")
+
+
+class _ServidorTCP(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _ServidorFalso:
+    def __init__(self, tasa_fallos: float = 0.0, semilla: int = 0, fallos_iniciales: int = 0,
+                 latencia: float = 0.0):
+        self.tasa_fallos = tasa_fallos
+        self.fallos_iniciales = fallos_iniciales
+        self.latencia = latencia
+        self.mensajes: List[Dict] = []
+        self.fallos = 0
+        self._aleatorio = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    def debe_fallar(self) -> bool:
+        with self._lock:
+            fallar = self.fallos < self.fallos_iniciales or self._aleatorio.random() < self.tasa_fallos
+            self.fallos += fallar
+            return fallar
+
+    def esperar_latencia(self) -> None:
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def registrar(self, mensaje: Dict) -> None:
+        with self._lock:
+            mensaje["recibido_en"] = time.time()
+            self.mensajes.append(mensaje)
+
+    @property
+    def puerto(self) -> int:
+        return self._servidor.server_address[1]
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self) -> None:
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+class ServidorSMTPFalso(_ServidorFalso):
+    """Servidor SMTP mínimo en localhost que responde 451 con `tasa_fallos`."""
+
+    def __init__(self, tasa_fallos: float = 0.0, puerto: int = 0, semilla: int = 0,
+                 fallos_iniciales: int = 0, latencia: float = 0.0):
+        super().__init__(tasa_fallos, semilla, fallos_iniciales, latencia)
+        self._servidor = _ServidorTCP(("127.0.0.1", puerto), _ManejadorSMTP)
+        self._servidor.falso = self
+
+
+class _ManejadorSMS(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        servidor = self.server.falso
+        cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        servidor.esperar_latencia()
+        if servidor.debe_fallar():
+            self.send_response(503)
+        else:
+            servidor.registrar(json.loads(cuerpo))
+            self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, formato, *args) -> None:
+        pass
+
+
+class ServidorSMSFalso(_ServidorFalso):
+    """API HTTP de SMS en localhost que responde 503 con `tasa_fallos`."""
+
+    def __init__(self, tasa_fallos: float = 0.0, puerto: int = 0, semilla: int = 0,
+                 fallos_iniciales: int = 0, latencia: float = 0.0):
+        super().__init__(tasa_fallos, semilla, fallos_iniciales, latencia)
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", puerto), _ManejadorSMS)
+        self._servidor.daemon_threads = True
+        self._servidor.falso = self
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.puerto}/sms"
+
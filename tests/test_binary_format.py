@@ -0,0 +1,108 @@
+import contextlib
+import io
+import os
+import struct
+import tempfile
+import unittest
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.subsystems.binary_format import CABECERA_TABLA, MAGIA
+
+
+def _estado(fachada):
+    return (
+        dict(fachada.sistema_usuarios.usuarios),
+        dict(fachada.catalogo_libros.libros),
+        dict(fachada.sistema_prestamos.prestamos),
+        fachada.contar_libros_disponibles(),
+        [libro.id for libro in fachada.consultar_libros(titulo="tomo")],
+    )
+
+
+class PruebaArchivoBiblioteca(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.directorio.name, "biblioteca.bin")
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.origen = FachadaBiblioteca()
+        for i in range(5):
+            self.origen.registrar_usuario(f"Lectora {i} ñ", f"lectora{i}@example.com")
+        for i in range(8):
+            self.origen.agregar_libro(f"Tomo {i} — edición", f"Autor {i % 3}", f"978-{i:04d}")
+        for i in range(6):
+            self.origen.realizar_prestamo(i % 5 + 1, i + 1)
+        self.origen.devolver_libro(2)
+        self.origen.sistema_prestamos.extender_plazo(3, 7)
+
+        self.destino = FachadaBiblioteca()
+        self.destino.registrar_usuario("Otra", "otra@example.com")
+        self.destino.registrar_usuario("Otro", "otro@example.com")
+        self.destino.agregar_libro("Ajeno", "Nadie", "000")
+        self.destino.realizar_prestamo(1, 1)
+        self.destino.reservar_libro(2, 1)
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+        self.directorio.cleanup()
+
+    def test_exportar_e_importar_conserva_las_tablas(self):
+        self.origen.exportar_datos(self.ruta)
+        conteos = self.destino.importar_datos(self.ruta)
+
+        self.assertEqual(conteos, {"usuarios": 5, "libros": 8, "prestamos": 6})
+        self.assertEqual(_estado(self.destino), _estado(self.origen))
+        self.assertEqual(self.destino.sistema_reservas.colas, {})
+        for sistema in ("sistema_usuarios", "catalogo_libros", "sistema_prestamos"):
+            self.assertEqual(getattr(self.destino, sistema).contador_id, getattr(self.origen, sistema).contador_id)
+        # Las altas siguientes continúan la numeración importada
+        self.assertEqual(self.destino.agregar_libro("Nuevo", "Autor", "978-9999").id, 9)
+
+    def test_archivo_truncado_o_corrupto_no_modifica_nada(self):
+        self.origen.exportar_datos(self.ruta)
+        with open(self.ruta, "rb") as archivo:
+            contenido = archivo.read()
+        antes = _estado(self.destino)
+
+        variantes = [contenido[:corte] for corte in (0, 4, 8, 40, len(contenido) // 2, len(contenido) - 8)]
+        variantes += [b"XXXXXXXX" + contenido[8:], contenido + bytes(8)]
+        for variante in variantes:
+            with self.subTest(tamano=len(variante)):
+                with open(self.ruta, "wb") as archivo:
+                    archivo.write(variante)
+                with self.assertRaises(ValueError):
+                    self.destino.importar_datos(self.ruta)
+                self.assertEqual(_estado(self.destino), antes)
+                self.assertEqual(self.destino.obtener_longitud_cola_reservas(1), 1)
+
+    def test_ids_o_fechas_invalidos_no_modifican_nada(self):
+        self.origen.exportar_datos(self.ruta)
+        with open(self.ruta, "rb") as archivo:
+            contenido = archivo.read()
+        antes = _estado(self.destino)
+        # Columna de IDs de libros: justo después de su cabecera (8 filas, siguiente ID 9, paso 1)
+        libros = contenido.index(CABECERA_TABLA.pack(8, 9, 1)) + CABECERA_TABLA.size
+        # Columna de fechas de registro: tras la cabecera de usuarios y sus 5 IDs
+        fechas = len(MAGIA) + CABECERA_TABLA.size + 5 * 8
+
+        def con(posicion, valor):
+            return contenido[:posicion] + struct.pack("<q", valor) + contenido[posicion + 8:]
+
+        variantes = {
+            "negativo": con(libros, -5),
+            "repetido": con(libros + 8, 1),
+            "mayor que el contador": con(libros, 9),
+            "fecha desbordada": con(fechas, 2 ** 62),
+        }
+        for nombre, variante in variantes.items():
+            with self.subTest(nombre):
+                with open(self.ruta, "wb") as archivo:
+                    archivo.write(variante)
+                with self.assertRaises(ValueError):
+                    self.destino.importar_datos(self.ruta)
+                self.assertEqual(_estado(self.destino), antes)
+                self.assertEqual(self.destino.contar_libros_disponibles(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
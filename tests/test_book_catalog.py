@@ -0,0 +1,64 @@
+import contextlib
+import io
+import unittest
+
+from src.subsystems.book_catalog import CatalogoLibros
+from src.subsystems.loan_system import SistemaPrestamos
+
+
+class PruebaMapaDisponibilidad(unittest.TestCase):
+    def setUp(self):
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.catalogo = CatalogoLibros()
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+
+    def test_el_mapa_crece_al_doble_con_las_altas(self):
+        tamanos = set()
+        for i in range(1, 201):
+            self.catalogo.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}")
+            tamanos.add(len(self.catalogo.mapa_disponibilidad))
+
+        self.assertEqual(sorted(tamanos), [1, 2, 4, 8, 16, 32])
+        self.assertTrue(all(self.catalogo.esta_disponible(i) for i in range(1, 201)))
+        self.assertFalse(self.catalogo.esta_disponible(0))
+        self.assertFalse(self.catalogo.esta_disponible(201))
+        self.assertFalse(self.catalogo.esta_disponible(10_000))
+
+    def test_marcar_un_id_lejano_no_pierde_los_anteriores(self):
+        self.catalogo._marcar_disponibilidad(3, True)
+        self.catalogo._marcar_disponibilidad(1000, True)
+        self.catalogo._marcar_disponibilidad(1000, True)
+
+        self.assertEqual(len(self.catalogo.mapa_disponibilidad), 1000 // 8 + 1)
+        self.assertEqual(list(self.catalogo.ids_disponibles()), [3, 1000])
+        self.assertEqual(self.catalogo.contar_disponibles(), 2)
+
+    def test_contar_disponibles_tras_prestar_y_devolver(self):
+        prestamos = SistemaPrestamos(self.catalogo)
+        for i in range(10):
+            self.catalogo.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}")
+        creados = [prestamos.crear_prestamo(1, id_libro) for id_libro in (2, 5, 7)]
+        self.assertIsNone(prestamos.crear_prestamo(1, 5))
+
+        self.assertEqual(self.catalogo.contar_disponibles(), 7)
+        prestamos.finalizar_prestamo(creados[1].id)
+        prestamos.finalizar_prestamo(creados[1].id)
+        self.assertEqual(self.catalogo.contar_disponibles(), 8)
+        self.assertEqual(list(self.catalogo.ids_disponibles()), [1, 3, 4, 5, 6, 8, 9, 10])
+
+    def test_filtrar_disponibles_y_busqueda(self):
+        libros = [self.catalogo.agregar_libro(f"{nombre} {i}", "Autor", f"isbn-{i}")
+                  for i, nombre in enumerate(["Rayuela", "Ficciones", "Rayuela", "Rayuela"])]
+        self.catalogo.actualizar_disponibilidad(libros[2].id, False)
+
+        self.assertEqual(self.catalogo.filtrar_disponibles(libros), [libros[0], libros[1], libros[3]])
+        self.assertEqual(self.catalogo.filtrar_disponibles([]), [])
+        self.assertEqual(self.catalogo.buscar_por_titulo("rayuela", solo_disponibles=True), [libros[0], libros[3]])
+        self.assertEqual(self.catalogo.buscar_por_titulo("rayuela"), [libros[0], libros[2], libros[3]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from src.subsystems import catalog_index
+from src.subsystems.book_catalog import CatalogoLibros
+from src.subsystems.paged_catalog import CatalogoLibrosPaginado
+
+PALABRAS = ["quijote", "mancha", "rayuela", "cien", "años", "soledad", "amor", "guerra", "paz", "tiempo"]
+
+
+class PruebaConsultas(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.memoria = CatalogoLibros()
+        self.paginado = CatalogoLibrosPaginado(os.path.join(self.directorio.name, "libros.pag"), max_residentes=50)
+        aleatorio = random.Random(1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(500):
+                datos = (" ".join(aleatorio.sample(PALABRAS, 3)), f"Autor {i % 17} Gómez", f"978{i:05d}")
+                self.memoria.agregar_libro(*datos)
+                self.paginado.agregar_libro(*datos)
+            for id_libro in range(1, 500, 3):
+                self.memoria.actualizar_disponibilidad(id_libro, False)
+                self.paginado.actualizar_disponibilidad(id_libro, False)
+
+    def tearDown(self):
+        self.paginado.cerrar()
+        self.directorio.cleanup()
+
+    def test_paginado_sin_indices_da_lo_mismo(self):
+        for consulta in (dict(titulo="quij"), dict(titulo="amo guer"), dict(autor="autor 1", disponible=True),
+                         dict(isbn="97800"), dict(titulo="paz", isbn="978001"), dict(disponible=False)):
+            with self.subTest(**consulta):
+                esperado = [libro.id for libro in self.memoria.consultar(**consulta)]
+                self.assertTrue(esperado)
+                self.assertEqual([libro.id for libro in self.paginado.consultar(**consulta)], esperado)
+
+    def test_coincide_con_un_recorrido_simple(self):
+        def cumple(libro, titulo, autor, isbn, disponible):
+            palabras = {campo: re.findall(r"\w+", getattr(libro, campo).lower()) for campo in ("titulo", "autor")}
+            return (all(any(p.startswith(prefijo) for p in palabras["titulo"]) for prefijo in titulo.split())
+                    and all(any(p.startswith(prefijo) for p in palabras["autor"]) for prefijo in autor.split())
+                    and libro.isbn.startswith(isbn)
+                    and (disponible is None or self.memoria.esta_disponible(libro.id) == disponible))
+
+        aleatorio = random.Random(2)
+        for _ in range(300):
+            consulta = {
+                "titulo": " ".join(palabra[:aleatorio.randint(1, len(palabra))]
+                                   for palabra in aleatorio.sample(PALABRAS, aleatorio.randint(0, 3))),
+                "autor": aleatorio.choice(["", "autor", "gó", f"{aleatorio.randint(0, 20)}", "autor 1 gómez"]),
+                "isbn": aleatorio.choice(["", "978", f"9780{aleatorio.randint(0, 4)}", "979"]),
+                "disponible": aleatorio.choice([None, True, False]),
+            }
+            with self.subTest(**consulta):
+                esperado = [id_libro for id_libro, libro in sorted(self.memoria.libros.items())
+                            if cumple(libro, **consulta)]
+                self.assertEqual([libro.id for libro in self.memoria.consultar(**consulta)], esperado)
+
+    def test_paginado_no_guarda_nada_por_libro(self):
+        self.paginado.consultar(titulo="paz")
+        self.assertEqual(self.paginado.indices.titulos.entradas, {})
+        self.assertEqual(self.paginado.indices.isbns.claves, [])
+        self.assertLessEqual(len(self.paginado.libros.residentes), 50)
+
+    def test_altas_concurrentes_mantienen_el_vocabulario_ordenado(self):
+        catalogo = CatalogoLibros()
+
+        def altas(hilo):
+            for i in range(2000):
+                catalogo.indices.agregar(hilo * 10_000 + i, f"h{hilo}p{i} comun", "autor", f"{hilo}-{i}")
+
+        hilos = [threading.Thread(target=altas, args=(hilo,)) for hilo in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        vocabulario = catalogo.indices.titulos.vocabulario
+        self.assertEqual(vocabulario, sorted(vocabulario))
+        self.assertEqual(len(vocabulario), 4 * 2000 + 1)
+        self.assertEqual(len(catalogo.indices.titulos.buscar("comun")), 4 * 2000)
+
+
+class PruebaPlanificador(unittest.TestCase):
+    """Catálogo con selectividades conocidas: "comun" en los 200 libros, "medio" en 20, "poco" en 10 y "raro" en 2."""
+
+    def setUp(self):
+        self.catalogo = CatalogoLibros()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for id_libro in range(1, 201):
+                palabras = ["comun"]
+                palabras += ["medio"] if id_libro % 10 == 0 else []
+                palabras += ["poco"] if id_libro % 20 == 0 else []
+                palabras += ["raro"] if id_libro % 100 == 0 else []
+                self.catalogo.agregar_libro(" ".join(palabras), f"Autor {id_libro % 2}", f"978-{id_libro:04d}")
+            for id_libro in range(40, 201, 40):
+                self.catalogo.actualizar_disponibilidad(id_libro, False)
+
+    def _pasos(self, **consulta):
+        plan = self.catalogo.planificar_consulta(**consulta)
+        return [(paso.predicado, paso.indice, paso.estimado, paso.operacion) for paso in plan.pasos]
+
+    def test_empieza_por_el_indice_mas_selectivo(self):
+        self.assertEqual(self._pasos(titulo="comun poco raro", disponible=True), [
+            ("titulo~raro", "titulo", 2, "candidatos"),
+            ("titulo~poco", "titulo", 10, "intersectar"),
+            ("titulo~comun", "titulo", 200, "filtrar"),
+            ("disponible=True", "disponibilidad", 195, "filtrar"),
+        ])
+        self.assertEqual([libro.id for libro in self.catalogo.consultar(titulo="comun poco raro", disponible=True)],
+                         [100])
+
+    def test_intersecta_de_menor_a_mayor(self):
+        self.assertEqual(self._pasos(autor="autor 1", isbn="978-00"), [
+            ("isbn^978-00", "isbn", 99, "candidatos"),
+            ("autor~1", "autor", 100, "intersectar"),
+            ("autor~autor", "autor", 200, "intersectar"),
+        ])
+        self.assertEqual([libro.id for libro in self.catalogo.consultar(autor="autor 1", isbn="978-00")],
+                         list(range(1, 100, 2)))
+
+    def test_filtra_cuando_el_indice_supera_factor_filtro(self):
+        # 20 > 2 * FACTOR_FILTRO: comprobar "medio" en los 2 candidatos sale más barato que materializarlo
+        self.assertEqual(catalog_index.FACTOR_FILTRO, 8)
+        self.assertEqual([operacion for *_, operacion in self._pasos(titulo="raro medio")], ["candidatos", "filtrar"])
+        with mock.patch.object(catalog_index, "FACTOR_FILTRO", 10):
+            self.assertEqual([operacion for *_, operacion in self._pasos(titulo="raro medio")],
+                             ["candidatos", "intersectar"])
+        self.assertEqual([libro.id for libro in self.catalogo.consultar(titulo="raro medio")], [100, 200])
+
+    def test_solo_disponibilidad_filtra_todo_el_catalogo(self):
+        self.assertEqual(self._pasos(disponible=False), [("disponible=False", "disponibilidad", 5, "filtrar")])
+        self.assertEqual([libro.id for libro in self.catalogo.consultar(disponible=False)], [40, 80, 120, 160, 200])
+
+    def test_explicar(self):
+        self.assertEqual(self.catalogo.explicar_consulta(), "recorrido completo (200 libros)")
+        self.assertEqual(self.catalogo.explicar_consulta(titulo="poco raro", disponible=True), "\n".join([
+            "1. candidatos  titulo~raro                    indice=titulo estimado=2",
+            "2. intersectar titulo~poco                    indice=titulo estimado=10",
+            "3. filtrar     disponible=True                indice=disponibilidad estimado=195",
+        ]))
+        self.assertEqual(self.catalogo.explicar_consulta(titulo="poco raro", disponible=True, analizar=True),
+                         "\n".join([
+                             "1. candidatos  titulo~raro                    indice=titulo estimado=2 -> 2",
+                             "2. intersectar titulo~poco                    indice=titulo estimado=10 -> 2",
+                             "3. filtrar     disponible=True                indice=disponibilidad estimado=195 -> 1",
+                         ]))
+        # Sin candidatos, los pasos siguientes no se ejecutan
+        self.assertTrue(self.catalogo.explicar_consulta(titulo="raro zzz", analizar=True).endswith("-> 0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
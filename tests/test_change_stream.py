@@ -0,0 +1,117 @@
+import contextlib
+import io
+import unittest
+
+from src.subsystems.change_stream import FlujoCambios
+from src.subsystems.user_management import SistemaUsuarios
+
+
+class PruebaFlujoCambios(unittest.TestCase):
+    def test_sin_suscriptores_retiene_la_ventana(self):
+        flujo = FlujoCambios(capacidad_retencion=10)
+        self.assertTrue(flujo.activo)
+        for i in range(1000):
+            flujo.publicar("libro", "crear", i)
+
+        self.assertEqual(flujo.retenidos, 10)
+        self.assertLessEqual(len(flujo.eventos), 20)
+        self.assertEqual([evento.id_entidad for evento in flujo.leer_desde(990)], list(range(990, 1000)))
+        with self.assertRaises(ValueError):
+            flujo.leer_desde(989)
+
+    def test_sin_retencion_ni_suscriptores_no_retiene(self):
+        flujo = FlujoCambios(capacidad_retencion=0)
+        self.assertFalse(flujo.activo)
+        for i in range(1000):
+            flujo.publicar("libro", "crear", i)
+
+        self.assertEqual(flujo.eventos, [])
+        self.assertEqual(flujo.ultima_secuencia, 1000)
+        self.assertEqual(flujo.leer_desde(1000), [])
+
+    def test_retiene_para_reanudar_mientras_hay_suscriptores(self):
+        flujo = FlujoCambios(capacidad_retencion=10)
+        recibidos = []
+        flujo.suscribir(recibidos.extend, tamano_lote=5)
+        for i in range(50):
+            flujo.publicar("libro", "crear", i)
+
+        self.assertEqual(len(recibidos), 50)
+        self.assertEqual([evento.id_entidad for evento in flujo.leer_desde(40)], list(range(40, 50)))
+        with self.assertRaises(ValueError):
+            flujo.leer_desde(30)
+
+    def test_suscriptor_atascado_se_da_de_baja(self):
+        flujo = FlujoCambios(capacidad_retencion=10, retraso_maximo=100)
+        sanos = []
+
+        def fallar(_):
+            raise RuntimeError("caído")
+
+        atascada = flujo.suscribir(fallar, tamano_lote=1)
+        flujo.suscribir(sanos.extend, tamano_lote=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(1000):
+                flujo.publicar("prestamo", "crear", i)
+
+        self.assertTrue(atascada.perdida)
+        self.assertNotIn(atascada, flujo.suscripciones)
+        self.assertEqual(len(sanos), 1000)
+        self.assertLessEqual(len(flujo.eventos) - flujo.inicio, 101)
+
+    def test_desuscribir_libera_lo_retenido_de_mas(self):
+        flujo = FlujoCambios(capacidad_retencion=5)
+        suscripcion = flujo.suscribir(lambda lote: None, tamano_lote=100)
+        for i in range(20):
+            flujo.publicar("usuario", "crear", i)
+        self.assertEqual(flujo.retenidos, 20)  # El suscriptor aún no los ha recibido
+        flujo.desuscribir(suscripcion)
+
+        self.assertEqual(flujo.retenidos, 5)
+
+    def test_reanudar_tras_darse_de_baja(self):
+        flujo = FlujoCambios()
+        usuarios = SistemaUsuarios(flujo)
+        recibidos = []
+        suscripcion = flujo.suscribir(recibidos.extend, tamano_lote=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            usuarios.crear_usuario("Ana", "ana@example.com")
+            ultima = recibidos[-1].secuencia
+            flujo.desuscribir(suscripcion)
+            usuarios.crear_usuario("Luis", "luis@example.com")
+            usuarios.crear_usuario("Eva", "eva@example.com")
+
+        self.assertEqual([evento.datos["nombre"] for evento in flujo.leer_desde(ultima)], ["Luis", "Eva"])
+        flujo.suscribir(recibidos.extend, tamano_lote=10, desde=ultima)
+        flujo.despachar()
+        self.assertEqual([evento.datos["nombre"] for evento in recibidos], ["Ana", "Luis", "Eva"])
+
+    def test_reanudar_tras_un_hueco_no_pierde_cambios_en_silencio(self):
+        flujo = FlujoCambios(capacidad_retencion=1)
+        usuarios = SistemaUsuarios(flujo)
+        recibidos = []
+        suscripcion = flujo.suscribir(recibidos.extend, tamano_lote=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            usuarios.crear_usuario("Ana", "ana@example.com")
+            ultima = recibidos[-1].secuencia
+            flujo.desuscribir(suscripcion)
+            usuarios.crear_usuario("Luis", "luis@example.com")
+            usuarios.crear_usuario("Eva", "eva@example.com")
+
+        self.assertEqual(flujo.ultima_secuencia, ultima + 2)
+        with self.assertRaises(ValueError):
+            flujo.leer_desde(ultima)
+        with self.assertRaises(ValueError):
+            flujo.suscribir(recibidos.extend, desde=ultima)
+        self.assertEqual([evento.datos["nombre"] for evento in flujo.leer_desde(ultima + 1)], ["Eva"])
+
+    def test_leer_una_secuencia_no_publicada_falla(self):
+        flujo = FlujoCambios()
+        flujo.publicar("libro", "crear", 1)
+
+        with self.assertRaises(ValueError):
+            flujo.leer_desde(5)
+
+
+if __name__ == "__main__":
+    unittest.main()
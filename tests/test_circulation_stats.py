@@ -0,0 +1,167 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.models.models import Prestamo
+from src.subsystems.circulation_stats import ConteoOrdenado, EstadisticasCirculacion
+
+
+class _Reloj(datetime):
+    """datetime cuyo now() devuelve una fecha fijada por la prueba."""
+    actual = datetime(2024, 1, 1)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.actual
+
+
+class PruebaConteoOrdenado(unittest.TestCase):
+    def test_coincide_con_counter(self):
+        aleatorio = random.Random(3)
+        conteo, esperado = ConteoOrdenado(), Counter()
+        for paso in range(20_000):
+            clave = aleatorio.randint(1, 50)
+            if aleatorio.random() < 0.6:
+                conteo.incrementar(clave)
+                esperado[clave] += 1
+            else:
+                conteo.decrementar(clave)
+                if esperado[clave]:
+                    esperado[clave] -= 1
+            if paso % 500 == 0:
+                esperado += Counter()  # Quitar los ceros
+                self.assertEqual(conteo.conteos, dict(esperado))
+                self.assertEqual(len(conteo), len(esperado))
+                for n in (1, 5, 60):
+                    mayores = conteo.mayores(n)
+                    self.assertEqual([veces for _, veces in mayores],
+                                     sorted(esperado.values(), reverse=True)[:n])
+                    self.assertTrue(all(esperado[clave] == veces for clave, veces in mayores))
+
+    def test_empates_por_orden_de_llegada(self):
+        conteo = ConteoOrdenado()
+        for clave in ("b", "a", "c", "a"):
+            conteo.incrementar(clave)
+
+        self.assertEqual(conteo.mayores(3), [("a", 2), ("b", 1), ("c", 1)])
+        conteo.decrementar("a")
+        conteo.decrementar("x")
+        self.assertEqual(conteo.mayores(3), [("b", 1), ("c", 1), ("a", 1)])
+        self.assertEqual(conteo.obtener("x"), 0)
+
+
+class PruebaEstadisticasCirculacion(unittest.TestCase):
+    def setUp(self):
+        self.reloj = mock.patch("src.subsystems.circulation_stats.datetime", _Reloj)
+        self.reloj.start()
+        _Reloj.actual = datetime(2024, 1, 1)
+
+    def tearDown(self):
+        self.reloj.stop()
+
+    def test_la_ventana_olvida_la_actividad_antigua(self):
+        estadisticas = EstadisticasCirculacion(ventana=timedelta(days=7), num_ranuras=7)
+        inicio = _Reloj.actual
+        prestamo = Prestamo(id=1, id_usuario=10, id_libro=100, fecha_prestamo=inicio)
+        estadisticas.registrar_prestamo(prestamo)
+        _Reloj.actual = inicio + timedelta(days=3)
+        for id_prestamo in (2, 3):
+            estadisticas.registrar_prestamo(Prestamo(id=id_prestamo, id_usuario=20, id_libro=200,
+                                                     fecha_prestamo=_Reloj.actual))
+        prestamo.fecha_devolucion = _Reloj.actual
+        estadisticas.registrar_devolucion(prestamo)
+
+        self.assertEqual(estadisticas.libros_mas_prestados(ventana=True), [(200, 2), (100, 1)])
+        self.assertEqual(estadisticas.duracion_media_dias(ventana=True), 3.0)
+
+        # El primer préstamo sale de la ventana; su devolución (día 3) aún no
+        _Reloj.actual = inicio + timedelta(days=8)
+        self.assertEqual(estadisticas.libros_mas_prestados(ventana=True), [(200, 2)])
+        self.assertEqual(estadisticas.usuarios_mas_activos(ventana=True), [(20, 2)])
+        self.assertEqual(estadisticas.duracion_media_dias(ventana=True), 3.0)
+
+        _Reloj.actual = inicio + timedelta(days=11)
+        resumen = estadisticas.resumen()
+        self.assertEqual(resumen["ventana"]["prestamos"], 0)
+        self.assertEqual(resumen["ventana"]["libros_mas_prestados"], [])
+        self.assertEqual(resumen["ventana"]["duracion_media_dias"], 0.0)
+        # Los totales históricos no caducan
+        self.assertEqual(resumen["total_prestamos"], 3)
+        self.assertEqual(resumen["libros_mas_prestados"], [(200, 2), (100, 1)])
+        self.assertEqual(resumen["duracion_media_dias"], 3.0)
+
+    def test_prestamo_anterior_a_la_ventana_solo_cuenta_en_el_historico(self):
+        estadisticas = EstadisticasCirculacion(ventana=timedelta(days=7))
+        estadisticas.registrar_prestamo(Prestamo(id=1, id_usuario=1, id_libro=1,
+                                                 fecha_prestamo=_Reloj.actual - timedelta(days=30)))
+
+        self.assertEqual(estadisticas.libros_mas_prestados(), [(1, 1)])
+        self.assertEqual(estadisticas.libros_mas_prestados(ventana=True), [])
+
+
+class PruebaEstadisticasFachada(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.fachada = FachadaBiblioteca()
+        aleatorio = random.Random(5)
+        usuarios = [self.fachada.registrar_usuario(f"Usuario {i}", f"u{i}@example.com") for i in range(8)]
+        libros = [self.fachada.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}") for i in range(15)]
+        for _ in range(200):
+            libro = aleatorio.choice(libros)
+            activo = next((p for p in self.fachada.sistema_prestamos.prestamos.values()
+                           if p.id_libro == libro.id and not p.fecha_devolucion), None)
+            if activo:
+                self.fachada.devolver_libro(activo.id)
+            else:
+                self.fachada.realizar_prestamo(aleatorio.choice(usuarios).id, libro.id)
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+        self.directorio.cleanup()
+
+    def test_coincide_con_un_recorrido_completo(self):
+        prestamos = list(self.fachada.sistema_prestamos.prestamos.values())
+        resumen = self.fachada.obtener_estadisticas_circulacion(n=100)
+        por_libro = Counter(p.id_libro for p in prestamos)
+        por_usuario = Counter(p.id_usuario for p in prestamos)
+
+        self.assertEqual(resumen["total_prestamos"], len(prestamos))
+        self.assertEqual(resumen["prestamos_activos"], sum(1 for p in prestamos if not p.fecha_devolucion))
+        self.assertEqual(dict(resumen["libros_mas_prestados"]), dict(por_libro))
+        self.assertEqual(dict(resumen["usuarios_mas_activos"]), dict(por_usuario))
+        estadisticas = self.fachada.sistema_prestamos.estadisticas
+        for id_usuario in por_usuario:
+            self.assertEqual(estadisticas.prestamos_activos_usuario(id_usuario),
+                             sum(1 for p in prestamos if p.id_usuario == id_usuario and not p.fecha_devolucion))
+
+    def test_reconstruir_tras_importar(self):
+        ruta = os.path.join(self.directorio.name, "biblioteca.bin")
+        self.fachada.exportar_datos(ruta)
+        otra = FachadaBiblioteca()
+        # Actividad previa que la importación debe descartar
+        usuario = otra.registrar_usuario("Otra", "otra@example.com")
+        otra.realizar_prestamo(usuario.id, otra.agregar_libro("Otro", "Autor", "otro").id)
+
+        otra.importar_datos(ruta)
+
+        importado = otra.obtener_estadisticas_circulacion(n=100)
+        original = self.fachada.obtener_estadisticas_circulacion(n=100)
+        for resumen in (importado, original, importado["ventana"], original["ventana"]):
+            # Los empates pueden ordenarse distinto y la suma de duraciones, redondearse distinto
+            for ranking in ("libros_mas_prestados", "usuarios_mas_activos"):
+                resumen[ranking] = dict(resumen[ranking])
+            resumen["duracion_media_dias"] = round(resumen["duracion_media_dias"] * 86400, 3)
+        self.assertEqual(importado, original)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+import contextlib
+import io
+import time
+import unittest
+from unittest import mock
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.subsystems import delivery_channels
+from src.subsystems.delivery_channels import CanalEntrega, CubetaTokens, TransporteSMSHTTP, TransporteSMTP
+from tests.fake_transports import ServidorSMSFalso, ServidorSMTPFalso
+
+
+class _TransporteCronometrado:
+    """Envuelve un transporte y anota el instante de cada intento."""
+
+    def __init__(self, transporte):
+        self.transporte = transporte
+        self.intentos = []
+
+    def enviar(self, mensaje):
+        self.intentos.append(time.monotonic())
+        self.transporte.enviar(mensaje)
+
+    def cerrar(self):
+        self.transporte.cerrar()
+
+
+class _TransporteMemoria:
+    """Transporte en memoria que falla de forma transitoria los primeros `fallos` envíos."""
+
+    def __init__(self, fallos: int = 0):
+        self.fallos = fallos
+        self.enviados = []
+
+    def enviar(self, mensaje):
+        if self.fallos:
+            self.fallos -= 1
+            raise delivery_channels.ErrorEntrega("503")
+        self.enviados.append(mensaje["id"])
+
+    def cerrar(self):
+        pass
+
+
+class _RelojFalso:
+    """Reloj manual: dormir sólo adelanta el reloj y anota la espera."""
+
+    def __init__(self):
+        self.ahora = 0.0
+        self.esperas = []
+
+    def __call__(self):
+        return self.ahora
+
+    def dormir(self, segundos):
+        self.esperas.append(segundos)
+        self.ahora += segundos
+
+
+class PruebaCubetaTokens(unittest.TestCase):
+    def test_rafaga_y_espera(self):
+        ahora = [0.0]
+        cubeta = CubetaTokens(tasa=10.0, capacidad=2, reloj=lambda: ahora[0])
+        self.assertEqual(cubeta.reservar(), 0.0)
+        self.assertEqual(cubeta.reservar(), 0.0)
+        self.assertAlmostEqual(cubeta.reservar(), 0.1)
+        self.assertAlmostEqual(cubeta.reservar(), 0.2)
+        ahora[0] = 1.0  # Se rellena hasta la capacidad, no más
+        self.assertEqual(cubeta.reservar(), 0.0)
+        self.assertEqual(cubeta.reservar(), 0.0)
+        self.assertAlmostEqual(cubeta.reservar(), 0.1)
+
+
+class PruebaCanalEntrega(unittest.TestCase):
+    def setUp(self):
+        self.servidores = []
+        self.canales = []
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+
+    def tearDown(self):
+        for canal in self.canales:
+            canal.detener()
+        for servidor in self.servidores:
+            servidor.detener()
+        self.salida.__exit__(None, None, None)
+
+    def _smtp(self, **opciones):
+        servidor = ServidorSMTPFalso(**opciones).iniciar()
+        self.servidores.append(servidor)
+        return servidor
+
+    def _sms(self, **opciones):
+        servidor = ServidorSMSFalso(**opciones).iniciar()
+        self.servidores.append(servidor)
+        return servidor
+
+    def _canal(self, nombre, transporte, **opciones):
+        canal = CanalEntrega(nombre, transporte, **opciones)
+        self.canales.append(canal)
+        return canal
+
+    def test_reintenta_y_entrega(self):
+        servidor = self._smtp(fallos_iniciales=2)
+        canal = self._canal("email", TransporteSMTP("127.0.0.1", servidor.puerto), espera_base=0.01)
+        canal.enviar("lector@example.com", "Contenido", "Asunto")
+        self.assertTrue(canal.esperar_vacio(timeout=10))
+
+        metricas = canal.obtener_metricas()
+        self.assertEqual(metricas["enviados"], 1)
+        self.assertEqual(metricas["reintentos"], 2)
+        self.assertEqual(metricas["cartas_muertas"], 0)
+        self.assertEqual(servidor.fallos, 2)
+        self.assertEqual(len(servidor.mensajes), 1)
+        self.assertEqual(servidor.mensajes[0]["destinatarios"], ["lector@example.com"])
+
+    def test_espera_exponencial_con_jitter_acotado(self):
+        servidor = self._sms(tasa_fallos=1.0)
+        transporte = _TransporteCronometrado(TransporteSMSHTTP(servidor.url))
+        canal = self._canal("sms", transporte, max_intentos=5, espera_base=0.02, espera_maxima=0.05)
+        topes = []
+        uniforme = delivery_channels.random.uniform
+
+        def registrar_uniforme(minimo, maximo):
+            topes.append((minimo, maximo))
+            valor = uniforme(minimo, maximo)
+            self.assertTrue(minimo <= valor <= maximo)
+            return valor
+
+        with mock.patch.object(delivery_channels.random, "uniform", registrar_uniforme):
+            canal.enviar("+573000000000", "Hola")
+            self.assertTrue(canal.esperar_vacio(timeout=10))
+
+        # Tope exponencial desde espera_base, limitado por espera_maxima
+        self.assertEqual(topes, [(0, 0.02), (0, 0.04), (0, 0.05), (0, 0.05)])
+        self.assertEqual(len(transporte.intentos), 5)
+        for (_, tope), anterior, siguiente in zip(topes, transporte.intentos, transporte.intentos[1:]):
+            self.assertLess(siguiente - anterior, tope + 0.25)
+
+    def test_carta_muerta_tras_max_intentos(self):
+        servidor = self._smtp(tasa_fallos=1.0)
+        canal = self._canal("email", TransporteSMTP("127.0.0.1", servidor.puerto), max_intentos=3,
+                            espera_base=0.01)
+        canal.enviar("lector@example.com", "Contenido", "Asunto", id_mensaje="m-1")
+        self.assertTrue(canal.esperar_vacio(timeout=10))
+
+        self.assertEqual(servidor.fallos, 3)
+        self.assertEqual(servidor.mensajes, [])
+        self.assertEqual(len(canal.cartas_muertas), 1)
+        carta = canal.cartas_muertas[0]
+        self.assertEqual((carta["id"], carta["intentos"]), ("m-1", 3))
+        self.assertIn("451", carta["error"])
+        self.assertEqual(canal.obtener_metricas()["fallidos"], 1)
+
+    def test_mensaje_invalido_es_carta_muerta_y_el_canal_sigue(self):
+        servidor = self._smtp()
+        canal = self._canal("email", TransporteSMTP("127.0.0.1", servidor.puerto), espera_base=0.01)
+        canal.enviar("lector@example.com", "Contenido", "Asunto\nInyectado", id_mensaje="m-1")
+        self.assertTrue(canal.esperar_vacio(timeout=10))
+
+        self.assertEqual(len(canal.cartas_muertas), 1)
+        carta = canal.cartas_muertas[0]
+        self.assertEqual((carta["id"], carta["intentos"]), ("m-1", 1))
+        self.assertIn("ValueError", carta["error"])
+
+        canal.enviar("lector@example.com", "Contenido", "Asunto", id_mensaje="m-2")
+        self.assertTrue(canal.esperar_vacio(timeout=10))
+        self.assertEqual(len(servidor.mensajes), 1)
+        self.assertEqual(canal.obtener_metricas()["enviados"], 1)
+
+    def test_cubeta_limita_la_tasa(self):
+        servidor = self._sms()
+        canal = self._canal("sms", TransporteSMSHTTP(servidor.url), mensajes_por_segundo=50, rafaga=5)
+        inicio = time.monotonic()
+        for i in range(20):
+            canal.enviar(f"+57300000{i:04d}", f"SMS {i}")
+        self.assertTrue(canal.esperar_vacio(timeout=10))
+        transcurrido = time.monotonic() - inicio
+
+        # 5 salen en ráfaga y los 15 restantes a 50/s
+        self.assertGreaterEqual(transcurrido, 15 / 50 * 0.9)
+        self.assertEqual(len(servidor.mensajes), 20)
+
+    def test_reloj_inyectado_no_espera_en_tiempo_real(self):
+        reloj = _RelojFalso()
+        transporte = _TransporteMemoria(fallos=3)
+        canal = self._canal("email", transporte, mensajes_por_segundo=1, rafaga=1, max_intentos=5,
+                            espera_base=60, espera_maxima=600, reloj=reloj, dormir=reloj.dormir)
+        inicio = time.monotonic()
+        with mock.patch.object(delivery_channels.random, "uniform", lambda minimo, maximo: maximo):
+            canal.enviar("lector@example.com", "Contenido", id_mensaje="m-1")
+            self.assertTrue(canal.esperar_vacio(timeout=10))
+
+        self.assertLess(time.monotonic() - inicio, 2)
+        self.assertEqual(transporte.enviados, ["m-1"])
+        # Cada reintento espera su tope exponencial; para entonces la cubeta ya está llena
+        self.assertEqual(reloj.esperas, [60, 120, 240])
+
+    def test_cubeta_con_reloj_inyectado(self):
+        reloj = _RelojFalso()
+        transporte = _TransporteMemoria()
+        canal = self._canal("sms", transporte, mensajes_por_segundo=0.5, rafaga=1, reloj=reloj, dormir=reloj.dormir)
+        for i in range(3):
+            canal.enviar("+573000000000", f"SMS {i}", id_mensaje=str(i))
+        self.assertTrue(canal.esperar_vacio(timeout=10))
+
+        self.assertEqual(transporte.enviados, ["0", "1", "2"])
+        self.assertEqual(reloj.esperas, [2.0, 2.0])
+
+    def test_prestamo_no_espera_al_canal_lento(self):
+        servidor = self._smtp(latencia=0.5)
+        canal = self._canal("email", TransporteSMTP("127.0.0.1", servidor.puerto))
+        fachada = FachadaBiblioteca()
+        fachada.servicio_notificaciones.canal_email = canal
+        usuario = fachada.registrar_usuario("Ana", "ana@example.com")
+        libro = fachada.agregar_libro("Rayuela", "Julio Cortázar", "978-84-376-0494-7")
+
+        inicio = time.monotonic()
+        prestamo = fachada.realizar_prestamo(usuario.id, libro.id)
+        duracion = time.monotonic() - inicio
+
+        self.assertIsNotNone(prestamo)
+        self.assertLess(duracion, 0.25)
+        self.assertTrue(canal.esperar_vacio(timeout=10))
+        self.assertEqual(len(servidor.mensajes), 2)  # Bienvenida y confirmación del préstamo
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import random
+import unittest
+
+from ignore import main_deco
+from ignore.main_deco import (CanalizacionFotogramas, DecoradorCompresion, DecoradorEncriptacion,
+                              DecoradorFiltroColor, DecoradorMarcaAgua, FlujoVideoBase,
+                              ProcesadorParaleloFotogramas, VideoFrame)
+
+
+def _flujo_completo():
+    flujo = DecoradorCompresion(FlujoVideoBase("video.mp4"), 75)
+    flujo = DecoradorEncriptacion(flujo, "clave-secreta")
+    flujo = DecoradorFiltroColor(flujo, "sepia", 0.8)
+    return DecoradorMarcaAgua(flujo, "© Plataforma Streaming", "centro")
+
+
+def _fotogramas(cantidad, tamano=4096, tamanos_variables=False):
+    aleatorio = random.Random(7)
+    return [VideoFrame(i, bytes(aleatorio.randrange(256) for _ in range(
+                aleatorio.randrange(1, tamano) if tamanos_variables else tamano)), i / 30, 1920, 1080)
+            for i in range(cantidad)]
+
+
+class PruebaLotes(unittest.TestCase):
+    def setUp(self):
+        self.canalizacion = CanalizacionFotogramas(_flujo_completo())
+
+    def _esperados(self, fotogramas):
+        return [bytes(self.canalizacion.procesar_fotograma(fotograma).datos) for fotograma in fotogramas]
+
+    @unittest.skipIf(main_deco.np is None, "NumPy no está instalado")
+    def test_lote_vectorizado_igual_que_por_fotograma(self):
+        fotogramas = _fotogramas(20)
+        resultado = self.canalizacion.procesar_lote(fotogramas)
+        self.assertEqual([bytes(fotograma.datos) for fotograma in resultado], self._esperados(fotogramas))
+
+    @unittest.skipIf(main_deco.np is None, "NumPy no está instalado")
+    def test_tabla_por_bloques_en_lote_grande(self):
+        # Más elementos que un bloque de tabla, para recorrer varios bloques
+        fotogramas = _fotogramas(3, tamano=main_deco.ELEMENTOS_BLOQUE_TABLA + 1000)
+        resultado = self.canalizacion.procesar_lote(fotogramas)
+        self.assertEqual([bytes(fotograma.datos) for fotograma in resultado], self._esperados(fotogramas))
+
+    def test_lote_con_tamanos_distintos(self):
+        fotogramas = _fotogramas(20, tamanos_variables=True)
+        resultado = self.canalizacion.procesar_lote(fotogramas)
+        self.assertEqual([bytes(fotograma.datos) for fotograma in resultado], self._esperados(fotogramas))
+
+
+def _cadena_aleatoria(aleatorio):
+    flujo = FlujoVideoBase("video.mp4")
+    for _ in range(aleatorio.randint(0, 6)):
+        decorador = aleatorio.randrange(4)
+        if decorador == 0:
+            flujo = DecoradorCompresion(flujo, aleatorio.randint(0, 99))
+        elif decorador == 1:
+            flujo = DecoradorEncriptacion(flujo, aleatorio.choice(["", "clave", "Ñandú", "x"]))
+        elif decorador == 2:
+            flujo = DecoradorFiltroColor(flujo, aleatorio.choice(["sepia", "gris", "negativo", "ninguno"]),
+                                         aleatorio.choice([0.0, 0.3, 0.8, 1.0]))
+        else:
+            flujo = DecoradorMarcaAgua(flujo, aleatorio.choice(["©", "Plataforma", "marca larga " * 5]),
+                                       aleatorio.choice(["esquina-superior-izquierda", "centro",
+                                                         "esquina-inferior-derecha"]))
+    return flujo
+
+
+class PruebaEquivalenciaConDecoradores(unittest.TestCase):
+    def test_cadenas_aleatorias_fusionadas_y_sin_fusionar(self):
+        aleatorio = random.Random(11)
+        for caso in range(300):
+            flujo = _cadena_aleatoria(aleatorio)
+            fusionada = CanalizacionFotogramas(flujo)
+            sin_fusionar = CanalizacionFotogramas(flujo, fusionar=False)
+            tamano = aleatorio.choice([0, 1, 7, 64, 500])
+            fotogramas = [VideoFrame(i, bytes(aleatorio.randrange(256) for _ in range(tamano)), i / 30, 1920, 1080)
+                          for i in range(3)]
+            esperados = [bytes(flujo.procesar_fotograma(fotograma).datos) for fotograma in fotogramas]
+            with self.subTest(caso=caso, plan=[tipo for tipo, _ in fusionada.plan], tamano=tamano):
+                self.assertLessEqual(len(fusionada.plan), len(sin_fusionar.plan))
+                for canalizacion in (fusionada, sin_fusionar):
+                    self.assertEqual([bytes(canalizacion.procesar_fotograma(fotograma).datos)
+                                      for fotograma in fotogramas], esperados)
+                    self.assertEqual([bytes(fotograma.datos) for fotograma in canalizacion.procesar_lote(fotogramas)],
+                                     esperados)
+                # Los fotogramas de entrada no se modifican
+                self.assertEqual(esperados, [bytes(flujo.procesar_fotograma(fotograma).datos)
+                                             for fotograma in fotogramas])
+
+
+class PruebaProcesadorParalelo(unittest.TestCase):
+    def setUp(self):
+        self.flujo = _flujo_completo()
+        self.canalizacion = CanalizacionFotogramas(self.flujo)
+
+    def test_salida_en_orden_e_igual(self):
+        fotogramas = _fotogramas(60, tamano=1024, tamanos_variables=True)
+        procesador = ProcesadorParaleloFotogramas(self.flujo, num_procesos=2, tamano_lote=7, max_lotes_en_vuelo=3)
+        salida = list(procesador.procesar(fotogramas))
+
+        self.assertEqual([fotograma.id for fotograma in salida], list(range(60)))
+        self.assertEqual([bytes(fotograma.datos) for fotograma in salida],
+                         [bytes(self.canalizacion.procesar_fotograma(fotograma).datos) for fotograma in fotogramas])
+
+    def test_reordena_entrada_dentro_de_la_ventana(self):
+        fotogramas = _fotogramas(60, tamano=512)
+        desordenados = list(fotogramas)
+        for inicio in range(0, 60, 10):  # Desorden local de 10 fotogramas
+            bloque = desordenados[inicio:inicio + 10]
+            random.Random(inicio).shuffle(bloque)
+            desordenados[inicio:inicio + 10] = bloque
+        procesador = ProcesadorParaleloFotogramas(self.flujo, num_procesos=2, tamano_lote=4, max_lotes_en_vuelo=3)
+
+        salida = list(procesador.procesar(desordenados))
+
+        self.assertEqual([fotograma.id for fotograma in salida], list(range(60)))
+        self.assertEqual([bytes(fotograma.datos) for fotograma in salida],
+                         [bytes(self.canalizacion.procesar_fotograma(fotograma).datos) for fotograma in fotogramas])
+
+    def test_desorden_mayor_que_la_ventana_falla(self):
+        fotogramas = _fotogramas(30, tamano=256)
+        desordenados = fotogramas[1:] + fotogramas[:1]  # El primero llega al final
+        procesador = ProcesadorParaleloFotogramas(self.flujo, num_procesos=2, tamano_lote=4, max_lotes_en_vuelo=2,
+                                                  ventana_reordenacion=8)
+        with self.assertRaises(ValueError):
+            list(procesador.procesar(desordenados))
+
+
+if __name__ == "__main__":
+    unittest.main()
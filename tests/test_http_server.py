@@ -0,0 +1,140 @@
+import asyncio
+import importlib
+import json
+import sys
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.models.models import Prestamo
+from src.server import http_server
+from src.server.http_server import ServidorBibliotecaHTTP, TAMANO_MAXIMO_CUERPO
+
+
+class PruebaServidorHTTP(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.servidor = ServidorBibliotecaHTTP(FachadaBiblioteca(), puerto=0, silencioso=True)
+        with mock.patch("builtins.print"):
+            await self.servidor.iniciar()
+        self.lector, self.escritor = await asyncio.open_connection("127.0.0.1", self.servidor.puerto)
+
+    async def asyncTearDown(self):
+        self.escritor.close()
+        await self.servidor.detener()
+
+    async def _solicitar(self, metodo, ruta, cuerpo=None, cabeceras="", datos=None):
+        if datos is None:
+            datos = json.dumps(cuerpo).encode("utf-8") if cuerpo is not None else b""
+        if "Content-Length" not in cabeceras:
+            cabeceras += f"Content-Length: {len(datos)}\r\n"
+        self.escritor.write(f"{metodo} {ruta} HTTP/1.1\r\nHost: prueba\r\n{cabeceras}\r\n".encode("latin-1") + datos)
+        await self.escritor.drain()
+        estado = int((await self.lector.readline()).split()[1])
+        respuesta = {}
+        while True:
+            linea = await self.lector.readline()
+            if linea in (b"\r\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            respuesta[nombre.strip().lower()] = valor.strip()
+        return estado, respuesta, json.loads(await self.lector.readexactly(int(respuesta["content-length"])))
+
+    async def test_conexion_persistente_atiende_varias_solicitudes(self):
+        estado, cabeceras, usuario = await self._solicitar("POST", "/usuarios",
+                                                           {"nombre": "Ana", "email": "ana@example.com"})
+        self.assertEqual((estado, cabeceras["connection"]), (201, "keep-alive"))
+        _, _, libro = await self._solicitar("POST", "/libros", {"titulo": "Rayuela", "autor": "Cortázar",
+                                                                "isbn": "978-84"})
+        estado, _, prestamo = await self._solicitar("POST", "/prestamos",
+                                                    {"id_usuario": usuario["id"], "id_libro": libro["id"]})
+        self.assertEqual(estado, 201)
+        self.assertIn("fecha_vencimiento", prestamo)
+        estado, _, disponibles = await self._solicitar("GET", "/libros?titulo=rayuela&solo_disponibles=1")
+        self.assertEqual((estado, disponibles), (200, []))
+        estado, _, _ = await self._solicitar("POST", f"/prestamos/{prestamo['id']}/devolucion")
+        self.assertEqual(estado, 200)
+
+        self.assertEqual(self.servidor.solicitudes_atendidas, 5)
+
+    async def test_lote_devuelve_un_resultado_por_operacion(self):
+        estado, _, resultados = await self._solicitar("POST", "/lote", [
+            {"operacion": "registrar_usuario", "argumentos": {"nombre": "Ana", "email": "ana@example.com"}},
+            {"operacion": "agregar_libro", "argumentos": {"titulo": "Rayuela"}},
+            {"operacion": "no_existe"},
+            "no es una operación",
+        ])
+
+        self.assertEqual(estado, 200)
+        self.assertEqual([resultado["estado"] for resultado in resultados], [201, 400, 404, 400])
+        self.assertEqual(resultados[0]["respuesta"]["nombre"], "Ana")
+        self.assertEqual(self.servidor.solicitudes_atendidas, 1)
+
+    async def test_errores_400_y_404_mantienen_la_conexion(self):
+        estado, cabeceras, respuesta = await self._solicitar("POST", "/usuarios", datos=b"{x}")
+        self.assertEqual((estado, respuesta["error"]), (400, "JSON inválido"))
+        self.assertEqual(cabeceras["connection"], "keep-alive")
+        estado, _, _ = await self._solicitar("POST", "/desconocida", {})
+        self.assertEqual(estado, 404)
+        estado, _, _ = await self._solicitar("POST", "/prestamos/99/devolucion")
+        self.assertEqual(estado, 404)
+        estado, _, _ = await self._solicitar("POST", "/usuarios", {"nombre": "Ana"})
+        self.assertEqual(estado, 400)
+        estado, _, _ = await self._solicitar("POST", "/usuarios", {"nombre": "Ana", "email": "ana@example.com"})
+        self.assertEqual(estado, 201)
+        self.assertEqual(self.servidor.solicitudes_atendidas, 5)
+
+    async def test_content_length_negativo_cierra_la_conexion(self):
+        estado, cabeceras, _ = await self._solicitar("POST", "/usuarios", cabeceras="Content-Length: -5\r\n")
+
+        self.assertEqual(estado, 400)
+        self.assertEqual(cabeceras["connection"], "close")
+        self.assertEqual(await self.lector.read(), b"")
+
+    async def test_content_length_no_numerico_es_400(self):
+        estado, cabeceras, _ = await self._solicitar("POST", "/usuarios", cabeceras="Content-Length: diez\r\n")
+
+        self.assertEqual((estado, cabeceras["connection"]), (400, "close"))
+
+    async def test_cuerpo_demasiado_grande_es_413(self):
+        estado, cabeceras, _ = await self._solicitar(
+            "POST", "/usuarios", cabeceras=f"Content-Length: {TAMANO_MAXIMO_CUERPO + 1}\r\n")
+
+        self.assertEqual((estado, cabeceras["connection"]), (413, "close"))
+        self.assertEqual(await self.lector.read(), b"")
+
+    async def test_cabecera_demasiado_larga_es_431(self):
+        estado, cabeceras, respuesta = await self._solicitar("GET", "/libros",
+                                                             cabeceras=f"X-Relleno: {'a' * 70_000}\r\n")
+
+        self.assertEqual((estado, cabeceras["connection"]), (431, "close"))
+        self.assertIn("demasiado larga", respuesta["error"])
+
+    async def test_linea_de_solicitud_demasiado_larga_es_431(self):
+        estado, cabeceras, _ = await self._solicitar("GET", f"/libros?titulo={'a' * 70_000}")
+
+        self.assertEqual((estado, cabeceras["connection"]), (431, "close"))
+
+
+class PruebaCodificacionSinOrjson(unittest.TestCase):
+    def tearDown(self):
+        # Volver a cargar el módulo con orjson, si está instalado
+        importlib.reload(http_server)
+
+    def test_usa_json_de_la_biblioteca_estandar(self):
+        with mock.patch.dict(sys.modules, {"orjson": None}):
+            modulo = importlib.reload(http_server)
+
+        self.assertIsNone(modulo.orjson)
+        fecha = datetime(2024, 5, 1, 10, 30)
+        prestamo = Prestamo(id=1, id_usuario=2, id_libro=3, fecha_prestamo=fecha)
+        datos = json.loads(modulo.codificar_json({"prestamo": prestamo, "título": "Año"}))
+
+        self.assertEqual(datos["título"], "Año")
+        self.assertEqual(datos["prestamo"]["fecha_prestamo"], fecha.isoformat())
+        self.assertEqual(datos["prestamo"]["fecha_vencimiento"], prestamo.fecha_vencimiento.isoformat())
+        self.assertEqual(modulo.decodificar_json(b'{"a": [1, 2]}'), {"a": [1, 2]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.subsystems.id_allocator import AsignadorIds
+
+
+def _pedir_ids(ruta_bd: str, cantidad: int):
+    """Ejecutado en otro proceso: pide IDs con su propio asignador sobre el mismo archivo."""
+    asignador = AsignadorIds(ruta_bd, tamano_bloque=7)
+    ids = [asignador.siguiente_id("libro") for _ in range(cantidad)]
+    asignador.cerrar()
+    return ids
+
+
+class _ConexionQueFalla:
+    """Conexión cuya consulta falla después de que SQLite haya deshecho la transacción."""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __getattr__(self, nombre):
+        return getattr(self.conexion, nombre)
+
+    def execute(self, sql, *parametros):
+        if sql.startswith("SELECT"):
+            self.conexion.execute("ROLLBACK")
+            raise sqlite3.OperationalError("disk I/O error")
+        return self.conexion.execute(sql, *parametros)
+
+
+class PruebaAsignadorIds(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.asignador = AsignadorIds(os.path.join(self.directorio.name, "ids.db"), tamano_bloque=10)
+
+    def tearDown(self):
+        self.asignador.cerrar()
+        self.directorio.cleanup()
+
+    def test_bloques_consecutivos(self):
+        self.assertEqual(self.asignador.reservar_bloque("libro", 10), (1, 11))
+        self.assertEqual(self.asignador.reservar_bloque("libro", 5), (11, 16))
+        self.assertEqual([self.asignador.siguiente_id("usuario") for _ in range(12)], list(range(1, 13)))
+
+    def test_hilos_y_procesos_no_repiten_ids(self):
+        ids = []
+        lock = threading.Lock()
+
+        def pedir():
+            propios = [self.asignador.siguiente_id("libro") for _ in range(300)]
+            with lock:
+                ids.extend(propios)
+
+        contexto = multiprocessing.get_context("spawn")
+        with contexto.Pool(3) as procesos:
+            pendientes = procesos.starmap_async(_pedir_ids, [(self.asignador.ruta_bd, 300)] * 3)
+            hilos = [threading.Thread(target=pedir) for _ in range(4)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            for propios in pendientes.get(timeout=60):
+                ids.extend(propios)
+
+        self.assertEqual(len(ids), 7 * 300)
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_asegurar_minimo_descarta_el_bloque_local(self):
+        self.assertEqual(self.asignador.siguiente_id("libro"), 1)
+        self.asignador.asegurar_minimo("libro", 50)
+        self.assertEqual(self.asignador.siguiente_id("libro"), 50)
+        self.asignador.asegurar_minimo("libro", 20)  # Nunca retrocede
+        self.assertEqual(self.asignador.siguiente_id("libro"), 51)
+
+    def test_importar_adelanta_las_secuencias(self):
+        ruta = os.path.join(self.directorio.name, "biblioteca.bin")
+        with contextlib.redirect_stdout(io.StringIO()):
+            origen = FachadaBiblioteca()
+            usuario = origen.registrar_usuario("Ana", "ana@example.com")
+            for i in range(3):
+                origen.agregar_libro(f"L{i}", "Autor", f"isbn-{i}")
+            origen.realizar_prestamo(usuario.id, 1)
+            origen.exportar_datos(ruta)
+
+            destino = FachadaBiblioteca(asignador_ids=self.asignador)
+            destino.importar_datos(ruta)
+            nuevo = destino.agregar_libro("Nuevo", "Autor", "isbn-nuevo")
+            otro_usuario = destino.registrar_usuario("Luis", "luis@example.com")
+            prestamo = destino.realizar_prestamo(otro_usuario.id, 2)
+
+        self.assertEqual(nuevo.id, 4)
+        self.assertEqual(otro_usuario.id, 2)
+        self.assertEqual(prestamo.id, 2)
+        self.assertEqual([libro.id for libro in destino.consultar_libros(titulo="L0")], [1])
+
+    def test_exportar_con_asignador_guarda_los_contadores(self):
+        ruta = os.path.join(self.directorio.name, "biblioteca.bin")
+        with contextlib.redirect_stdout(io.StringIO()):
+            origen = FachadaBiblioteca(asignador_ids=self.asignador)
+            usuario = origen.registrar_usuario("Ana", "ana@example.com")
+            libros = [origen.agregar_libro(f"L{i}", "Autor", f"isbn-{i}") for i in range(3)]
+            prestamo = origen.realizar_prestamo(usuario.id, libros[0].id)
+            origen.exportar_datos(ruta)
+
+            # Sin asignador, los IDs nuevos salen de los contadores exportados
+            destino = FachadaBiblioteca()
+            destino.importar_datos(ruta)
+            nuevo = destino.agregar_libro("Nuevo", "Autor", "isbn-nuevo")
+            otro_usuario = destino.registrar_usuario("Luis", "luis@example.com")
+            otro_prestamo = destino.realizar_prestamo(otro_usuario.id, libros[1].id)
+
+        self.assertEqual(nuevo.id, libros[-1].id + 1)
+        self.assertEqual(otro_usuario.id, usuario.id + 1)
+        self.assertEqual(otro_prestamo.id, prestamo.id + 1)
+
+    def test_error_original_no_queda_oculto_por_el_rollback(self):
+        conexion = self.asignador._obtener_conexion()
+        self.asignador._conexion = _ConexionQueFalla(conexion)
+
+        with self.assertRaisesRegex(sqlite3.OperationalError, "disk I/O error"):
+            self.asignador.reservar_bloque("libro", 10)
+
+        self.asignador._conexion = conexion
+        self.assertFalse(conexion.in_transaction)
+        self.assertEqual(self.asignador.reservar_bloque("libro", 10), (1, 11))
+
+
+if __name__ == "__main__":
+    unittest.main()
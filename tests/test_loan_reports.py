@@ -0,0 +1,46 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from src.models.models import Prestamo
+from src.subsystems.book_catalog import CatalogoLibros
+from src.subsystems.loan_reports import GeneradorReportes
+from src.subsystems.loan_system import SistemaPrestamos
+
+
+class PruebaReportes(unittest.TestCase):
+    def setUp(self):
+        self.sistema = SistemaPrestamos(CatalogoLibros())
+        self.ahora = datetime.now()
+        aleatorio = random.Random(42)
+        for id_prestamo in range(1, 2001):
+            inicio = self.ahora - timedelta(days=aleatorio.randint(0, 60), seconds=aleatorio.randint(0, 86_399))
+            devolucion = inicio + timedelta(days=aleatorio.randint(1, 30)) if aleatorio.random() < 0.7 else None
+            self.sistema.prestamos[id_prestamo] = Prestamo(
+                id=id_prestamo, id_usuario=aleatorio.randint(1, 200), id_libro=id_prestamo,
+                fecha_prestamo=inicio, fecha_devolucion=devolucion)
+        self.generador = GeneradorReportes(self.sistema)
+
+    def test_secuencial_usa_la_fecha_de_corte(self):
+        corte = self.ahora - timedelta(days=20)
+        secuencial = self.generador.generar_reporte_secuencial(corte)
+        paralelo = self.generador.generar_reporte(1, corte)
+
+        self.assertEqual(secuencial["fecha_corte"], corte)
+        self.assertEqual(secuencial["vencidos"], paralelo["vencidos"])
+        self.assertEqual(secuencial["total_multas"], paralelo["total_multas"])
+        self.assertLess(len(secuencial["vencidos"]), len(self.generador.generar_reporte_secuencial()["vencidos"]))
+
+    def test_pool_de_procesos_coincide_con_el_secuencial(self):
+        corte = self.ahora - timedelta(days=5)
+        secuencial = self.generador.generar_reporte_secuencial(corte)
+        paralelo = self.generador.generar_reporte(2, corte)
+
+        self.assertGreater(len(self.generador._particionar(8)), 2)
+        self.assertEqual(paralelo, secuencial)
+        self.assertGreater(paralelo["total_multas"], 0)
+        self.assertTrue(paralelo["vencidos"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import contextlib
+import io
+import unittest
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.subsystems.memory_accounting import medir_estructuras
+
+
+class PruebaMedirEstructuras(unittest.TestCase):
+    def test_bytes_y_entidades_por_separado(self):
+        mapa = bytearray(1000)
+        uso = medir_estructuras([("libros", {1: "a", 2: "b"}), ("mapa", mapa, None), ("eventos", [1, 2, 3], 1)])
+
+        self.assertNotIn("entidades", uso["mapa"])
+        self.assertGreaterEqual(uso["mapa"]["bytes"], 1000)
+        self.assertEqual(uso["eventos"]["entidades"], 1)
+        self.assertEqual(uso["total"]["entidades"], 3)
+        self.assertEqual(uso["total"]["bytes"], sum(uso[nombre]["bytes"] for nombre in ("libros", "mapa", "eventos")))
+
+    def test_fachada_cuenta_solo_los_eventos_retenidos(self):
+        fachada = FachadaBiblioteca()
+        fachada.flujo_cambios.capacidad_retencion = 5
+        fachada.suscribir_cambios(lambda lote: None, tamano_lote=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(20):
+                fachada.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}")
+
+        uso = fachada.obtener_uso_memoria()
+
+        self.assertEqual(uso["flujo_cambios"]["entidades"], 5)
+        self.assertNotIn("entidades", uso["mapa_disponibilidad"])
+        self.assertEqual(uso["libros"]["entidades"], 20)
+
+    def test_fachada_incluye_indices_y_estadisticas(self):
+        fachada = FachadaBiblioteca()
+        vacia = fachada.obtener_uso_memoria()
+        with contextlib.redirect_stdout(io.StringIO()):
+            usuario = fachada.registrar_usuario("Ana", "ana@example.com")
+            for i in range(50):
+                libro = fachada.agregar_libro(f"Título número {i}", f"Autora {i}", f"isbn-{i}")
+                fachada.realizar_prestamo(usuario.id, libro.id)
+
+        uso = fachada.obtener_uso_memoria()
+
+        for nombre in ("indices_catalogo", "estadisticas_circulacion"):
+            self.assertNotIn("entidades", uso[nombre])
+            self.assertGreater(uso[nombre]["bytes"], vacia[nombre]["bytes"])
+        self.assertEqual(uso["total"]["bytes"], sum(datos["bytes"] for nombre, datos in uso.items() if nombre != "total"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from src.subsystems.paged_catalog import CatalogoLibrosPaginado
+
+
+class PruebaCatalogoPaginado(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.directorio.name, "libros.pag")
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+        self.directorio.cleanup()
+
+    def test_registros_que_crecen_no_agrandan_el_archivo_sin_limite(self):
+        catalogo = CatalogoLibrosPaginado(self.ruta, max_residentes=10, tamano_pagina=512)
+        for i in range(200):
+            catalogo.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}")
+        for ronda in range(20):
+            for i in range(1, 201):
+                libro = catalogo.obtener_libro(i)
+                libro.titulo = f"Libro {i} " + "x" * (ronda % 7 * 10)
+        catalogo.sincronizar()
+
+        estadisticas = catalogo.obtener_estadisticas_memoria()
+        self.assertGreater(estadisticas["compactaciones"], 0)
+        self.assertLessEqual(estadisticas["tamano_archivo"], 3 * catalogo.libros.bytes_vivos + 16 * 512)
+        self.assertEqual(os.path.getsize(self.ruta), estadisticas["tamano_archivo"])
+        for i in range(1, 201):
+            self.assertEqual(catalogo.obtener_libro(i).titulo, f"Libro {i} " + "x" * (19 % 7 * 10))
+        self.assertEqual([libro.isbn for libro in catalogo.libros.values()], [f"isbn-{i}" for i in range(200)])
+        catalogo.cerrar()
+
+    def test_limite_de_bytes_residentes(self):
+        catalogo = CatalogoLibrosPaginado(self.ruta, max_residentes=1000, max_bytes_residentes=2000)
+        for i in range(200):
+            catalogo.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}")
+        for i in range(1, 201):
+            catalogo.obtener_libro(i)
+
+        estadisticas = catalogo.obtener_estadisticas_memoria()
+        self.assertLessEqual(estadisticas["bytes_residentes"], 2000)
+        self.assertLess(estadisticas["residentes"], 200)
+        self.assertEqual(estadisticas["bytes_residentes"],
+                         sum(len(datos) for _, datos in catalogo.libros.residentes.values()))
+        catalogo.cerrar()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,240 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from ignore.main_proxy import DictCache, GestorRecursosWeb, ProxyCacheRecursos
+from tests.fake_origins import OrigenFalso
+
+URL = "https://api.example.com/popular.json"
+
+
+def _version(contenido) -> int:
+    return json.loads(bytes(contenido.datos))["version"]
+
+
+class PruebaDescargasAgrupadas(unittest.TestCase):
+    def setUp(self):
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.proxies = []
+
+    def tearDown(self):
+        for proxy in self.proxies:
+            proxy.cerrar()
+        self.salida.__exit__(None, None, None)
+
+    def _proxy(self, origen, **opciones):
+        proxy = ProxyCacheRecursos(recurso_real=origen, **opciones)
+        self.proxies.append(proxy)
+        return proxy
+
+    def test_fallos_simultaneos_llegan_una_vez_al_origen(self):
+        origen = OrigenFalso(latencia=0.2)
+        proxy = self._proxy(origen)
+        num_clientes = 50
+        barrera = threading.Barrier(num_clientes)
+
+        def solicitar(_):
+            barrera.wait()
+            return _version(proxy.obtener_contenido(URL))
+
+        with ThreadPoolExecutor(max_workers=num_clientes) as clientes:
+            versiones = list(clientes.map(solicitar, range(num_clientes)))
+
+        self.assertEqual(origen.solicitudes, 1)
+        self.assertEqual(set(versiones), {1})
+        self.assertEqual(proxy.solicitudes_agrupadas, num_clientes - 1)
+
+    def test_descarga_terminada_tras_consultar_la_cache_no_se_repite(self):
+        # Simula al cliente que falló en la caché justo antes de que otra
+        # descarga de la misma URL terminara y saliera de `en_vuelo`
+        origen = OrigenFalso(latencia=0.0)
+        proxy = self._proxy(origen)
+        proxy.obtener_contenido(URL)
+        clave = proxy._generar_clave_cache(URL)
+
+        contenido = proxy._descargar_agrupado(URL, clave).result()
+
+        self.assertEqual(_version(contenido), 1)
+        self.assertEqual(origen.solicitudes, 1)
+
+    def test_sirve_obsoleto_mientras_refresca(self):
+        origen = OrigenFalso(latencia=0.3)
+        proxy = self._proxy(origen, servir_obsoleto=True, ventana_obsoleto=30)
+        proxy.politicas_cache.tipos_contenido["application/json"] = 1  # Expira en un segundo
+        self.assertEqual(_version(proxy.obtener_contenido(URL)), 1)
+        time.sleep(1.1)
+
+        inicio = time.monotonic()
+        obsoletos = [_version(proxy.obtener_contenido(URL)) for _ in range(10)]
+        duracion = time.monotonic() - inicio
+
+        # Todas se sirven del contenido obsoleto sin esperar al origen,
+        # y el refresco en segundo plano se hace una sola vez
+        self.assertEqual(obsoletos, [1] * 10)
+        self.assertLess(duracion, origen.latencia / 2)
+        self.assertEqual(proxy.refrescos_en_segundo_plano, 1)
+
+        time.sleep(origen.latencia + 0.2)
+        self.assertEqual(origen.solicitudes, 2)
+        self.assertEqual(_version(proxy.obtener_contenido(URL)), 2)
+
+
+class PruebaDictCache(unittest.TestCase):
+    def test_desaloja_el_menos_usado_recientemente(self):
+        cache = DictCache(capacidad_bytes=30)
+        desalojados = []
+        cache.al_desalojar = lambda clave, item: desalojados.append(clave)
+        for clave in "abc":
+            cache.guardar(clave, bytes(10))
+        cache.obtener("a")
+        cache.guardar("d", bytes(10))
+
+        self.assertEqual(list(cache.datos), ["c", "a", "d"])
+        self.assertEqual(desalojados, ["b"])
+        self.assertEqual(cache.desalojos, 1)
+
+    def test_primer_argumento_sigue_siendo_el_numero_de_elementos(self):
+        cache = DictCache(2)
+        for clave in "abc":
+            cache.guardar(clave, bytes(1))
+
+        self.assertEqual(cache.tamano_maximo, 2)
+        self.assertEqual(list(cache.datos), ["b", "c"])
+        with self.assertRaises(TypeError):
+            DictCache(2, 1024)
+
+    def test_cuenta_los_bytes_de_cada_valor(self):
+        cache = DictCache(capacidad_bytes=100)
+        cache.guardar("a", bytes(40))
+        cache.guardar("b", {"clave": "valor"})
+        self.assertEqual(cache.bytes_usados, 40 + len('{"clave": "valor"}'))
+        cache.guardar("a", bytes(10))  # Reemplazar descuenta el tamaño anterior
+        self.assertEqual(cache.bytes_usados, 10 + len('{"clave": "valor"}'))
+        cache.eliminar("b")
+        self.assertEqual(cache.bytes_usados, 10)
+
+        self.assertFalse(cache.guardar("enorme", bytes(101)))
+        self.assertEqual((len(cache.datos), cache.bytes_usados), (1, 10))
+        self.assertEqual(cache.limpiar(), 1)
+        self.assertEqual(cache.bytes_usados, 0)
+
+    def test_libera_los_expirados_antes_de_desalojar(self):
+        cache = DictCache(capacidad_bytes=30)
+        desalojados = []
+        cache.al_desalojar = lambda clave, item: desalojados.append(clave)
+        cache.guardar("viva", bytes(10))
+        cache.guardar("vieja1", bytes(10), tiempo_vida=-1)
+        cache.guardar("vieja2", bytes(10), tiempo_vida=-1)
+        self.assertEqual(cache.obtener_estadisticas()["elementos_expirados"], 2)
+
+        cache.guardar("nueva", bytes(10))
+
+        self.assertEqual(list(cache.datos), ["viva", "nueva"])
+        self.assertEqual((cache.bytes_usados, cache.desalojos, desalojados), (20, 0, []))
+        self.assertIsNone(cache.obtener("vieja1"))
+        self.assertEqual(cache.obtener_estadisticas()["elementos_expirados"], 0)
+
+
+class PruebaCacheEnDisco(unittest.TestCase):
+    def setUp(self):
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.directorio = tempfile.TemporaryDirectory()
+        self.origen = OrigenFalso(latencia=0.0)
+        self.proxy = ProxyCacheRecursos(recurso_real=self.origen, directorio_disco=self.directorio.name)
+        self.proxy.politicas_cache.vida_minima_disco = 0
+        self.proxy.cache.tamano_maximo = 1  # Cada recurso nuevo desaloja al anterior
+
+    def tearDown(self):
+        self.proxy.cerrar()
+        self.directorio.cleanup()
+        self.salida.__exit__(None, None, None)
+
+    def test_desalojo_baja_a_disco_fuera_del_lock(self):
+        guardar = self.proxy.cache_disco.guardar
+        lock_tomado = []
+
+        def guardar_comprobando(*argumentos):
+            lock_tomado.append(self.proxy._lock.locked())
+            return guardar(*argumentos)
+
+        self.proxy.cache_disco.guardar = guardar_comprobando
+        for i in range(3):
+            self.proxy.obtener_contenido(f"{URL}?p={i}")
+
+        self.assertEqual(lock_tomado, [False, False])
+        self.assertEqual(self.proxy.cache_disco.obtener_estadisticas()["elementos"], 2)
+        self.proxy.obtener_contenido(f"{URL}?p=0")
+        self.assertEqual(self.origen.solicitudes, 3)
+
+    def test_version_nueva_reemplaza_la_copia_en_disco(self):
+        self.proxy.servir_obsoleto = True
+        self.proxy.obtener_contenido(f"{URL}?p=0")
+        self.proxy.obtener_contenido(f"{URL}?p=1")  # p=0 baja a disco
+        self.proxy.obtener_contenido(f"{URL}?p=0")  # Se promueve desde disco
+        clave = self.proxy._generar_clave_cache(f"{URL}?p=0")
+        self.proxy.cache.datos[clave].expira_en = time.monotonic() - 1
+
+        self.assertEqual(_version(self.proxy.obtener_contenido(f"{URL}?p=0")), 1)  # Obsoleta; se refresca
+        for futuro in list(self.proxy.en_vuelo.values()):
+            futuro.result()
+        self.proxy.obtener_contenido(f"{URL}?p=2")  # La versión 2 de p=0 baja a disco
+        self.proxy.obtener_contenido(f"{URL}?p=3")
+
+        self.assertEqual(_version(self.proxy.obtener_contenido(f"{URL}?p=0")), 2)
+        self.assertEqual(self.origen.solicitudes_por_url[f"{URL}?p=0"], 2)
+
+    def test_limpiar_cache_vacia_tambien_el_disco(self):
+        for i in range(3):
+            self.proxy.obtener_contenido(f"{URL}?p={i}")
+        vista = self.proxy.obtener_contenido(f"{URL}?p=0")  # Servida desde el segmento
+
+        # p=0 se promovió a memoria sin salir del disco, así que cuenta en ambos niveles
+        self.assertEqual(self.proxy.limpiar_cache(), 4)
+        self.assertEqual(len(self.proxy.cache.datos), 0)
+
+        estadisticas = self.proxy.cache_disco.obtener_estadisticas()
+        self.assertEqual((estadisticas["elementos"], estadisticas["tamano_segmento"]), (0, 0))
+        self.assertEqual(os.path.getsize(self.proxy.cache_disco.ruta), 0)
+        self.assertEqual(_version(vista), 1)  # Las vistas entregadas siguen siendo legibles
+        self.proxy.obtener_contenido(f"{URL}?p=0")
+        self.assertEqual(self.origen.solicitudes, 4)
+
+    def test_bytes_publicos_y_vista_sin_copia_desde_disco(self):
+        for i in range(2):
+            self.proxy.obtener_contenido(f"{URL}?p={i}")
+        contenido = self.proxy.obtener_contenido(f"{URL}?p=0")  # Servida desde el segmento
+        self.assertIsInstance(contenido.datos, memoryview)
+
+        datos = contenido.obtener_como_bytes()
+        vista = contenido.obtener_vista()
+        self.assertIsInstance(datos, bytes)
+        self.assertEqual(hash(datos), hash(bytes(vista)))
+        self.assertIs(vista.obj, contenido.datos.obj)  # La vista sigue sobre el archivo mapeado
+        self.assertEqual(json.loads(datos + b"")["version"], 1)
+
+    def test_cargar_imagen_devuelve_bytes(self):
+        self.origen.tipo_contenido = "image/png"
+        gestor = GestorRecursosWeb()
+        gestor.proxy_cache.cerrar()
+        gestor.proxy_cache = self.proxy
+        url = "https://cdn.example.com/portada.png"
+        self.proxy.obtener_contenido(url)
+        self.proxy.obtener_contenido(f"{url}?otra=1")  # La portada baja a disco
+
+        imagen = gestor.cargar_imagen(url)
+
+        self.assertIsInstance(imagen, bytes)
+        self.assertEqual(json.loads(imagen)["url"], url)
+        self.assertEqual(self.origen.solicitudes_por_url[url], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.subsystems.notification_service import ServicioNotificaciones
+
+
+class PruebaDisparoRecordatorios(unittest.TestCase):
+    def setUp(self):
+        self.servicio = ServicioNotificaciones()
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.servicio.programar_recordatorio(1, datetime.now() - timedelta(minutes=1), "Primero", "k")
+        # La acción que el planificador ya sacó del montículo y está a punto de ejecutar
+        self.accion = self.servicio.planificador.tareas["k"][2]
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+
+    def test_cancelar_durante_el_disparo(self):
+        self.servicio.cancelar_recordatorio("k")
+        self.accion()
+
+        self.assertEqual(self.servicio.recordatorios_programados, {})
+        self.assertEqual([n["mensaje"] for n in self.servicio.notificaciones_enviadas], ["Primero"])
+
+    def test_reemplazar_durante_el_disparo_conserva_el_nuevo(self):
+        futura = datetime.now() + timedelta(days=1)
+        self.servicio.programar_recordatorio(1, futura, "Segundo", "k")
+        self.accion()
+
+        self.assertEqual([n["mensaje"] for n in self.servicio.notificaciones_enviadas], ["Primero"])
+        self.assertEqual(self.servicio.recordatorios_programados["k"]["mensaje"], "Segundo")
+        self.assertEqual(self.servicio.procesar_recordatorios(), 0)
+        self.assertEqual(self.servicio.planificador.proxima_fecha(), futura)
+
+
+class PruebaRecordatoriosProgramados(unittest.TestCase):
+    def setUp(self):
+        self.fachada = FachadaBiblioteca()
+        self.fachada.activar_recordatorios_programados()
+        with contextlib.redirect_stdout(io.StringIO()):
+            usuario = self.fachada.registrar_usuario("Ana", "ana@example.com")
+            libro = self.fachada.agregar_libro("Rayuela", "Julio Cortázar", "978-84-376-0494-7")
+            self.prestamo = self.fachada.realizar_prestamo(usuario.id, libro.id)
+
+    def test_no_se_suscribe_al_flujo_de_cambios(self):
+        self.assertEqual(self.fachada.flujo_cambios.suscripciones, [])
+        self.assertIn(f"prestamo:{self.prestamo.id}", self.fachada.servicio_notificaciones.recordatorios_programados)
+
+    def test_extender_reprograma_el_recordatorio(self):
+        clave = f"prestamo:{self.prestamo.id}"
+        antes = self.fachada.servicio_notificaciones.recordatorios_programados[clave]["fecha_programada"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.fachada.sistema_prestamos.extender_plazo(self.prestamo.id, 7)
+
+        despues = self.fachada.servicio_notificaciones.recordatorios_programados[clave]["fecha_programada"]
+        self.assertEqual((despues - antes).days, 7)
+
+
+class PruebaActivacionRecordatorios(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.fachada = FachadaBiblioteca()
+        usuario = self.fachada.registrar_usuario("Ana", "ana@example.com")
+        for i in range(3):
+            libro = self.fachada.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}")
+            self.fachada.realizar_prestamo(usuario.id, libro.id)
+        self.fachada.devolver_libro(2)
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+        self.directorio.cleanup()
+
+    def test_activar_programa_los_prestamos_existentes(self):
+        self.assertIsNone(self.fachada.dias_aviso_recordatorio)
+        self.fachada.activar_recordatorios_programados()
+
+        self.assertEqual(set(self.fachada.servicio_notificaciones.recordatorios_programados),
+                         {"prestamo:1", "prestamo:3"})
+
+    def test_activar_dos_veces_observa_una(self):
+        self.fachada.activar_recordatorios_programados()
+        self.fachada.activar_recordatorios_programados(dias_antes=5)
+
+        self.assertEqual(len(self.fachada.sistema_prestamos.observadores), 1)
+        prestamo = self.fachada.sistema_prestamos.prestamos[1]
+        programado = self.fachada.servicio_notificaciones.recordatorios_programados["prestamo:1"]
+        self.assertEqual(programado["fecha_programada"], prestamo.fecha_vencimiento - timedelta(days=5))
+        self.fachada.devolver_libro(1)
+        self.assertEqual(set(self.fachada.servicio_notificaciones.recordatorios_programados), {"prestamo:3"})
+
+    def test_importar_reemplaza_los_recordatorios(self):
+        ruta = os.path.join(self.directorio.name, "biblioteca.bin")
+        self.fachada.exportar_datos(ruta)
+
+        otra = FachadaBiblioteca()
+        otra.activar_recordatorios_programados()
+        usuario = otra.registrar_usuario("Luis", "luis@example.com")
+        for i in range(5):
+            libro = otra.agregar_libro(f"Otro {i}", "Autor", f"otro-{i}")
+            otra.realizar_prestamo(usuario.id, libro.id)
+        otra.servicio_notificaciones.programar_recordatorio(usuario.id, datetime.now(), "Suelto")
+        otra.importar_datos(ruta)
+
+        self.assertEqual(set(otra.servicio_notificaciones.recordatorios_programados), {"prestamo:1", "prestamo:3"})
+        self.assertEqual(len(otra.servicio_notificaciones.planificador), 2)
+
+
+class PruebaResumenVencimientos(unittest.TestCase):
+    def setUp(self):
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.fachada = FachadaBiblioteca()
+        self.servicio = self.fachada.servicio_notificaciones
+        ana = self.fachada.registrar_usuario("Ana", "ana@example.com")
+        luis = self.fachada.registrar_usuario("Luis", "luis@example.com")
+        for i, (usuario, dias_prestado) in enumerate([(ana, 12), (ana, 13), (ana, 1), (luis, 12)]):
+            libro = self.fachada.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}")
+            prestamo = self.fachada.realizar_prestamo(usuario.id, libro.id)
+            # Vence en 14 - dias_prestado días; sólo los que vencen en 3 días o menos se recuerdan
+            prestamo.fecha_prestamo -= timedelta(days=dias_prestado)
+        self.servicio.notificaciones_enviadas.clear()
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+
+    def _resumenes(self):
+        return [n for n in self.servicio.notificaciones_enviadas if n["asunto"].startswith("Recordatorio")]
+
+    def test_un_resumen_por_usuario_con_todos_sus_prestamos(self):
+        self.assertEqual(self.fachada.enviar_recordatorios_vencimiento(resumen=True), 2)
+
+        resumenes = {n["destinatario"]: n for n in self._resumenes()}
+        self.assertEqual(set(resumenes), {"ana@example.com", "luis@example.com"})
+        self.assertIn("2 préstamo(s)", resumenes["ana@example.com"]["asunto"])
+        self.assertIn("'Libro 0'", resumenes["ana@example.com"]["contenido"])
+        self.assertIn("'Libro 1'", resumenes["ana@example.com"]["contenido"])
+        self.assertNotIn("'Libro 2'", resumenes["ana@example.com"]["contenido"])
+        self.assertIn("1 préstamo(s)", resumenes["luis@example.com"]["asunto"])
+
+    def test_no_reenvia_dentro_de_la_ventana(self):
+        self.fachada.enviar_recordatorios_vencimiento(resumen=True)
+
+        self.assertEqual(self.fachada.enviar_recordatorios_vencimiento(resumen=True), 0)
+        self.assertEqual(len(self._resumenes()), 2)
+
+    def test_sin_resumen_no_se_suprime(self):
+        self.fachada.enviar_recordatorios_vencimiento(resumen=True)
+
+        self.assertEqual(self.fachada.enviar_recordatorios_vencimiento(), 3)
+
+    def test_reenvia_pasada_la_ventana(self):
+        self.fachada.enviar_recordatorios_vencimiento(resumen=True)
+        # Simular que los avisos se enviaron hace más de la ventana de supresión
+        vencidos = datetime.now() - self.servicio.ventana_supresion - timedelta(minutes=1)
+        for clave in self.servicio.recordatorios_recientes:
+            self.servicio.recordatorios_recientes[clave] = vencidos
+
+        self.assertEqual(self.fachada.enviar_recordatorios_vencimiento(resumen=True), 2)
+        self.assertEqual(len(self._resumenes()), 4)
+        # Los avisos antiguos se purgan y sólo quedan los recién enviados
+        self.assertEqual(len(self.servicio.recordatorios_recientes), 3)
+        self.assertTrue(all(fecha > vencidos for fecha in self.servicio.recordatorios_recientes.values()))
+
+    def test_ventana_configurable(self):
+        servicio = ServicioNotificaciones(ventana_supresion=timedelta(0))
+        usuario = self.fachada.sistema_usuarios.buscar_usuario(2)
+        prestamos = self.fachada.sistema_prestamos.obtener_prestamos_usuario(2)
+
+        self.assertTrue(servicio.notificar_vencimientos(usuario, prestamos, {}))
+        servicio.recordatorios_recientes = {clave: fecha - timedelta(seconds=1)
+                                            for clave, fecha in servicio.recordatorios_recientes.items()}
+        self.assertTrue(servicio.notificar_vencimientos(usuario, prestamos, {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
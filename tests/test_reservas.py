@@ -0,0 +1,116 @@
+import contextlib
+import io
+import random
+import unittest
+from datetime import timedelta
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.subsystems.reservation_system import SistemaReservas, _ColaEspera
+
+
+class PruebaColaEspera(unittest.TestCase):
+    def test_cancelar_en_medio_de_la_cola(self):
+        cola = _ColaEspera()
+        for id_usuario in range(1, 6):
+            self.assertEqual(cola.encolar(id_usuario), id_usuario)
+
+        self.assertTrue(cola.cancelar(3))
+        self.assertFalse(cola.cancelar(3))
+
+        self.assertEqual([cola.posicion(u) for u in range(1, 6)], [1, 2, None, 3, 4])
+        self.assertEqual(len(cola), 4)
+        self.assertEqual([cola.desencolar() for _ in range(5)], [1, 2, 4, 5, None])
+
+    def test_volver_a_reservar_tras_cancelar_va_al_final(self):
+        cola = _ColaEspera()
+        for id_usuario in (1, 2, 3):
+            cola.encolar(id_usuario)
+        cola.cancelar(1)
+
+        self.assertEqual(cola.encolar(1), 3)
+        self.assertEqual(cola.encolar(2), 1)  # Ya estaba: conserva su posición
+        self.assertEqual([cola.desencolar() for _ in range(3)], [2, 3, 1])
+
+    def test_posiciones_coinciden_con_una_lista(self):
+        # Suficientes operaciones para desplazar la base y hacer crecer el árbol varias veces
+        aleatorio = random.Random(7)
+        cola, modelo = _ColaEspera(), []
+        for _ in range(5000):
+            operacion = aleatorio.random()
+            if operacion < 0.5:
+                id_usuario = aleatorio.randint(1, 300)
+                esperada = modelo.index(id_usuario) + 1 if id_usuario in modelo else len(modelo) + 1
+                if id_usuario not in modelo:
+                    modelo.append(id_usuario)
+                self.assertEqual(cola.encolar(id_usuario), esperada)
+            elif operacion < 0.75:
+                self.assertEqual(cola.desencolar(), modelo.pop(0) if modelo else None)
+            elif modelo:
+                id_usuario = aleatorio.choice(modelo)
+                modelo.remove(id_usuario)
+                self.assertTrue(cola.cancelar(id_usuario))
+            for posicion, id_usuario in enumerate(modelo[:20], start=1):
+                self.assertEqual(cola.posicion(id_usuario), posicion)
+            self.assertEqual(len(cola), len(modelo))
+        self.assertGreater(len(cola.arbol), 17)
+
+
+class PruebaSistemaReservas(unittest.TestCase):
+    def setUp(self):
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+
+    def test_colas_vacias_se_eliminan(self):
+        reservas = SistemaReservas()
+        reservas.reservar(1, 10)
+        reservas.reservar(2, 10)
+
+        self.assertTrue(reservas.cancelar(1, 10))
+        self.assertEqual(reservas.obtener_posicion(2, 10), 1)
+        self.assertEqual(reservas.siguiente(10), 2)
+        self.assertNotIn(10, reservas.colas)
+        self.assertIsNone(reservas.siguiente(10))
+        self.assertFalse(reservas.cancelar(1, 10))
+        self.assertEqual(reservas.longitud_cola(10), 0)
+
+    def test_devolucion_presta_al_siguiente_en_espera(self):
+        fachada = FachadaBiblioteca()
+        ana, luis, eva, rosa = (fachada.registrar_usuario(nombre, f"{nombre.lower()}@example.com")
+                                for nombre in ("Ana", "Luis", "Eva", "Rosa"))
+        libro = fachada.agregar_libro("Rayuela", "Julio Cortázar", "978-84-376-0494-7")
+        prestamo = fachada.realizar_prestamo(ana.id, libro.id)
+        self.assertIsNone(fachada.reservar_libro(luis.id, 99))
+        for usuario in (luis, eva, rosa):
+            fachada.reservar_libro(usuario.id, libro.id)
+        fachada.cancelar_reserva(luis.id, libro.id)
+        # Eva tiene un préstamo vencido, así que se salta su turno
+        otro = fachada.agregar_libro("Ficciones", "Jorge Luis Borges", "978-84-206-3396-8")
+        vencido = fachada.realizar_prestamo(eva.id, otro.id)
+        vencido.fecha_prestamo -= timedelta(days=30)
+
+        self.assertEqual(fachada.obtener_posicion_reserva(rosa.id, libro.id), 2)
+        self.assertTrue(fachada.devolver_libro(prestamo.id))
+
+        activos = [p for p in fachada.sistema_prestamos.prestamos.values()
+                   if p.id_libro == libro.id and not p.fecha_devolucion]
+        self.assertEqual([p.id_usuario for p in activos], [rosa.id])
+        self.assertEqual(fachada.obtener_longitud_cola_reservas(libro.id), 0)
+        self.assertFalse(fachada.catalogo_libros.esta_disponible(libro.id))
+
+    def test_devolucion_sin_reservas_deja_el_libro_disponible(self):
+        fachada = FachadaBiblioteca()
+        ana = fachada.registrar_usuario("Ana", "ana@example.com")
+        libro = fachada.agregar_libro("Rayuela", "Julio Cortázar", "978-84-376-0494-7")
+        self.assertIsNone(fachada.reservar_libro(ana.id, libro.id))  # Disponible: no hace falta
+        prestamo = fachada.realizar_prestamo(ana.id, libro.id)
+
+        fachada.devolver_libro(prestamo.id)
+
+        self.assertTrue(fachada.catalogo_libros.esta_disponible(libro.id))
+
+
+if __name__ == "__main__":
+    unittest.main()
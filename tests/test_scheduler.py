@@ -0,0 +1,139 @@
+import contextlib
+import io
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.subsystems.scheduler import PlanificadorRecordatorios
+
+
+class _Reloj:
+    """Reloj manual para el planificador."""
+
+    def __init__(self):
+        self.ahora = datetime(2024, 1, 1)
+
+    def __call__(self):
+        return self.ahora
+
+    def avanzar(self, **intervalo):
+        self.ahora += timedelta(**intervalo)
+
+
+class PruebaPlanificadorRecordatorios(unittest.TestCase):
+    def setUp(self):
+        self.reloj = _Reloj()
+        self.planificador = PlanificadorRecordatorios(reloj=self.reloj, intervalo_maximo=0.01)
+        self.ejecutadas = []
+
+    def tearDown(self):
+        self.planificador.detener()
+
+    def _programar(self, clave, **intervalo):
+        self.planificador.programar(clave, self.reloj.ahora + timedelta(**intervalo),
+                                    lambda: self.ejecutadas.append(clave))
+
+    def test_ejecuta_las_vencidas_por_orden_de_fecha(self):
+        for clave, horas in (("c", 3), ("a", 1), ("d", 10), ("b", 2), ("b2", 2)):
+            self._programar(clave, hours=horas)
+        self.assertEqual(self.planificador.ejecutar_pendientes(), 0)
+
+        self.reloj.avanzar(hours=5)
+
+        self.assertEqual(self.planificador.ejecutar_pendientes(), 4)
+        self.assertEqual(self.ejecutadas, ["a", "b", "b2", "c"])  # Empates por orden de programación
+        self.assertEqual(len(self.planificador), 1)
+        self.assertEqual(self.planificador.proxima_fecha(), datetime(2024, 1, 1, 10))
+
+    def test_cancelar_y_reprogramar_invalidan_la_entrada_anterior(self):
+        self._programar("a", hours=1)
+        self._programar("b", hours=2)
+        self._programar("c", hours=3)
+
+        self.assertTrue(self.planificador.cancelar("a"))
+        self.assertFalse(self.planificador.cancelar("a"))
+        self.assertTrue(self.planificador.reprogramar("b", self.reloj.ahora + timedelta(hours=20)))
+        self.assertFalse(self.planificador.reprogramar("x", self.reloj.ahora))
+        self._programar("c", hours=30)  # Reemplaza la tarea anterior
+
+        self.reloj.avanzar(hours=5)
+        self.assertEqual(self.planificador.ejecutar_pendientes(), 0)
+        self.assertEqual(self.planificador.proxima_fecha(), datetime(2024, 1, 1, 20))
+        self.assertEqual(len(self.planificador.monticulo), 2)  # Las entradas inválidas de la cima se descartaron
+        self.reloj.avanzar(days=2)
+        self.assertEqual(self.planificador.ejecutar_pendientes(), 2)
+        self.assertEqual(self.ejecutadas, ["b", "c"])
+
+    def test_compacta_cuando_dominan_las_entradas_invalidas(self):
+        for i in range(2000):
+            self._programar(f"t{i:04d}", minutes=i)
+        for i in range(1500):
+            self.planificador.cancelar(f"t{i:04d}")
+
+        # Se reconstruye al pasar de 1024 entradas con más del doble que tareas vivas
+        self.assertEqual(len(self.planificador.monticulo), 999)
+        for _ in range(5000):
+            self.planificador.reprogramar("t1999", self.reloj.ahora + timedelta(days=2))
+        self.assertLessEqual(len(self.planificador.monticulo), 1025)
+
+        self.reloj.avanzar(days=3)
+        self.assertEqual(self.planificador.ejecutar_pendientes(), 500)
+        self.assertEqual(self.ejecutadas, [f"t{i:04d}" for i in range(1500, 2000)])
+        self.assertEqual(len(self.planificador), 0)
+
+    def test_un_fallo_no_detiene_las_demas(self):
+        def fallar():
+            raise RuntimeError("caído")
+
+        self.planificador.programar("mala", self.reloj.ahora, fallar)
+        self._programar("buena", seconds=1)
+        self.reloj.avanzar(seconds=1)
+
+        with contextlib.redirect_stdout(io.StringIO()) as salida:
+            self.assertEqual(self.planificador.ejecutar_pendientes(), 2)
+        self.assertEqual(self.ejecutadas, ["buena"])
+        self.assertIn("mala", salida.getvalue())
+
+    def test_el_hilo_dispara_al_llegar_el_reloj_inyectado(self):
+        disparada = threading.Event()
+        self.planificador.programar("k", self.reloj.ahora + timedelta(days=1), disparada.set)
+        self.planificador.iniciar()
+        hilo = self.planificador._hilo
+        self.planificador.iniciar()
+        self.assertIs(self.planificador._hilo, hilo)
+
+        self.assertFalse(disparada.wait(0.05))
+        self.reloj.avanzar(days=1)
+        self.assertTrue(disparada.wait(2))
+
+        inicio = time.monotonic()
+        self.planificador.detener()
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.assertIsNone(self.planificador._hilo)
+        self.assertFalse(hilo.is_alive())
+
+
+class PruebaPlanificadorEnLaFachada(unittest.TestCase):
+    def test_recordatorio_con_reloj_inyectado(self):
+        reloj = _Reloj()
+        reloj.ahora = datetime.now()
+        fachada = FachadaBiblioteca(planificador=PlanificadorRecordatorios(reloj=reloj))
+        fachada.activar_recordatorios_programados(dias_antes=3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            usuario = fachada.registrar_usuario("Ana", "ana@example.com")
+            libro = fachada.agregar_libro("Rayuela", "Julio Cortázar", "978-84-376-0494-7")
+            prestamo = fachada.realizar_prestamo(usuario.id, libro.id)
+
+            self.assertEqual(fachada.procesar_recordatorios(), 0)
+            reloj.ahora = prestamo.fecha_vencimiento - timedelta(days=3)
+            self.assertEqual(fachada.procesar_recordatorios(), 1)
+
+        enviada = fachada.servicio_notificaciones.notificaciones_enviadas[-1]
+        self.assertEqual(enviada["destinatario"], "ana@example.com")
+        self.assertIn("Rayuela", enviada["contenido"])
+
+
+if __name__ == "__main__":
+    unittest.main()
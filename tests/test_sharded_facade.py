@@ -0,0 +1,205 @@
+import contextlib
+import inspect
+import io
+import unittest
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.facade.sharded_facade import FachadaBibliotecaFragmentada
+
+
+def _metodos_publicos(clase):
+    return {nombre: inspect.signature(metodo) for nombre, metodo in inspect.getmembers(clase, inspect.isfunction)
+            if not nombre.startswith("_")}
+
+
+class PruebaFachadaFragmentada(unittest.TestCase):
+    def setUp(self):
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.biblioteca = FachadaBibliotecaFragmentada(2, silencioso=True)
+        # Altas en turno rotativo: usuarios 1 y 2, libros 1 y 2, en los fragmentos 0 y 1
+        self.ana = self.biblioteca.registrar_usuario("Ana", "ana@example.com")
+        self.luis = self.biblioteca.registrar_usuario("Luis", "luis@example.com")
+        self.libros = self.biblioteca.agregar_libros_lote([(f"Libro {i}", "Autor", f"isbn-{i}") for i in range(4)])
+
+    def tearDown(self):
+        self.biblioteca.cerrar()
+        self.salida.__exit__(None, None, None)
+
+    def test_prestamo_entre_fragmentos_y_devolucion(self):
+        libro = self.libros[1]
+        self.assertNotEqual(self.biblioteca._fragmento_de(self.ana.id), self.biblioteca._fragmento_de(libro.id))
+
+        prestamo = self.biblioteca.realizar_prestamo(self.ana.id, libro.id)
+
+        # El préstamo vive en el fragmento del libro y se replica en el del usuario
+        self.assertEqual(self.biblioteca._fragmento_de(prestamo.id), self.biblioteca._fragmento_de(libro.id))
+        self.assertEqual([p.id for p in self.biblioteca.obtener_prestamos_activos(self.ana.id)], [prestamo.id])
+        self.assertEqual(self.biblioteca.contar_libros_disponibles(), 3)
+        self.assertEqual(self.biblioteca.buscar_libro("Libro 1", solo_disponibles=True), [])
+
+        self.assertTrue(self.biblioteca.devolver_libro(prestamo.id))
+        self.assertEqual(self.biblioteca.obtener_prestamos_activos(self.ana.id), [])
+        self.assertEqual(self.biblioteca.contar_libros_disponibles(), 4)
+        self.assertFalse(self.biblioteca.devolver_libro(prestamo.id))
+
+    def test_rechaza_prestar_un_libro_ya_prestado(self):
+        libro = self.libros[0]
+        self.assertIsNotNone(self.biblioteca.realizar_prestamo(self.ana.id, libro.id))
+
+        self.assertIsNone(self.biblioteca.realizar_prestamo(self.luis.id, libro.id))
+        self.assertEqual(self.biblioteca.obtener_prestamos_activos(self.luis.id), [])
+
+    def test_devolucion_entrega_el_libro_al_siguiente_en_espera(self):
+        libro = self.libros[0]
+        prestamo = self.biblioteca.realizar_prestamo(self.ana.id, libro.id)
+        self.assertEqual(self.biblioteca.reservar_libro(self.luis.id, libro.id), 1)
+
+        self.biblioteca.devolver_libro(prestamo.id)
+
+        self.assertEqual([p.id_libro for p in self.biblioteca.obtener_prestamos_activos(self.luis.id)], [libro.id])
+        self.assertEqual(self.biblioteca.obtener_longitud_cola_reservas(libro.id), 0)
+
+    def test_prestamos_en_lote(self):
+        solicitudes = [
+            (self.ana.id, self.libros[0].id),
+            (self.luis.id, self.libros[1].id),
+            (99, self.libros[2].id),  # usuario inexistente
+            (self.luis.id, self.libros[0].id),  # mismo libro que la primera solicitud
+            (self.ana.id, self.libros[3].id),
+        ]
+
+        resultados = self.biblioteca.realizar_prestamos_lote(solicitudes)
+
+        self.assertEqual([(p.id_usuario, p.id_libro) if p else None for p in resultados],
+                         [solicitudes[0], solicitudes[1], None, None, solicitudes[4]])
+        self.assertEqual(len({p.id for p in resultados if p}), 3)
+        self.assertEqual([p.id_libro for p in self.biblioteca.obtener_prestamos_activos(self.ana.id)],
+                         sorted([self.libros[0].id, self.libros[3].id]))
+        self.assertEqual(self.biblioteca.contar_libros_disponibles(), 1)
+
+    def _fallar_en(self, metodo, id_libro):
+        """Hace que la llamada `metodo` de la solicitud sobre `id_libro` falle dentro del fragmento."""
+        enviar_lote = self.biblioteca._enviar_lote
+
+        def libro_de(nombre, args):
+            return args[1] if nombre == "crear_prestamo" else args[0].id_libro
+
+        def enviar_con_fallo(peticiones):
+            return enviar_lote([(fragmento, "no_existe", args)
+                                if nombre == metodo and libro_de(nombre, args) == id_libro else (fragmento, nombre, args)
+                                for fragmento, nombre, args in peticiones])
+
+        self.biblioteca._enviar_lote = enviar_con_fallo
+
+    def test_fallo_al_crear_no_detiene_el_lote(self):
+        self._fallar_en("crear_prestamo", self.libros[1].id)
+
+        resultados = self.biblioteca.realizar_prestamos_lote(
+            [(self.ana.id, self.libros[0].id), (self.luis.id, self.libros[1].id)])
+
+        self.assertIsNotNone(resultados[0])
+        self.assertIsNone(resultados[1])
+        self.assertEqual([p.id for p in self.biblioteca.obtener_prestamos_activos(self.ana.id)], [resultados[0].id])
+        self.assertEqual(self.biblioteca.contar_libros_disponibles(), 3)
+
+    def test_fallo_al_vincular_deshace_el_prestamo(self):
+        self._fallar_en("vincular_prestamo", self.libros[1].id)
+
+        resultados = self.biblioteca.realizar_prestamos_lote(
+            [(self.ana.id, self.libros[0].id), (self.ana.id, self.libros[1].id)])
+
+        self.assertIsNotNone(resultados[0])
+        self.assertIsNone(resultados[1])
+        self.assertEqual([p.id for p in self.biblioteca.obtener_prestamos_activos(self.ana.id)], [resultados[0].id])
+        # El libro cuyo vínculo falló vuelve a estar disponible
+        self.assertEqual(self.biblioteca.buscar_libro("Libro 1", solo_disponibles=True), [self.libros[1]])
+        self.assertEqual(self.biblioteca.contar_libros_disponibles(), 3)
+
+    def test_cerrar_detiene_los_procesos(self):
+        procesos = list(self.biblioteca._procesos)
+
+        self.biblioteca.cerrar()
+
+        self.assertTrue(all(not proceso.is_alive() and proceso.exitcode == 0 for proceso in procesos))
+        self.assertEqual(self.biblioteca._conexiones, [])
+        # Cerrar otra vez no hace nada
+        self.biblioteca.cerrar()
+
+
+class PruebaInterfazFragmentada(unittest.TestCase):
+    NO_DISPONIBLES = {
+        "abrir_instantanea": (),
+        "suscribir_cambios": (print,),
+        "exportar_datos": ("biblioteca.bin",),
+        "importar_datos": ("biblioteca.bin",),
+        "activar_recordatorios_programados": (),
+        "procesar_recordatorios": (),
+    }
+
+    def setUp(self):
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+
+    def test_misma_interfaz_publica_que_la_fachada(self):
+        fachada = _metodos_publicos(FachadaBiblioteca)
+        fragmentada = _metodos_publicos(FachadaBibliotecaFragmentada)
+
+        self.assertEqual(set(fachada) - set(fragmentada), set())
+        for nombre, firma in fachada.items():
+            with self.subTest(nombre):
+                self.assertEqual(list(fragmentada[nombre].parameters), list(firma.parameters))
+
+    def test_operaciones_repartidas_coinciden_con_la_fachada(self):
+        fachada = FachadaBiblioteca()
+        with FachadaBibliotecaFragmentada(3, silencioso=True) as fragmentada:
+            for biblioteca in (fachada, fragmentada):
+                usuarios = [biblioteca.registrar_usuario(f"Usuario {i}", f"u{i}@example.com") for i in range(4)]
+                libros = [biblioteca.agregar_libro(f"Tomo {i} de {'poesía' if i % 2 else 'novela'}",
+                                                   f"Autor {i % 3}", f"978-{i:04d}") for i in range(9)]
+                prestamos = [biblioteca.realizar_prestamo(usuarios[i % 4].id, libros[i].id) for i in range(7)]
+                for prestamo in prestamos[:3]:
+                    biblioteca.devolver_libro(prestamo.id)
+                biblioteca.realizar_prestamo(usuarios[0].id, libros[0].id)
+
+            consulta = {"titulo": "tomo poesía", "autor": "autor", "disponible": True}
+            self.assertEqual(fragmentada.consultar_libros(**consulta), fachada.consultar_libros(**consulta))
+            plan = fragmentada.explicar_consulta_libros(**consulta)
+            self.assertEqual([linea for linea in plan.splitlines() if linea.startswith("fragmento")],
+                             ["fragmento 0:", "fragmento 1:", "fragmento 2:"])
+
+            estadisticas = fragmentada.obtener_estadisticas_circulacion()
+            esperadas = fachada.obtener_estadisticas_circulacion()
+            # Los préstamos del usuario 1 están en dos fragmentos: sólo encabeza el ranking tras sumarlos
+            self.assertEqual(estadisticas["usuarios_mas_activos"][0], (1, 3))
+            for resumen in (estadisticas, esperadas, estadisticas["ventana"], esperadas["ventana"]):
+                # Los empates pueden ordenarse distinto según el fragmento
+                for ranking in ("libros_mas_prestados", "usuarios_mas_activos"):
+                    resumen[ranking] = dict(resumen[ranking])
+                resumen["duracion_media_dias"] = round(resumen["duracion_media_dias"], 6)
+            self.assertEqual(estadisticas, esperadas)
+
+            reporte = fragmentada.generar_reporte_prestamos()
+            esperado = fachada.generar_reporte_prestamos(num_procesos=1)
+            for campo in ("total_prestamos", "prestamos_activos", "total_multas", "actividad_usuarios"):
+                self.assertEqual(reporte[campo], esperado[campo])
+
+            uso = fragmentada.obtener_uso_memoria()
+            self.assertEqual(uso["usuarios"]["entidades"], 4)
+            self.assertEqual(uso["prestamos"]["entidades"], 8)
+            fragmentada.iniciar_perfil_memoria()
+            fragmentada.agregar_libros_lote([(f"Extra {i}", "Autor", f"x-{i}") for i in range(300)])
+            self.assertGreater(fragmentada.comparar_perfil_memoria()["libros"]["bytes"], 0)
+            fragmentada.detener_perfil_memoria()
+
+            for nombre, args in self.NO_DISPONIBLES.items():
+                with self.subTest(nombre):
+                    with self.assertRaises(NotImplementedError):
+                        getattr(fragmentada, nombre)(*args)
+
+
+if __name__ == "__main__":
+    unittest.main()
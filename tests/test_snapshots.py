@@ -0,0 +1,176 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.subsystems import snapshots
+
+
+def _contenido(instantanea):
+    libros = {id_libro: libro.disponible for id_libro, libro in instantanea["libros"].items()}
+    prestamos = {id_prestamo: (prestamo.id_libro, prestamo.fecha_devolucion)
+                 for id_prestamo, prestamo in instantanea["prestamos"].items()}
+    return libros, prestamos
+
+
+class PruebaInstantaneas(unittest.TestCase):
+    def setUp(self):
+        self.salida = contextlib.redirect_stdout(io.StringIO())
+        self.salida.__enter__()
+        self.fachada = FachadaBiblioteca()
+        self.fachada.registrar_usuario("Ana", "ana@example.com")
+        for i in range(40):
+            self.fachada.agregar_libro(f"Libro {i}", "Autor", f"isbn-{i}")
+        for id_libro in range(1, 41, 2):
+            self.fachada.sistema_prestamos.crear_prestamo(1, id_libro)
+
+    def tearDown(self):
+        self.salida.__exit__(None, None, None)
+
+    def assertCoherente(self, instantanea):
+        libros, prestamos = _contenido(instantanea)
+        prestados = {id_libro for id_libro, devolucion in prestamos.values() if devolucion is None}
+        self.assertEqual({id_libro for id_libro, disponible in libros.items() if not disponible}, prestados)
+        self.assertEqual(len(prestados), sum(1 for id_libro, devolucion in prestamos.values() if devolucion is None))
+
+    def test_vista_estable_con_prestamos_y_devoluciones_concurrentes(self):
+        prestamos = self.fachada.sistema_prestamos
+        inicial = self.fachada.abrir_instantanea()
+        esperado = _contenido(inicial)
+        detener = threading.Event()
+
+        def circular(hilo):
+            # Cada hilo alterna préstamo y devolución sobre sus propios libros
+            mios = range(hilo + 1, 41, 4)
+            while not detener.is_set():
+                for id_libro in mios:
+                    activo = next((p for p in list(prestamos.prestamos.values())
+                                   if p.id_libro == id_libro and p.fecha_devolucion is None), None)
+                    if activo:
+                        prestamos.finalizar_prestamo(activo.id)
+                    else:
+                        prestamos.crear_prestamo(1, id_libro)
+
+        hilos = [threading.Thread(target=circular, args=(hilo,)) for hilo in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        try:
+            for _ in range(30):
+                with self.fachada.abrir_instantanea() as instantanea:
+                    self.assertCoherente(instantanea)
+                self.assertEqual(_contenido(inicial), esperado)
+        finally:
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
+
+        self.assertGreater(len(prestamos.prestamos), 20)
+        self.assertEqual(_contenido(inicial), esperado)
+        self.assertGreater(inicial.copias_guardadas(), 0)
+        inicial.cerrar()
+
+    def test_leer_una_vista_cerrada_falla(self):
+        with self.fachada.abrir_instantanea() as instantanea:
+            vista = instantanea["prestamos"]
+            self.assertEqual(len(vista), 20)
+
+        self.assertEqual(instantanea.copias_guardadas(), 0)
+        for lectura in (lambda: vista.get(1), lambda: len(vista), lambda: list(vista.items()), lambda: 1 in vista):
+            with self.assertRaises(ValueError):
+                lectura()
+
+    def _en_otro_hilo(self, funcion):
+        hilo = threading.Thread(target=funcion)
+        hilo.start()
+        return hilo
+
+    def test_sin_instantaneas_los_escritores_no_toman_el_lock(self):
+        prestamos = self.fachada.sistema_prestamos
+        with self.fachada.gestor_instantaneas.lock:
+            # Un lector retendría el lock; los préstamos y devoluciones no deben esperarle
+            hilo = self._en_otro_hilo(lambda: (prestamos.crear_prestamo(1, 2), prestamos.finalizar_prestamo(1)))
+            hilo.join(5)
+            self.assertFalse(hilo.is_alive())
+        self.assertFalse(self.fachada.catalogo_libros.libros[2].disponible)
+        self.assertIsNotNone(prestamos.prestamos[1].fecha_devolucion)
+
+    def test_abrir_espera_a_los_escritores_en_curso(self):
+        abiertas = []
+        with self.fachada.sistema_prestamos._operacion_atomica():
+            hilo = self._en_otro_hilo(lambda: abiertas.append(self.fachada.abrir_instantanea()))
+            hilo.join(0.2)
+            self.assertTrue(hilo.is_alive())
+            self.fachada.sistema_prestamos.crear_prestamo(1, 2)
+        hilo.join(5)
+        self.assertFalse(hilo.is_alive())
+
+        with abiertas[0] as instantanea:
+            self.assertCoherente(instantanea)
+            self.assertFalse(instantanea["libros"][2].disponible)
+            # Con la instantánea abierta los escritores vuelven a tomar el lock
+            with self.fachada.gestor_instantaneas.lock:
+                hilo = self._en_otro_hilo(lambda: self.fachada.sistema_prestamos.crear_prestamo(1, 4))
+                hilo.join(0.2)
+                self.assertTrue(hilo.is_alive())
+            hilo.join(5)
+            self.assertFalse(self.fachada.catalogo_libros.libros[4].disponible)
+            self.assertTrue(instantanea["libros"][4].disponible)
+
+    def test_leer_copia_fuera_del_lock(self):
+        lock = self.fachada.gestor_instantaneas.lock
+        copiar = snapshots.copy.copy
+        libres = []
+        cambiado = []
+        lector = threading.current_thread()
+
+        def copiar_comprobando(valor):
+            if threading.current_thread() is not lector:
+                return copiar(valor)  # El escritor guarda su copia con el lock tomado
+            hilo = self._en_otro_hilo(lambda: libres.append(lock.acquire(blocking=False) and not lock.release()))
+            hilo.join()
+            if getattr(valor, "id", None) == 2 and not cambiado:
+                # Un escritor cambia el libro mientras se copia: la copia a medias se descarta
+                cambiado.append(self._en_otro_hilo(
+                    lambda: self.fachada.catalogo_libros.actualizar_disponibilidad(2, False)))
+                cambiado[0].join(5)
+            return copiar(valor)
+
+        with self.fachada.abrir_instantanea() as instantanea:
+            with mock.patch.object(snapshots.copy, "copy", copiar_comprobando):
+                libros = dict(instantanea["libros"].items())
+
+        self.assertTrue(libres)
+        self.assertTrue(all(libres))
+        self.assertFalse(self.fachada.catalogo_libros.libros[2].disponible)
+        self.assertTrue(libros[2].disponible)
+        self.assertEqual(len(libros), 40)
+
+    def test_vista_congelada_tras_importar(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, "biblioteca.bin")
+            otra = FachadaBiblioteca()
+            otra.registrar_usuario("Luis", "luis@example.com")
+            for i in range(3):
+                otra.agregar_libro(f"Otro {i}", "Autor", f"otro-{i}")
+            otra.sistema_prestamos.crear_prestamo(1, 2)
+            otra.exportar_datos(ruta)
+
+            with self.fachada.abrir_instantanea() as instantanea:
+                esperado = _contenido(instantanea)
+                self.fachada.importar_datos(ruta)
+
+                self.assertEqual(_contenido(instantanea), esperado)
+                self.assertEqual(instantanea["libros"][1].titulo, "Libro 0")
+                self.assertEqual(len(self.fachada.catalogo_libros.libros), 3)
+                self.assertEqual(self.fachada.catalogo_libros.libros[1].titulo, "Otro 0")
+
+            with self.fachada.abrir_instantanea() as nueva:
+                self.assertEqual(_contenido(nueva), ({1: True, 2: False, 3: True}, {1: (2, None)}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from src.facade.library_facade import FachadaBiblioteca
+from src.facade.workload_trace import GrabadorTrazas, ReproductorTrazas
+
+
+class PruebaTrazas(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.ruta = os.path.join(self.directorio.name, "carga.jsonl.gz")
+        fachada = FachadaBiblioteca()
+        with contextlib.redirect_stdout(io.StringIO()), GrabadorTrazas(fachada, self.ruta) as grabador:
+            ana = fachada.registrar_usuario("Ana", "ana@example.com")
+            luis = fachada.registrar_usuario("Luis", "luis@example.com")
+            libros = [fachada.agregar_libro(f"Libro {i}", "Autora", f"isbn-{i}") for i in range(5)]
+            prestamo = fachada.realizar_prestamo(ana.id, libros[0].id)
+            fachada.reservar_libro(luis.id, libros[0].id)
+            fachada.buscar_libro("libro", solo_disponibles=True)
+            fachada.devolver_libro(prestamo.id)
+            fachada.activar_recordatorios_programados()
+            fachada.procesar_recordatorios()
+            fachada.obtener_estadisticas_circulacion()
+        self.llamadas_grabadas = grabador.llamadas_grabadas
+
+    def tearDown(self):
+        self.directorio.cleanup()
+
+    def test_reproducir_la_traza_grabada_no_tiene_discrepancias(self):
+        informe = ReproductorTrazas(self.ruta).reproducir()
+
+        self.assertEqual(informe["llamadas"], self.llamadas_grabadas)
+        self.assertEqual(informe["total_discrepancias"], 0, informe["discrepancias"])
+        self.assertEqual(informe["operaciones"]["agregar_libro"]["llamadas"], 5)
+        self.assertEqual(informe["operaciones"]["realizar_prestamo"]["llamadas"], 1)
+
+    def test_detecta_resultados_distintos_y_errores_sin_abortar(self):
+        reproductor = ReproductorTrazas(self.ruta)
+        # El primer usuario registrado tendrá otro ID
+        reproductor.llamadas[0][3]["id"] = 99
+        # Una llamada que falla al reproducirse
+        reproductor.llamadas.insert(1, [0.0, "buscar_libro", [None], []])
+
+        informe = reproductor.reproducir()
+
+        self.assertEqual(informe["total_discrepancias"], 2)
+        cambiada, fallida = informe["discrepancias"]
+        self.assertEqual((cambiada["metodo"], cambiada["esperado"]["id"], cambiada["obtenido"]["id"]),
+                         ("registrar_usuario", 99, 1))
+        self.assertEqual(fallida["metodo"], "buscar_libro")
+        self.assertEqual(fallida["esperado"], [])
+        self.assertIn("AttributeError", fallida["obtenido"]["error"])
+        # Las llamadas posteriores al error se siguen reproduciendo y midiendo
+        self.assertEqual(informe["operaciones"]["agregar_libro"]["llamadas"], 5)
+        self.assertEqual(informe["operaciones"]["buscar_libro"]["llamadas"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()